@@ -0,0 +1,121 @@
+"""
+Benchmark: ``fastgenomics.io.iter_input_chunks`` vs. a plain ``csv`` loop.
+
+Generates a synthetic expression matrix (10 GB by default) and reads it with both approaches. Every variant runs in a
+fresh subprocess, so throughput and peak memory (max RSS) are measured independently.
+
+Usage::
+
+    python benchmarks/bench_chunks.py [--size-gb 10] [--rows 100000] [--workdir /tmp/fg_bench] [--keep]
+"""
+import argparse
+import csv
+import json
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# benchmark the checkout, installed or not - also in the subprocesses running this script
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+MANIFEST = {
+    "FASTGenomicsApplication": {
+        "Name": "Chunk benchmark", "Type": "Calculation", "Class": "Benchmark",
+        "Author": {"Name": "FASTGenomics Team", "Email": "contact@fastgenomics.org", "Organisation": "FASTGenomics"},
+        "Description": "benchmark app", "License": "MIT", "Demands": ["CPU"],
+        "Parameters": {},
+        "Input": {"matrix": {"Type": "expressionMatrix", "Usage": "synthetic expression matrix"}},
+        "Output": {}
+    }
+}
+
+
+def create_data_root(workdir: Path, size_gb: float) -> (Path, Path):
+    """creates app dir and data root with a synthetic matrix of about size_gb gigabytes"""
+    app_dir = workdir / 'app'
+    data_root = workdir / 'fastgenomics'
+    for sub_dir in ['config', 'data', 'output', 'summary']:
+        (data_root / sub_dir).mkdir(parents=True, exist_ok=True)
+    app_dir.mkdir(parents=True, exist_ok=True)
+
+    (app_dir / 'manifest.json').write_text(json.dumps(MANIFEST))
+    (data_root / 'config' / 'input_file_mapping.json').write_text(json.dumps({'matrix': 'matrix.csv'}))
+
+    matrix = data_root / 'data' / 'matrix.csv'
+    target = int(size_gb * 1024 ** 3)
+    if matrix.exists() and matrix.stat().st_size >= target:
+        return app_dir, data_root
+
+    rng = random.Random(42)
+    block = ''.join(f"cell_{i},gene_{rng.randrange(30000)},{rng.random():.6f}\n" for i in range(100_000))
+    with matrix.open('w') as f:
+        f.write("cellId,geneId,expressionValue\n")
+        written = 0
+        while written < target:
+            written += f.write(block)
+    return app_dir, data_root
+
+
+def run_variant(variant: str, app_dir: str, data_root: str, rows: int):
+    """runs a single variant and prints its result as JSON"""
+    from fastgenomics import io as fg_io
+    fg_io.set_paths(app_dir, data_root)
+
+    start = time.perf_counter()
+    n_rows = 0
+    if variant == 'iter_input_chunks':
+        for chunk in fg_io.iter_input_chunks('matrix', rows=rows):
+            n_rows += len(chunk.rows)
+    elif variant == 'csv':
+        with fg_io.get_input_path('matrix').open(newline='') as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                _ = [row[0], row[1], float(row[2])]
+                n_rows += 1
+    else:
+        raise ValueError(f"Unknown variant {variant}")
+    elapsed = time.perf_counter() - start
+
+    size = fg_io.get_input_path('matrix').stat().st_size
+    print(json.dumps({'variant': variant, 'rows': n_rows, 'seconds': elapsed,
+                      'mb_per_s': size / 1024 ** 2 / elapsed,
+                      'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size-gb', type=float, default=10.)
+    parser.add_argument('--rows', type=int, default=100_000, help="rows per chunk")
+    parser.add_argument('--workdir', type=Path, default=None)
+    parser.add_argument('--keep', action='store_true', help="keep the generated data")
+    parser.add_argument('--run', nargs=3, metavar=('VARIANT', 'APP_DIR', 'DATA_ROOT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_variant(*args.run, rows=args.rows)
+        return
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='fg_bench_'))
+    try:
+        app_dir, data_root = create_data_root(workdir, args.size_gb)
+        results = []
+        for variant in ['csv', 'iter_input_chunks']:
+            out = subprocess.run([sys.executable, __file__, '--rows', str(args.rows),
+                                  '--run', variant, str(app_dir), str(data_root)],
+                                 check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+            results.append(json.loads(out))
+        print(json.dumps(results, indent=2))
+    finally:
+        if not args.keep and args.workdir is None:
+            shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
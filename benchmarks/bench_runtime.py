@@ -0,0 +1,228 @@
+"""
+Benchmark: runtime layer of ``fastgenomics.io`` - setup, manifest, input_file_mapping, parameters and path lookups.
+
+Generates a synthetic app (10k parameters, 10k inputs, 1k outputs), an input_file_mapping with 100k entries and a
+large input file. Every cold benchmark runs in a fresh ``RunContext``, so nothing is cached between repetitions.
+Results are printed as JSON. With ``--baseline``, they are compared to a stored result and the exit code is 1,
+if any benchmark is slower than the baseline by more than ``--threshold``.
+
+Usage::
+
+    python benchmarks/bench_runtime.py --save baseline.json
+    python benchmarks/bench_runtime.py --baseline baseline.json [--threshold 0.2]
+
+    python benchmarks/bench_runtime.py [--parameters 10000] [--inputs 10000] [--mapping 100000] [--large-mb 1024]
+                                       [--repeat 5] [--workdir /tmp/fg_bench] [--keep]
+"""
+import argparse
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# benchmark the checkout, installed or not
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+FILES_PER_DIRECTORY = 1000
+N_OUTPUTS = 1000
+PARAMETER_TYPES = [('string', 'value'), ('integer', 42), ('float', 4.2), ('bool', True),
+                   ('list', [1, 2, 3]), ('dict', {'foo': 42}), ('enum', 'X')]
+
+
+def create_manifest(n_parameters: int, n_inputs: int) -> dict:
+    """returns a manifest with n_parameters parameters of all types, n_inputs inputs and N_OUTPUTS outputs"""
+    parameters = {}
+    for i in range(n_parameters):
+        param_type, default = PARAMETER_TYPES[i % len(PARAMETER_TYPES)]
+        parameters[f'param_{i}'] = {'Type': param_type, 'Default': default, 'Description': f'parameter {i}'}
+        if param_type == 'enum':
+            parameters[f'param_{i}']['Enum'] = ['X', 'Y']
+    return {
+        "FASTGenomicsApplication": {
+            "Name": "Runtime benchmark", "Type": "Calculation", "Class": "Benchmark",
+            "Author": {"Name": "FASTGenomics Team", "Email": "contact@fastgenomics.org",
+                       "Organisation": "FASTGenomics"},
+            "Description": "benchmark app", "License": "MIT", "Demands": ["CPU"],
+            "Parameters": parameters,
+            "Input": {f'input_{i}': {"Type": "expressionMatrix", "Usage": f"input {i}"} for i in range(n_inputs)},
+            "Output": {f'output_{i}': {"Type": "expressionMatrix", "Usage": f"output {i}", "FileName": f"out_{i}.csv"}
+                       for i in range(N_OUTPUTS)},
+        }
+    }
+
+
+def create_data_root(workdir: Path, n_parameters: int, n_inputs: int, n_mapping: int, large_mb: float) -> (Path, Path):
+    """creates app dir and data root - small input files are empty, the input ``large`` has large_mb megabytes"""
+    app_dir = workdir / 'app'
+    data_root = workdir / 'fastgenomics'
+    for sub_dir in ['config', 'data', 'output', 'summary']:
+        (data_root / sub_dir).mkdir(parents=True, exist_ok=True)
+    app_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = create_manifest(n_parameters, n_inputs)
+    manifest['FASTGenomicsApplication']['Input']['large'] = {"Type": "expressionMatrix", "Usage": "large input"}
+    (app_dir / 'manifest.json').write_text(json.dumps(manifest))
+
+    # every second parameter is set by parameters.json
+    parameters = {f'param_{i}': PARAMETER_TYPES[i % len(PARAMETER_TYPES)][1] for i in range(0, n_parameters, 2)}
+    (data_root / 'config' / 'parameters.json').write_text(json.dumps(parameters))
+
+    mapping = {'large': 'large.csv'}
+    for i in range(n_mapping):
+        relative = f'part_{i // FILES_PER_DIRECTORY}/file_{i}.csv'
+        mapping[f'input_{i}'] = relative
+        path = data_root / 'data' / relative
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            path.touch()
+    (data_root / 'config' / 'input_file_mapping.json').write_text(json.dumps(mapping))
+
+    large = data_root / 'data' / 'large.csv'
+    target = int(large_mb * 1024 ** 2)
+    if not large.exists() or large.stat().st_size < target:
+        block = ''.join(f"cell_{i},gene_{i % 30000},{i % 97 / 7:.6f}\n" for i in range(100_000))
+        with large.open('w') as f:
+            written = 0
+            while written < target:
+                written += f.write(block)
+    return app_dir, data_root
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """returns min and median wall time of func(setup()) over repeat runs"""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def measure_import(repeat: int) -> dict:
+    """measures the import time of fastgenomics.io in fresh interpreters"""
+    code = (f"import sys; sys.path.insert(0, {str(REPO_ROOT)!r}); import time; start = time.perf_counter(); "
+            "import fastgenomics.io; print(time.perf_counter() - start)")
+    times = [float(subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+                                  universal_newlines=True).stdout) for _ in range(repeat)]
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def run_benchmarks(app_dir: Path, data_root: Path, repeat: int) -> dict:
+    """runs all benchmarks and returns ``{name: {'min', 'median', 'repeat'}}``"""
+    from fastgenomics import _common
+    from fastgenomics import io as fg_io
+
+    def fresh():
+        return _common.RunContext(app_dir, data_root)
+
+    def warm():
+        context = fresh()
+        with context:
+            fg_io.get_parameters()
+            _common.get_input_file_mapping(check_mapping=True)
+        return context
+
+    def in_context(func):
+        def run(context):
+            with context:
+                func()
+        return run
+
+    with fresh():
+        manifest = _common.get_app_manifest()
+    input_keys = [key for key in manifest['Input'] if key != 'large']
+    output_keys = list(manifest['Output'])
+    parameter_keys = list(manifest['Parameters'])
+
+    def read_large():
+        with fg_io.open_input('large', mode='rb') as f:
+            while f.read(16 * 1024 ** 2):
+                pass
+
+    results = {
+        'import': measure_import(repeat),
+        'set_paths': measure(in_context(lambda: _common.set_paths(app_dir, data_root)), repeat, fresh),
+        'get_app_manifest': measure(in_context(_common.get_app_manifest), repeat, fresh),
+        'get_input_file_mapping': measure(in_context(lambda: _common.get_input_file_mapping(check_mapping=True)),
+                                          repeat, fresh),
+        'get_parameters': measure(in_context(fg_io.get_parameters), repeat, fresh),
+        'get_parameter_all': measure(in_context(lambda: [fg_io.get_parameter(key) for key in parameter_keys]),
+                                     repeat, warm),
+        'get_input_path_all': measure(in_context(lambda: [fg_io.get_input_path(key) for key in input_keys]),
+                                      repeat, warm),
+        'get_output_path_all': measure(in_context(lambda: [fg_io.get_output_path(key) for key in output_keys]),
+                                       repeat, warm),
+        'read_large_input': measure(in_context(read_large), repeat, warm),
+    }
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """prints the ratio current / baseline of the minimal times and returns the names of all regressions"""
+    regressions = []
+    print(f"{'benchmark':<28} {'baseline':>12} {'current':>12} {'ratio':>8}", file=sys.stderr)
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<28} {'-':>12} {result['min']:>12.6f} {'-':>8}", file=sys.stderr)
+            continue
+        ratio = result['min'] / baseline[name]['min'] if baseline[name]['min'] > 0 else float('inf')
+        flag = ' REGRESSION' if ratio > 1 + threshold else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28} {baseline[name]['min']:>12.6f} {result['min']:>12.6f} {ratio:>8.2f}{flag}",
+              file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--parameters', type=int, default=10_000)
+    parser.add_argument('--inputs', type=int, default=10_000, help="number of inputs in the manifest")
+    parser.add_argument('--mapping', type=int, default=100_000, help="number of entries of the input_file_mapping")
+    parser.add_argument('--large-mb', type=float, default=1024.)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workdir', type=Path, default=None)
+    parser.add_argument('--keep', action='store_true', help="keep the generated data")
+    parser.add_argument('--save', type=Path, default=None, help="store the results as JSON, e.g. as new baseline")
+    parser.add_argument('--baseline', type=Path, default=None, help="compare the results to this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.2, help="tolerated slowdown against the baseline")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='fg_bench_'))
+    try:
+        app_dir, data_root = create_data_root(workdir, args.parameters, args.inputs, max(args.mapping, args.inputs),
+                                              args.large_mb)
+        report = {
+            'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'parameters': args.parameters, 'inputs': args.inputs, 'mapping': args.mapping,
+                     'large_mb': args.large_mb},
+            'results': run_benchmarks(app_dir, data_root, args.repeat),
+        }
+    finally:
+        if not args.keep and args.workdir is None:
+            shutil.rmtree(workdir)
+
+    print(json.dumps(report, indent=2))
+    if args.save:
+        args.save.write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline['meta'] != report['meta']:
+            print("Warning: baseline was measured with different settings!", file=sys.stderr)
+        regressions = compare(report['results'], baseline['results'], args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+FASTGenomics array cache: converts delimited text inputs once into memory-mappable ``.npy`` files.
+
+Cache entries are identified by the content hash of the source and the conversion options. A small stamp file
+maps path, size and mtime of a source to its entry, so unchanged sources are neither parsed nor hashed again.
+The cache is bounded in size, least recently used entries are evicted first.
+
+Requires numpy.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+import typing as ty
+
+from logging import getLogger
+
+from . import _chunks
+from . import _codecs
+from . import _integrity
+from . import _resources
+
+logger = getLogger('fastgenomics.io')
+
+CACHE_DIR_ENV = 'FG_ARRAY_CACHE_DIR'
+CACHE_SIZE_ENV = 'FG_ARRAY_CACHE_SIZE'
+DEFAULT_CACHE_SIZE = 10 * 1024 ** 3
+CACHE_FORMAT = 1
+
+
+class ArrayInput(ty.NamedTuple):
+    """memory-mapped content of a delimited text input"""
+    data: ty.Any  # read-only 2D numpy array of all numeric columns
+    columns: ty.Optional[ty.List[str]]  # names of the numeric columns, if the input has a header
+    labels: ty.Optional[ty.Any]  # read-only 2D numpy array of all non-numeric columns or None
+    label_columns: ty.Optional[ty.List[str]]  # names of the non-numeric columns, if the input has a header
+
+
+def _import_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("numpy is required for load_input_array - please install numpy!")
+    return np
+
+
+def get_cache_dir() -> pathlib.Path:
+    """returns the cache directory - from ``FG_ARRAY_CACHE_DIR`` or in the temporary directory"""
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return pathlib.Path(cache_dir)
+    return pathlib.Path(tempfile.gettempdir()) / 'fastgenomics-array-cache'
+
+
+def get_cache_size() -> int:
+    """returns the maximum size of the cache in bytes - from ``FG_ARRAY_CACHE_SIZE``"""
+    return int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE))
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: pathlib.Path) -> str:
+    """returns the SHA-256 of the content of a file"""
+    return _integrity.hash_file(path, 'sha256')
+
+
+def _temp_path(path: pathlib.Path, suffix: str) -> pathlib.Path:
+    """creates a unique temporary file next to path - unique across processes and threads"""
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{path.name}.', suffix=suffix, dir=str(path.parent))
+    os.close(fd)
+    return pathlib.Path(tmp_path)
+
+
+def _write_json(path: pathlib.Path, content: dict):
+    tmp_path = _temp_path(path, '.tmp')
+    try:
+        tmp_path.write_text(json.dumps(content), encoding='utf-8')
+        os.replace(str(tmp_path), str(path))
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _read_json(path: pathlib.Path) -> ty.Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def _save_npy(array_blocks: ty.Iterable, path: pathlib.Path, dtype, n_columns: int) -> int:
+    """writes 2D blocks of equal width into an .npy file without holding all of them in memory"""
+    np = _import_numpy()
+    n_rows = 0
+    raw_path, tmp_path = _temp_path(path, '.raw'), _temp_path(path, '.tmp')
+    try:
+        with open(raw_path, 'wb') as raw_f:
+            for block in array_blocks:
+                np.ascontiguousarray(block, dtype=dtype).tofile(raw_f)
+                n_rows += len(block)
+
+        header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False,
+                  'shape': (n_rows, n_columns)}
+        with open(tmp_path, 'wb') as f, open(raw_path, 'rb') as raw_f:
+            np.lib.format.write_array_header_1_0(f, header)
+            shutil.copyfileobj(raw_f, f, _resources.get_resources().block_bytes)
+        os.replace(str(tmp_path), str(path))
+    finally:
+        for temp in (raw_path, tmp_path):
+            if temp.exists():
+                temp.unlink()
+    return n_rows
+
+
+def _label_blocks(blocks_path: pathlib.Path, n_blocks: int, width: int) -> ty.Iterator:
+    """reads the label blocks written by ``convert`` back, padded to a common width"""
+    np = _import_numpy()
+    with open(blocks_path, 'rb') as f:
+        for _ in range(n_blocks):
+            yield np.load(f).astype(f'<U{width}')
+
+
+def convert(source: pathlib.Path, entry: pathlib.Path, dtype: str = 'float64', header: bool = True) -> dict:
+    """
+    parses a delimited text file chunk by chunk into ``<entry>.npy`` (numeric columns)
+    and ``<entry>.labels.npy`` (non-numeric columns) and returns its meta data
+    """
+    np = _import_numpy()
+    chunks = _chunks.iter_chunks(source, parser=_chunks.parse_numeric, header=header,
+                                 open_func=_codecs.open_decompressed)
+    state = {'header': None, 'numeric': None, 'text': None, 'label_blocks': 0, 'label_width': 1}
+    # labels are written block by block and padded to the widest label afterwards
+    labels_path = entry.with_suffix('.labels.npy')
+    label_blocks_path = _temp_path(labels_path, '.blocks')
+
+    def numeric_blocks():
+        for chunk in chunks:
+            if state['numeric'] is None:
+                state['header'] = chunk.header
+                first = chunk.rows[0]
+                state['numeric'] = [i for i, value in enumerate(first) if isinstance(value, (int, float))]
+                state['text'] = [i for i, value in enumerate(first) if not isinstance(value, (int, float))]
+
+            numeric, text = state['numeric'], state['text']
+            if text:
+                label_block = np.array([[str(row[i]) for i in text] for row in chunk.rows], dtype=str)
+                np.save(label_blocks_f, label_block)
+                state['label_blocks'] += 1
+                state['label_width'] = max(state['label_width'], label_block.dtype.itemsize // 4)
+            try:
+                yield np.array([[row[i] for i in numeric] for row in chunk.rows], dtype=dtype)
+            except (ValueError, TypeError, IndexError):
+                raise ValueError(f"{source}: rows {chunk.start_row}-{chunk.start_row + len(chunk.rows)} "
+                                 f"are not numeric in columns {numeric} or have a different number of columns!")
+
+    try:
+        with open(label_blocks_path, 'wb') as label_blocks_f:
+            # the width is known after the first chunk: peek it
+            blocks = numeric_blocks()
+            first_block = next(blocks, None)
+            if first_block is None:
+                raise ValueError(f"{source} does not contain any rows!")
+
+            def all_blocks():
+                yield first_block
+                yield from blocks
+
+            n_rows = _save_npy(all_blocks(), entry.with_suffix('.npy'), dtype, len(state['numeric']))
+        if state['text']:
+            _save_npy(_label_blocks(label_blocks_path, state['label_blocks'], state['label_width']), labels_path,
+                      f"<U{state['label_width']}", len(state['text']))
+    finally:
+        label_blocks_path.unlink()
+
+    column_names, text = state['header'], state['text']
+    return {
+        'format': CACHE_FORMAT,
+        'source': str(source),
+        'rows': n_rows,
+        'columns': None if column_names is None else [column_names[i] for i in state['numeric']],
+        'label_columns': None if column_names is None or not text else [column_names[i] for i in text],
+    }
+
+
+def _entry_files(entry: pathlib.Path) -> ty.List[pathlib.Path]:
+    return [entry.with_suffix(suffix) for suffix in ('.npy', '.labels.npy', '.json')]
+
+
+def evict(cache_dir: pathlib.Path, max_size: int, keep: ty.Iterable[pathlib.Path] = ()):
+    """removes least recently used entries until the cache is smaller than max_size bytes"""
+    keep = {entry.with_suffix('.json') for entry in keep}
+    entries = []
+    for meta in cache_dir.glob('*.json'):
+        if meta.name.startswith('stamp-'):
+            continue
+        files = [path for path in _entry_files(meta.with_suffix('')) if path.exists()]
+        size = sum(path.stat().st_size for path in files)
+        entries.append((meta.stat().st_mtime, size, meta))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, meta in sorted(entries):
+        if total <= max_size:
+            break
+        if meta in keep:
+            continue
+        logger.info(f"Evicting {meta.with_suffix('')} from array cache")
+        for path in _entry_files(meta.with_suffix('')):
+            if path.exists():
+                path.unlink()
+        total -= size
+
+    # remove stamps of evicted entries
+    for stamp in cache_dir.glob('stamp-*.json'):
+        content = _read_json(stamp)
+        if content is None or not (cache_dir / f"{content['entry']}.json").exists():
+            stamp.unlink()
+
+
+def load(source: pathlib.Path, dtype: str = 'float64', header: bool = True,
+         cache_dir: pathlib.Path = None, max_size: int = None) -> ArrayInput:
+    """
+    returns the content of source as memory-mapped arrays - converts it into the cache, if it is not cached yet
+    """
+    np = _import_numpy()
+    cache_dir = pathlib.Path(cache_dir) if cache_dir else get_cache_dir()
+    max_size = get_cache_size() if max_size is None else max_size
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    source = pathlib.Path(source).resolve()
+    stat = source.stat()
+    options = f"{np.dtype(dtype).str}|{header}|{CACHE_FORMAT}"
+    stamp = cache_dir / f"stamp-{_sha256(f'{source}|{stat.st_size}|{stat.st_mtime_ns}|{options}'.encode())}.json"
+
+    # unchanged source: use stamp, else identify the entry by the content hash
+    stamp_content = _read_json(stamp)
+    entry_name = None if stamp_content is None else stamp_content['entry']
+    if entry_name is None or not (cache_dir / f"{entry_name}.json").exists():
+        entry_name = f"{hash_file(source)}-{_sha256(options.encode())[:16]}"
+    entry = cache_dir / entry_name
+
+    meta = _read_json(entry.with_suffix('.json'))
+    if meta is None or not entry.with_suffix('.npy').exists():
+        logger.info(f"Converting {source} into array cache {cache_dir}")
+        start = time.perf_counter()
+        meta = convert(source, entry, dtype=dtype, header=header)
+        _write_json(entry.with_suffix('.json'), meta)
+        logger.info(f"Converted {meta['rows']} rows in {time.perf_counter() - start:.2f}s")
+        evict(cache_dir, max_size, keep=[entry])
+    else:
+        logger.debug(f"Using array cache {entry} for {source}")
+        # update time of last use for LRU eviction
+        os.utime(str(entry.with_suffix('.json')))
+    _write_json(stamp, {'entry': entry_name})
+
+    data = np.load(str(entry.with_suffix('.npy')), mmap_mode='r')
+    labels_file = entry.with_suffix('.labels.npy')
+    labels = np.load(str(labels_file), mmap_mode='r') if labels_file.exists() else None
+    return ArrayInput(data=data, columns=meta['columns'], labels=labels, label_columns=meta['label_columns'])
+
+
+def clear(cache_dir: pathlib.Path = None):
+    """removes all entries of the cache"""
+    evict(pathlib.Path(cache_dir) if cache_dir else get_cache_dir(), max_size=0)
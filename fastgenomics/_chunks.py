@@ -0,0 +1,144 @@
+"""
+FASTGenomics chunked reading helpers: streams delimited text files as blocks of parsed rows.
+
+The dialect is sniffed and the header is parsed only once per file, memory usage is bounded by the chunk size.
+"""
+import csv
+import itertools
+import pathlib
+import typing as ty
+
+from logging import getLogger
+
+from . import _resources
+
+logger = getLogger('fastgenomics.io')
+
+DEFAULT_CHUNK_ROWS = 100_000
+SNIFF_SIZE = 64 * 1024
+DELIMITERS = ',\t;| '
+
+
+class InputChunk(ty.NamedTuple):
+    """block of parsed rows of an input file"""
+    header: ty.Optional[ty.List[str]]
+    rows: ty.List[list]
+    start_row: int  # index of the first row of this chunk, not counting the header
+
+
+def _to_number(value: str):
+    """converts value into an int or float, if possible"""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _column_converter(sample: str) -> ty.Callable[[str], ty.Any]:
+    """guesses a converter for a column based on a sample value"""
+    value = _to_number(sample)
+    if isinstance(value, int):
+        return int
+    if isinstance(value, float):
+        return float
+    return str
+
+
+def parse_text(rows: ty.Iterator[ty.List[str]]) -> ty.Iterator[list]:
+    """keeps all values as str"""
+    return rows
+
+
+def parse_numeric(rows: ty.Iterator[ty.List[str]]) -> ty.Iterator[list]:
+    """converts numeric columns to int or float - the column types are guessed once from the first row"""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    converters = [_column_converter(value) for value in first]
+    numeric = [i for i, convert in enumerate(converters) if convert is not str]
+    yield [_to_number(value) for value in first]
+
+    for row in rows:
+        try:
+            for i in numeric:
+                row[i] = converters[i](row[i])
+            yield row
+        except (ValueError, IndexError):
+            # mixed column types - fall back to converting value by value
+            yield [_to_number(value) if isinstance(value, str) else value for value in row]
+
+
+# parser used for a manifest input type
+PARSERS = {
+    'expressionMatrix': parse_numeric,
+    'geneMatrix': parse_numeric,
+    'batchInformation': parse_text,
+}
+
+
+def get_parser(input_type: str) -> ty.Callable[[ty.Iterator[ty.List[str]]], ty.Iterator[list]]:
+    """returns the row parser for a manifest input type - unknown types are parsed as plain text"""
+    parser = PARSERS.get(input_type)
+    if parser is None:
+        logger.debug(f"No parser registered for input type '{input_type}' - using plain text.")
+        return parse_text
+    return parser
+
+
+def sniff_dialect(sample: str) -> ty.Type[csv.Dialect]:
+    """guesses the csv dialect from a sample of the file, defaults to comma separated values"""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except csv.Error:
+        logger.debug("Could not sniff delimiter - using ','")
+        return csv.excel
+
+
+def _counting_lines(f: ty.TextIO, counter: ty.List[int]) -> ty.Iterator[str]:
+    """iterates over the lines of f and adds the number of characters read to counter[0]"""
+    for line in f:
+        counter[0] += len(line)
+        yield line
+
+
+def iter_chunks(path: pathlib.Path,
+                parser: ty.Callable[[ty.Iterator[ty.List[str]]], ty.Iterator[list]] = parse_text,
+                rows: int = None, bytes: int = None, header: bool = True,
+                open_func: ty.Callable[..., ty.TextIO] = open) -> ty.Iterator[InputChunk]:
+    """
+    yields blocks of at most ``rows`` rows or about ``bytes`` characters of text parsed by ``parser``.
+    If neither is given, chunks end after ``DEFAULT_CHUNK_ROWS`` rows or the chunk budget of the container
+    (``Resources.chunk_bytes``), whatever comes first.
+    """
+    if rows is None and bytes is None:
+        rows, bytes = DEFAULT_CHUNK_ROWS, _resources.get_resources().chunk_bytes
+    if (rows is not None and rows < 1) or (bytes is not None and bytes < 1):
+        raise ValueError("Chunk size has to be positive!")
+
+    with open_func(path, 'rt', encoding='utf-8', newline='') as f:
+        sample = f.read(SNIFF_SIZE)
+        dialect = sniff_dialect(sample)
+        f.seek(0)
+
+        consumed = [0]
+        reader = csv.reader(f if bytes is None else _counting_lines(f, consumed), dialect)
+        header_row = next(reader, None) if header else None
+        parsed = parser(reader)
+
+        start_row = 0
+        while True:
+            consumed[0] = 0
+            block = []
+            for row in (parsed if rows is None else itertools.islice(parsed, rows)):
+                block.append(row)
+                if bytes is not None and consumed[0] >= bytes:
+                    break
+            if not block:
+                return
+            yield InputChunk(header=header_row, rows=block, start_row=start_row)
+            start_row += len(block)
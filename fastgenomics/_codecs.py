@@ -0,0 +1,203 @@
+"""
+FASTGenomics compression helpers: transparent gzip/bz2/lzma support for input and output files.
+
+Inputs are decompressed as a stream, the codec is detected by magic bytes. Outputs are compressed in independent
+blocks on a thread pool (like pigz), resulting in multi-member/multi-stream files readable by any standard tool.
+"""
+import bz2
+import collections
+import concurrent.futures
+import gzip
+import lzma
+import pathlib
+import re
+import typing as ty
+
+from logging import getLogger
+
+from . import _resources
+
+logger = getLogger('fastgenomics.io')
+
+
+class Codec(ty.NamedTuple):
+    """compression codec"""
+    name: str
+    extensions: ty.Tuple[str, ...]
+    magic: ty.Pattern[bytes]  # matched at the start of the file
+    open: ty.Callable[..., ty.IO]
+    compress: ty.Callable[[bytes], bytes]
+
+
+CODECS = {
+    'gzip': Codec(name='gzip', extensions=('.gz', '.gzip'), magic=re.compile(b'\x1f\x8b'), open=gzip.open,
+                  compress=lambda data: gzip.compress(data, compresslevel=6)),
+    # "BZh", the block size and the magic of the first block - or of the end of an empty stream
+    'bz2': Codec(name='bz2', extensions=('.bz2',), magic=re.compile(b'BZh[1-9](1AY&SY|\x17rE8P\x90)'), open=bz2.open,
+                 compress=lambda data: bz2.compress(data, compresslevel=9)),
+    'lzma': Codec(name='lzma', extensions=('.xz', '.lzma'), magic=re.compile(b'\xfd7zXZ\x00'), open=lzma.open,
+                  compress=lambda data: lzma.compress(data, preset=6)),
+}
+MAGIC_SIZE = 10
+
+
+def get_codec(name: str) -> Codec:
+    """returns the codec with the given name"""
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression '{name}' - use one of {list(CODECS)}!")
+    return CODECS[name]
+
+
+def codec_from_extension(path: pathlib.Path) -> ty.Optional[Codec]:
+    """returns the codec matching the file extension of path or None for uncompressed files"""
+    suffix = pathlib.Path(path).suffix.lower()
+    for codec in CODECS.values():
+        if suffix in codec.extensions:
+            return codec
+    return None
+
+
+def codec_from_magic(path: pathlib.Path) -> ty.Optional[Codec]:
+    """returns the codec detected by the magic bytes of path or None for uncompressed files"""
+    with open(path, 'rb') as f:
+        head = f.read(MAGIC_SIZE)
+    for codec in CODECS.values():
+        if codec.magic.match(head):
+            return codec
+    return None
+
+
+def open_decompressed(path: pathlib.Path, mode: str = 'rt', encoding: str = None, newline: str = None) -> ty.IO:
+    """opens path for reading and decompresses it on the fly, if it is compressed"""
+    if mode not in ('r', 'rt', 'rb'):
+        raise ValueError(f"Mode '{mode}' not supported - use 'r', 'rt' or 'rb'!")
+    binary = 'b' in mode
+
+    codec = codec_from_magic(path)
+    if codec is None:
+        if binary:
+            return open(path, 'rb')
+        return open(path, 'rt', encoding=encoding, newline=newline)
+
+    logger.debug(f"Decompressing {path} with {codec.name}")
+    if binary:
+        return codec.open(path, 'rb')
+    return codec.open(path, 'rt', encoding=encoding, newline=newline)
+
+
+class CompressedOutput:
+    """
+    file-like object compressing data in independent blocks of ``block_size`` bytes on a thread pool
+    and writing them in order to the binary file object ``raw``.
+
+    ``raw`` is closed along with this object. If it provides an ``abort`` method (like ``AtomicOutput``),
+    it is aborted when the context is left with an exception.
+    """
+
+    def __init__(self, raw: ty.BinaryIO, codec: Codec, mode: str = 'w', encoding: str = 'utf-8',
+                 block_size: int = None, max_workers: int = None):
+        if mode not in ('w', 'wt', 'wb'):
+            raise ValueError(f"Mode '{mode}' not supported - use 'w', 'wt' or 'wb'!")
+        if block_size is None:
+            block_size = _resources.get_resources().block_bytes
+        if block_size < 1:
+            raise ValueError("Block size has to be positive!")
+
+        self.raw = raw
+        self.codec = codec
+        self.binary = 'b' in mode
+        self.encoding = encoding
+        self.block_size = block_size
+        self.bytes_in = 0
+        self.closed = False
+
+        # compression is CPU bound, zlib, bz2 and lzma release the GIL
+        if max_workers is None:
+            max_workers = _resources.get_resources().cpu_workers
+        self._buffer = bytearray()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix='fastgenomics-compress')
+        # bound the number of blocks in memory
+        self._max_pending = 2 * max_workers
+        self._pending = collections.deque()
+
+    @property
+    def name(self) -> str:
+        return getattr(self.raw, 'name', '')
+
+    @property
+    def stats(self):
+        """statistics of the underlying file - the number of uncompressed bytes is stored in ``bytes_in``"""
+        return getattr(self.raw, 'stats', None)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: ty.Union[str, bytes, bytearray, memoryview]) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if self.binary:
+            if isinstance(data, str):
+                raise TypeError("a bytes-like object is required, not 'str'")
+            raw = data
+        else:
+            if not isinstance(data, str):
+                raise TypeError(f"write() argument must be str, not {type(data).__name__}")
+            raw = data.encode(self.encoding)
+
+        self._buffer += raw
+        self.bytes_in += len(raw)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def writelines(self, lines: ty.Iterable[ty.Union[str, bytes]]):
+        for line in lines:
+            self.write(line)
+
+    def _submit(self, block: bytes):
+        self._pending.append(self._executor.submit(self.codec.compress, block))
+        while len(self._pending) > self._max_pending:
+            self.raw.write(self._pending.popleft().result())
+
+    def flush(self):
+        """compresses the current buffer as own block and writes all finished blocks"""
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        while self._pending:
+            self.raw.write(self._pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.flush()
+        except BaseException:
+            self.abort()
+            raise
+        self.closed = True
+        self._executor.shutdown()
+        self.raw.close()
+
+    def abort(self):
+        """discards all pending blocks and aborts the underlying file, if possible"""
+        if self.closed:
+            return
+        self.closed = True
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown()
+        abort = getattr(self.raw, 'abort', self.raw.close)
+        abort()
+
+    def __enter__(self) -> 'CompressedOutput':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
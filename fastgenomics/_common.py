@@ -10,14 +10,23 @@ If you want to work without docker, you can set two environment variables to eas
 You can set them by environment variables or just call ``fastgenomics.common.set_paths(path_to_app, path_to_data_root)``
 """
 import os
+import re
+import array
 import pathlib
 import json
-import jsonschema
+import hashlib
+import threading
 import typing as ty
-import pkg_resources
-import re
+import types
+import contextvars
+import concurrent.futures
+from collections import abc, UserDict
 
 from logging import getLogger
+from ._version import VERSION
+from . import _metrics
+from . import _scratch
+from . import _resources
 
 logger = getLogger('fastgenomics.common')
 
@@ -29,18 +38,30 @@ SCHEMA_DIR = RESOURCES_PATH / 'schemes'
 DEFAULT_APP_DIR = '/app'
 DEFAULT_DATA_ROOT = '/fastgenomics'
 
+# directory of the optional manifest validation cache
+VALIDATION_CACHE_ENV = 'FG_VALIDATION_CACHE_DIR'
+
+# defer existence checks of input files until their first access
+LAZY_INPUT_CHECK_ENV = 'FG_LAZY_INPUT_CHECK'
+
 # get / set version
-try:
-    with open(RESOURCES_PATH.parent / 'setup.py') as setup_f:
-        VERSION = __version__ = re.search(r"VERSION = '([\d.]+)'", setup_f.read())[1]
-except IOError:
-    VERSION = __version__ = pkg_resources.get_distribution('fastgenomics')
+__version__ = VERSION
 
 # init cache
 _PATHS = {}
 _MANIFEST = {}
 _PARAMETERS = {}
 _INPUT_FILE_MAPPING = {}
+_DIRECTORY_LISTINGS = {}
+_SHARDS = {}
+_SCRATCH = None
+_LOCK = threading.RLock()
+_VALIDATOR = None
+_SCHEMA_KEY = None
+
+# active RunContext - if none is active, the module level cache is used
+_ACTIVE_CONTEXT = contextvars.ContextVar('fastgenomics_run_context', default=None)
+_CONTEXT_TOKENS = contextvars.ContextVar('fastgenomics_run_context_tokens', default=())
 
 
 class NotSupportedError(Exception):
@@ -50,6 +71,7 @@ class NotSupportedError(Exception):
 Parameters = ty.Dict[str, ty.Any]
 PathsDict = ty.Dict[str, pathlib.Path]
 FileMapping = ty.Dict[str, pathlib.Path]
+DirectoryListing = ty.Dict[str, bool]  # name of entry -> entry is a directory
 
 
 class Parameter(ty.NamedTuple):
@@ -61,6 +83,416 @@ class Parameter(ty.NamedTuple):
     optional: bool
     enum: ty.Optional[ty.List[ty.Any]]
     description: str
+    items: ty.Optional[str] = None  # type of the elements of a list parameter
+
+
+def _to_int(value: ty.Any) -> int:
+    """converts value into an int without silently truncating floats"""
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{value!r} is not an integer")
+    return int(value)
+
+
+def _to_bool(value: ty.Any) -> bool:
+    """converts value into a bool - accepts bools and the strings 'true' and 'false' only, unlike ``bool('false')``"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+        return value.strip().lower() == 'true'
+    raise ValueError(f"{value!r} is not a bool")
+
+
+# coercions of the typed getters of ParameterStore by manifest type
+_COERCIONS = {
+    'integer': _to_int,
+    'float': float,
+    'bool': _to_bool,
+    'string': str,
+    'list': tuple,
+    'dict': types.MappingProxyType,
+}
+
+
+# element types of list parameters: (numpy dtype, array typecode, allowed numpy dtype kinds, python types)
+_ITEM_TYPES = {
+    'integer': ('int64', 'q', 'iu', (int,)),
+    'float': ('float64', 'd', 'iuf', (int, float)),
+    'bool': ('bool', 'b', 'b', (bool,)),
+    'string': ('str', None, 'U', (str,)),
+}
+_TEXT_BOOLS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def is_payload_reference(value: ty.Any) -> bool:
+    """checks, if a value references a payload file like ``{"File": "gene_ids.txt"}``"""
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get('File'), str)
+
+
+def _item_is_of_type(items: str, value: ty.Any) -> bool:
+    python_types = _ITEM_TYPES[items][3]
+    return isinstance(value, python_types) and (items == 'bool' or not isinstance(value, bool))
+
+
+class ParameterPayload:
+    """
+    value of a list parameter stored in a payload file, loaded lazily into a compact typed array on first access.
+
+    Text files contain one element per line, ``.json`` files a JSON array and ``.npy`` files a numpy array.
+    With numpy, elements are parsed and validated vectorised into a numpy array, else into an ``array.array``
+    (or a tuple of strings). Elements, which are not of type ``items``, raise a ValueError on loading.
+    """
+
+    def __init__(self, name: str, path: pathlib.Path, items: str = None):
+        if items is not None and items not in _ITEM_TYPES:
+            raise ValueError(f"Unknown element type {items} of parameter {name}!")
+        self.name = name
+        self.path = pathlib.Path(path)
+        self.items = items
+        self._value = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        # identifies the content for cache keys without loading it
+        try:
+            stat = self.path.stat()
+            version = f"{stat.st_size}, {stat.st_mtime_ns}"
+        except OSError:
+            version = "missing"
+        return f"{type(self).__name__}({str(self.path)!r}, items={self.items!r}, {version})"
+
+    @property
+    def reference(self) -> dict:
+        """the payload reference as given in parameters.json, with an absolute path"""
+        return {'File': str(self.path)}
+
+    def load(self) -> ty.Any:
+        """returns the elements of the payload file - loaded on the first call"""
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    if not self.path.exists():
+                        raise FileNotFoundError(f"Payload file {self.path} of parameter {self.name} not found!")
+                    self._value = self._load()
+                    logger.info(f"Loaded {len(self._value)} elements of parameter {self.name} from {self.path}")
+        return self._value
+
+    def _load(self) -> ty.Any:
+        items = self.items or 'string'
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if self.path.suffix == '.npy':
+            if np is None:
+                raise ImportError(f"numpy is required to load {self.path} - please install numpy!")
+            return self._check_kind(np.load(str(self.path), mmap_mode='r'), items)
+        if self.path.suffix == '.json':
+            elements = json.loads(self.path.read_text(encoding='utf-8'))
+            if not isinstance(elements, list):
+                raise ValueError(f"Payload file {self.path} of parameter {self.name} does not contain a list!")
+            if items != 'bool' and any(isinstance(element, bool) for element in elements):
+                # numpy would take true/false for 1/0
+                raise ValueError(f"Elements of payload {self.path} of parameter {self.name} are not all {items}!")
+            if np is not None:
+                values = np.asarray(elements) if elements else np.empty(0, dtype=_ITEM_TYPES[items][0])
+                return self._check_kind(values, items)
+            if not all(_item_is_of_type(items, element) for element in elements):
+                raise ValueError(f"Elements of payload {self.path} of parameter {self.name} are not all {items}!")
+            return self._to_array(elements, items)
+
+        # text: one element per line
+        lines = [line.strip() for line in self.path.read_text(encoding='utf-8').splitlines()]
+        lines = [line for line in lines if line]
+        try:
+            if items == 'bool':
+                elements = [_TEXT_BOOLS[line.lower()] for line in lines]
+            elif items == 'string':
+                elements = lines
+            elif np is not None:
+                return np.array(lines, dtype=_ITEM_TYPES[items][0]) if lines else np.empty(0, _ITEM_TYPES[items][0])
+            else:
+                elements = [_to_int(float(line)) if items == 'integer' else float(line) for line in lines]
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Elements of payload {self.path} of parameter {self.name} are not all {items}: {e}")
+        if np is not None:
+            return np.array(elements, dtype=_ITEM_TYPES[items][0])
+        return self._to_array(elements, items)
+
+    def _check_kind(self, values, items: str):
+        """vectorised validation by the dtype numpy inferred for all elements"""
+        if values.ndim != 1 or (len(values) and values.dtype.kind not in _ITEM_TYPES[items][2]):
+            raise ValueError(f"Elements of payload {self.path} of parameter {self.name} are not all {items} "
+                             f"(got a {values.ndim}D array of {values.dtype})!")
+        return values.astype(_ITEM_TYPES[items][0], copy=False)
+
+    @staticmethod
+    def _to_array(elements: list, items: str) -> ty.Union[array.array, tuple]:
+        typecode = _ITEM_TYPES[items][1]
+        return tuple(elements) if typecode is None else array.array(typecode, elements)
+
+
+def resolve_payloads(definitions: ty.Dict[str, Parameter], values: Parameters,
+                     base_dirs: ty.Dict[str, pathlib.Path]) -> Parameters:
+    """
+    replaces payload references of list parameters by lazily loaded ``ParameterPayload``.
+    Relative paths are resolved against ``base_dirs[name]``.
+    """
+    resolved = dict(values)
+    for name, value in values.items():
+        if definitions[name].type == 'list' and is_payload_reference(value):
+            resolved[name] = ParameterPayload(name, base_dirs[name] / value['File'], items=definitions[name].items)
+    return resolved
+
+
+class LazyParameters(UserDict):
+    """
+    mutable copy of the parameters as returned by ``get_parameters()`` - payload files are loaded on first access of
+    their parameter. Use ``dict(parameters)`` for a plain dict with all payloads loaded.
+    """
+
+    def __getitem__(self, name: str) -> ty.Any:
+        value = self.data[name]
+        if isinstance(value, ParameterPayload):
+            return value.load()
+        return value
+
+
+class ParameterStore(abc.Mapping):
+    """
+    Immutable mapping of parameter names to their current values as returned by ``get_parameter_store()``.
+
+    Lookups by ``store[name]`` are O(1). The typed getters return values coerced once on creation according to their
+    type in the manifest.json - lists are returned as tuples and dicts as read-only views.
+    List parameters given by a payload file are loaded on their first access and returned as typed arrays.
+    """
+    __slots__ = ('_definitions', '_values', '_typed', '_view')
+
+    def __init__(self, definitions: ty.Dict[str, Parameter], values: ty.Dict[str, ty.Any] = None):
+        if values is None:
+            values = {name: param.value for name, param in definitions.items()}
+
+        typed = {}
+        for name, value in values.items():
+            coerce = _COERCIONS.get(definitions[name].type)
+            if coerce is None or value is None or isinstance(value, ParameterPayload):
+                continue
+            try:
+                typed[name] = coerce(value)
+            except (TypeError, ValueError):
+                pass  # reported by check_parameter_types, raised on access by the typed getters
+
+        object.__setattr__(self, '_definitions', dict(definitions))
+        object.__setattr__(self, '_values', dict(values))
+        object.__setattr__(self, '_typed', typed)
+        object.__setattr__(self, '_view', types.MappingProxyType(self._values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, name: str) -> ty.Any:
+        value = self._values[name]
+        if isinstance(value, ParameterPayload):
+            return value.load()
+        return value
+
+    def __iter__(self) -> ty.Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._values!r})"
+
+    @property
+    def view(self) -> ty.Mapping[str, ty.Any]:
+        """read-only view of all current values - payloads are not loaded"""
+        return self._view
+
+    @property
+    def definitions(self) -> ty.Mapping[str, Parameter]:
+        """read-only view of the parameter definitions of the manifest.json"""
+        return types.MappingProxyType(self._definitions)
+
+    def parameter(self, name: str) -> Parameter:
+        """returns the Parameter entry of name with its current value"""
+        return _update_param_value(self._definitions[name], self._values[name])
+
+    def as_dict(self) -> LazyParameters:
+        """returns a mutable copy of all current values - payloads are loaded on their first access"""
+        return LazyParameters(self._values)
+
+    def _get_typed(self, name: str, type_name: str) -> ty.Any:
+        value = self._values[name]
+        if value is None:
+            return None
+        if isinstance(value, ParameterPayload):
+            return value.load()
+        if self._definitions[name].type == type_name and name in self._typed:
+            return self._typed[name]
+        return _COERCIONS[type_name](value)
+
+    def get_int(self, name: str) -> ty.Optional[int]:
+        return self._get_typed(name, 'integer')
+
+    def get_float(self, name: str) -> ty.Optional[float]:
+        return self._get_typed(name, 'float')
+
+    def get_bool(self, name: str) -> ty.Optional[bool]:
+        return self._get_typed(name, 'bool')
+
+    def get_str(self, name: str) -> ty.Optional[str]:
+        return self._get_typed(name, 'string')
+
+    def get_list(self, name: str) -> ty.Optional[ty.Union[tuple, ty.Sequence]]:
+        return self._get_typed(name, 'list')
+
+    def get_dict(self, name: str) -> ty.Optional[ty.Mapping[str, ty.Any]]:
+        return self._get_typed(name, 'dict')
+
+
+class _ModuleState:
+    """cache of the process wide default run, stored in the module level variables"""
+
+    @property
+    def lock(self) -> threading.RLock:
+        return _LOCK
+
+    @property
+    def paths(self) -> PathsDict:
+        return _PATHS
+
+    @paths.setter
+    def paths(self, value: PathsDict):
+        global _PATHS
+        _PATHS = value
+
+    @property
+    def manifest(self) -> dict:
+        return _MANIFEST
+
+    @manifest.setter
+    def manifest(self, value: dict):
+        global _MANIFEST
+        _MANIFEST = value
+
+    @property
+    def parameters(self) -> ty.Union[dict, 'ParameterStore']:
+        return _PARAMETERS
+
+    @parameters.setter
+    def parameters(self, value: 'ParameterStore'):
+        global _PARAMETERS
+        _PARAMETERS = value
+
+    @property
+    def input_file_mapping(self) -> FileMapping:
+        return _INPUT_FILE_MAPPING
+
+    @input_file_mapping.setter
+    def input_file_mapping(self, value: FileMapping):
+        global _INPUT_FILE_MAPPING
+        _INPUT_FILE_MAPPING = value
+
+    @property
+    def directory_listings(self) -> ty.Dict[pathlib.Path, DirectoryListing]:
+        return _DIRECTORY_LISTINGS
+
+    @directory_listings.setter
+    def directory_listings(self, value: ty.Dict[pathlib.Path, DirectoryListing]):
+        global _DIRECTORY_LISTINGS
+        _DIRECTORY_LISTINGS = value
+
+    @property
+    def shards(self) -> ty.Dict[pathlib.Path, ty.List[pathlib.Path]]:
+        return _SHARDS
+
+    @shards.setter
+    def shards(self, value: ty.Dict[pathlib.Path, ty.List[pathlib.Path]]):
+        global _SHARDS
+        _SHARDS = value
+
+    @property
+    def scratch(self) -> ty.Optional['_scratch.ScratchSpace']:
+        return _SCRATCH
+
+    @scratch.setter
+    def scratch(self, value: ty.Optional['_scratch.ScratchSpace']):
+        global _SCRATCH
+        _SCRATCH = value
+
+
+_MODULE_STATE = _ModuleState()
+
+
+class RunContext:
+    """
+    Run of an app on one data root with its own cache of paths, manifest, input_file_mapping and parameters.
+
+    Within ``with context:`` all functions of ``fastgenomics.io`` use this context instead of the module wide cache.
+    The activation is stored in a ``contextvars.ContextVar``, so it is local to the current thread or asyncio task
+    and a single context can be used by many threads at once::
+
+        with fg_io.context(app_dir, data_root) as ctx:
+            my_input = fg_io.get_input_path('my_input_key')
+
+    New threads do not inherit the active context - use ``with ctx:`` or ``ctx.run(func, ...)`` within them.
+    """
+
+    def __init__(self, app_dir: str = None, data_root: str = None):
+        self.lock = threading.RLock()
+        self.paths = {}  # type: PathsDict
+        self.manifest = {}  # type: dict
+        self.parameters = {}  # type: ty.Union[dict, ParameterStore]
+        self.input_file_mapping = {}  # type: FileMapping
+        self.directory_listings = {}  # type: ty.Dict[pathlib.Path, DirectoryListing]
+        self.shards = {}  # type: ty.Dict[pathlib.Path, ty.List[pathlib.Path]]
+        self.scratch = None  # type: ty.Optional[_scratch.ScratchSpace]
+        with self:
+            set_paths(app_dir, data_root)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(app_dir={self.paths.get('app')}, data={self.paths.get('data')})"
+
+    def __enter__(self) -> 'RunContext':
+        token = _ACTIVE_CONTEXT.set(self)
+        _CONTEXT_TOKENS.set(_CONTEXT_TOKENS.get() + (token,))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        tokens = _CONTEXT_TOKENS.get()
+        _CONTEXT_TOKENS.set(tokens[:-1])
+        _ACTIVE_CONTEXT.reset(tokens[-1])
+
+    def run(self, func: ty.Callable, *args, **kwargs) -> ty.Any:
+        """calls func within this context"""
+        with self:
+            return func(*args, **kwargs)
+
+    def get_paths(self) -> PathsDict:
+        return self.run(get_paths)
+
+    def get_app_manifest(self) -> dict:
+        return self.run(get_app_manifest)
+
+    def get_input_file_mapping(self, check_mapping: bool = True) -> FileMapping:
+        return self.run(get_input_file_mapping, check_mapping=check_mapping)
+
+    def get_parameter_store(self) -> 'ParameterStore':
+        return self.run(get_parameter_store)
+
+    def get_parameters(self) -> 'LazyParameters':
+        return self.run(get_parameters)
+
+    def get_parameter(self, param_key: str) -> ty.Any:
+        return self.run(get_parameter, param_key)
+
+
+def get_state() -> ty.Union[RunContext, _ModuleState]:
+    """returns the active RunContext or the module wide cache"""
+    context = _ACTIVE_CONTEXT.get()
+    return _MODULE_STATE if context is None else context
 
 
 def running_within_docker() -> bool:
@@ -114,7 +546,6 @@ def set_paths(app_dir: str = None, data_root: str = None):
     data_root: str, optional
       path to root directory of input/output/config/summary
     """
-    global _PATHS
     if running_within_docker() is True:
         if any([app_dir, data_root, os.environ.get("FG_APP_DIR"), os.environ.get("FG_DATA_ROOT")]):
             logger.warning("Running within docker - non-default paths may result in errors!")
@@ -141,13 +572,119 @@ def set_paths(app_dir: str = None, data_root: str = None):
 
     # check and set
     check_paths(paths)
-    _PATHS = paths
+    state = get_state()
+    state.paths = paths
+    state.directory_listings = {}
+    state.shards = {}
+
+
+def _list_directory(directory: pathlib.Path) -> DirectoryListing:
+    """returns the names of all existing entries of directory and if they are directories - omits broken symlinks"""
+    try:
+        with os.scandir(str(directory)) as entries:
+            return {entry.name: entry.is_dir() for entry in entries
+                    if not entry.is_symlink() or os.path.exists(entry.path)}
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+
+
+def list_directories(directories: ty.Iterable[pathlib.Path],
+                     max_workers: int = None) -> ty.Dict[pathlib.Path, DirectoryListing]:
+    """
+    lists the given directories with one ``os.scandir`` per directory on a thread pool.
+    The listings are cached for the rest of the run.
+    """
+    listings = get_state().directory_listings
+    to_list = [directory for directory in set(directories) if directory not in listings]
 
+    if len(to_list) == 1:
+        listings[to_list[0]] = _list_directory(to_list[0])
+    elif to_list:
+        if max_workers is None:
+            max_workers = _resources.get_resources().io_workers
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                   thread_name_prefix='fastgenomics-scandir') as executor:
+            listings.update(zip(to_list, executor.map(_list_directory, to_list)))
+    return {directory: listings[directory] for directory in directories}
+
+
+def input_exists(path: pathlib.Path) -> bool:
+    """checks the existence of an input file - uses the cached listing of its directory, if available"""
+    listing = get_state().directory_listings.get(path.parent)
+    if listing is None:
+        return path.exists()
+    return path.name in listing
+
+
+def find_missing_files(paths: ty.Iterable[pathlib.Path], max_workers: int = None) -> ty.List[pathlib.Path]:
+    """returns all paths, which do not exist - checked by listing their parent directories concurrently"""
+    paths = list(paths)
+    listings = list_directories([path.parent for path in paths], max_workers=max_workers)
+    return [path for path in paths if path.name not in listings[path.parent]]
+
+
+def _has_glob_chars(part: str) -> bool:
+    return any(char in part for char in '*?[')
+
+
+def _relative_to_data(path: pathlib.Path) -> pathlib.Path:
+    """returns the part of an entry of the input_file_mapping given in the mapping - relative to the data dir"""
+    try:
+        return path.relative_to(get_paths()['data'])
+    except ValueError:
+        return path
 
-def check_input_file_mapping(input_file_mapping: FileMapping):
+
+def is_glob(path: pathlib.Path) -> bool:
+    """
+    checks, if an entry of the input_file_mapping is a glob pattern. Only the relative path given in the mapping is
+    checked, not the data root - and an existing file or directory of that name is never a pattern.
+    """
+    return _has_glob_chars(str(_relative_to_data(path))) and not path.exists()
+
+
+def _natural_key(path: pathlib.Path) -> ty.List[ty.Union[int, str]]:
+    """sort key ordering part-2 before part-10"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', str(path))]
+
+
+def resolve_shards(path: pathlib.Path) -> ty.List[pathlib.Path]:
+    """
+    returns the files of a sharded input in natural sort order: all files matching a glob pattern,
+    all non-hidden files of a directory or the file itself. The result is cached for the rest of the run.
+    """
+    shards = get_state().shards
+    if path in shards:
+        return shards[path]
+
+    if is_glob(path):
+        parts = _relative_to_data(path).parts
+        first_glob = next(i for i, part in enumerate(parts) if _has_glob_chars(part))
+        base = path.parents[len(parts) - first_glob - 1]
+        pattern = str(pathlib.Path(*parts[first_glob:]))
+        files = [entry for entry in base.glob(pattern) if entry.is_file()]
+    elif path.is_dir():
+        files = [entry for entry in path.iterdir() if entry.is_file() and not entry.name.startswith('.')]
+    else:
+        files = [path] if path.exists() else []
+
+    shards[path] = sorted(files, key=_natural_key)
+    return shards[path]
+
+
+def lazy_input_check() -> bool:
+    """checks, if the lazy mode is enabled by the environment variable ``FG_LAZY_INPUT_CHECK``"""
+    return os.environ.get(LAZY_INPUT_CHECK_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def check_input_file_mapping(input_file_mapping: FileMapping, lazy: bool = None, max_workers: int = None):
     """checks the keys in input_file_mapping and existence of the files
 
     raises a KeyError on missing Key and FileNotFoundError on missing file
+
+    The files are checked by listing their directories concurrently on ``max_workers`` threads.
+    In lazy mode (default: environment variable ``FG_LAZY_INPUT_CHECK``), the existence of files is not checked
+    until they are accessed by ``get_input_path``.
     """
     manifest = get_app_manifest()['Input']
 
@@ -168,9 +705,25 @@ def check_input_file_mapping(input_file_mapping: FileMapping):
         raise KeyError(f"Non-optional keys not defined in input_file_mapping: {missing}")
 
     # check for existence
-    for entry in input_file_mapping.values():
-        if not entry.exists():
-            raise FileNotFoundError(f"{entry}, defined in input_file_mapping, not found!")
+    if lazy is None:
+        lazy = lazy_input_check()
+    if lazy:
+        logger.debug("Lazy mode: existence of input files is checked on first access.")
+        return
+
+    globs = [entry for entry in input_file_mapping.values() if is_glob(entry)]
+    entries = [entry for entry in input_file_mapping.values() if not is_glob(entry)]
+
+    missing_files = find_missing_files(entries, max_workers=max_workers)
+    if missing_files:
+        raise FileNotFoundError(f"{missing_files[0]}, defined in input_file_mapping, not found!")
+
+    # sharded inputs: directories and glob patterns need at least one file
+    listings = get_state().directory_listings
+    directories = [entry for entry in entries if listings[entry.parent][entry.name]]
+    for entry in globs + directories:
+        if not resolve_shards(entry):
+            raise FileNotFoundError(f"{entry}, defined in input_file_mapping, does not contain any files!")
 
 
 def str_to_path_file_mapping(relative_mapping: ty.Dict[str, str]) -> FileMapping:
@@ -210,11 +763,20 @@ def load_input_file_mapping() -> ty.Dict[str, str]:
 
 def get_input_file_mapping(check_mapping: bool = True) -> FileMapping:
     """returns the input_file_mapping either from environment `INPUT_FILE_MAPPING` or from config file"""
-    global _INPUT_FILE_MAPPING
+    state = get_state()
+
+    if state.input_file_mapping:
+        return state.input_file_mapping
+
+    with state.lock:
+        if not state.input_file_mapping:
+            state.input_file_mapping = _load_input_file_mapping(check_mapping)
+    return state.input_file_mapping
 
-    if _INPUT_FILE_MAPPING:
-        return _INPUT_FILE_MAPPING
 
+@_metrics.timed('input_file_mapping')
+def _load_input_file_mapping(check_mapping: bool) -> FileMapping:
+    """loads, converts and checks the input_file_mapping"""
     # load mapping
     ifm_dict = load_input_file_mapping()
 
@@ -225,9 +787,7 @@ def get_input_file_mapping(check_mapping: bool = True) -> FileMapping:
     if check_mapping:
         check_input_file_mapping(input_file_mapping)
 
-    # update cache and return
-    _INPUT_FILE_MAPPING = input_file_mapping
-    return _INPUT_FILE_MAPPING
+    return input_file_mapping
 
 
 def get_paths() -> PathsDict:
@@ -236,9 +796,28 @@ def get_paths() -> PathsDict:
 
     if paths are not initialized, it runs ``set_paths(DEFAULT_APP_DIR, DEFAULT_DATA_ROOT)``
     """
-    if not _PATHS:
-        set_paths()
-    return _PATHS
+    state = get_state()
+    if not state.paths:
+        with state.lock:
+            if not state.paths:
+                set_paths()
+    return state.paths
+
+
+def get_manifest_validator():
+    """returns the validator for our JSON-Schema - it is compiled only once per process"""
+    global _VALIDATOR
+
+    if _VALIDATOR is None:
+        # imported lazily, as it is slow to import and only needed for validation
+        import jsonschema
+
+        with open(SCHEMA_DIR / 'manifest_schema.json', encoding='utf-8') as f:
+            schema = json.load(f)
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        _VALIDATOR = validator_class(schema)
+    return _VALIDATOR
 
 
 def assert_manifest_is_valid(config: dict):
@@ -246,9 +825,7 @@ def assert_manifest_is_valid(config: dict):
     Asserts that the manifest (``manifest.json``) matches our JSON-Schema.
     If not a ``jsonschema.ValidationError`` will be raised.
     """
-    with open(SCHEMA_DIR / 'manifest_schema.json', encoding='utf-8') as f:
-        schema = json.load(f)
-    jsonschema.validate(config, schema)
+    get_manifest_validator().validate(config)
 
     parameters = config["FASTGenomicsApplication"]["Parameters"]
     if parameters is not None:
@@ -260,89 +837,150 @@ def assert_manifest_is_valid(config: dict):
             warn_if_not_of_type(name, expected_type, enum, default_value, optional, is_default=True)
 
 
+def get_schema_key() -> str:
+    """returns a hash of the JSON-Schema and the module version, identifying the validation rules"""
+    global _SCHEMA_KEY
+
+    if _SCHEMA_KEY is None:
+        schema_hash = hashlib.sha256((SCHEMA_DIR / 'manifest_schema.json').read_bytes())
+        schema_hash.update(VERSION.encode())
+        _SCHEMA_KEY = schema_hash.hexdigest()[:16]
+    return _SCHEMA_KEY
+
+
+def get_validation_cache_entry(manifest_bytes: bytes) -> ty.Optional[pathlib.Path]:
+    """
+    returns the path marking a valid manifest in the validation cache or None, if the cache is disabled.
+    The cache is enabled by setting the environment variable ``FG_VALIDATION_CACHE_DIR`` to a directory.
+    """
+    cache_dir = os.environ.get(VALIDATION_CACHE_ENV)
+    if not cache_dir:
+        return None
+
+    manifest_hash = hashlib.sha256(manifest_bytes).hexdigest()
+    return pathlib.Path(cache_dir) / f"manifest-{manifest_hash}-{get_schema_key()}.valid"
+
+
+def mark_manifest_valid(cache_entry: pathlib.Path):
+    """stores a manifest as valid in the validation cache - errors are logged, but ignored"""
+    try:
+        cache_entry.parent.mkdir(parents=True, exist_ok=True)
+        cache_entry.touch()
+    except OSError as e:
+        logger.debug(f"Could not write validation cache {cache_entry}: {e}")
+
+
 def get_app_manifest() -> dict:
     """
     Parses and returns the app manifest.json
 
     Raises a RuntimeError of manifest.json does not exist.
     """
-    global _MANIFEST
+    state = get_state()
 
     # use cache
-    if _MANIFEST:
-        return _MANIFEST
+    if state.manifest:
+        return state.manifest
+
+    with state.lock:
+        if not state.manifest:
+            state.manifest = _load_app_manifest()
+    return state.manifest
 
+
+@_metrics.timed('manifest')
+def _load_app_manifest() -> dict:
+    """loads and validates the manifest.json"""
     manifest_file = get_paths()['app'] / 'manifest.json'
     if not manifest_file.exists():
         err_msg = (f"App manifest {manifest_file} not found! "
                    "Please provide a manifest.json in the application's root-directory.")
         raise RuntimeError(err_msg)
-    with open(manifest_file, encoding='utf-8') as f:
-        try:
-            config = json.load(f)
-            assert_manifest_is_valid(config)
-            # update cache
-            _MANIFEST = config['FASTGenomicsApplication']
-        except json.JSONDecodeError:
-            err_msg = f"App manifest {manifest_file} not a valid JSON-file - check syntax!"
-            raise RuntimeError(err_msg)
+    manifest_bytes = manifest_file.read_bytes()
+    try:
+        config = json.loads(manifest_bytes.decode('utf-8'))
+    except json.JSONDecodeError:
+        err_msg = f"App manifest {manifest_file} not a valid JSON-file - check syntax!"
+        raise RuntimeError(err_msg)
+
+    # skip validation, if this exact manifest has already been validated
+    cache_entry = get_validation_cache_entry(manifest_bytes)
+    if cache_entry is not None and cache_entry.exists():
+        logger.debug(f"Manifest {manifest_file} already validated - using validation cache.")
+    else:
+        assert_manifest_is_valid(config)
+        if cache_entry is not None:
+            mark_manifest_valid(cache_entry)
 
-    return _MANIFEST
+    return config['FASTGenomicsApplication']
 
 
-def get_parameters() -> Parameters:
-    """Returns a dict of all parameters along with it's current value provided by parameters.json
-    or defaults defined in manifest.json"""
-    global _PARAMETERS
+def get_parameter_store() -> ParameterStore:
+    """Returns an immutable ``ParameterStore`` of all parameters along with their current value provided by
+    parameters.json or defaults defined in manifest.json"""
+    state = get_state()
+
+    # use cache
+    if state.parameters:
+        return state.parameters
+
+    with state.lock:
+        if not state.parameters:
+            state.parameters = _load_parameter_store()
+    return state.parameters
 
-    # use cache and return dict of {param: current value}
-    if _PARAMETERS:
-        return {name: param.value for name, param in _PARAMETERS.items()}
 
-    # else: load parameters
+@_metrics.timed('parameters')
+def _load_parameter_store() -> ParameterStore:
+    """loads the parameters from manifest.json and parameters.json"""
+    # load parameters
     parameters = load_parameters_from_manifest()
+    values = {name: param.value for name, param in parameters.items()}
     runtime_parameters = load_runtime_parameters()
 
-    # merge with defaults
+    # merge with defaults - payload files of defaults are relative to the app, of runtime parameters to the config
+    paths = get_paths()
+    base_dirs = {name: paths['app'] for name in parameters}
     for name, current_value in runtime_parameters.items():
         if name not in parameters:
             logger.warning(f"Ignoring runtime parameter {name}, as it is not defined in manifest.json!")
             continue
-        parameters[name] = _update_param_value(parameters[name], current_value)
+        values[name] = current_value
+        base_dirs[name] = paths['config']
+    values = resolve_payloads(parameters, values, base_dirs)
 
     # check types
-    check_parameter_types(parameters)
+    check_parameter_types(parameters, values)
 
-    # update cache and return
-    _PARAMETERS = parameters
-    return get_parameters()
+    return ParameterStore(parameters, values)
+
+
+def get_parameters() -> LazyParameters:
+    """Returns a dict of all parameters along with it's current value provided by parameters.json
+    or defaults defined in manifest.json - payload files are loaded on first access of their parameter"""
+    return get_parameter_store().as_dict()
 
 
 def _update_param_value(param: Parameter, new_value: ty.Any):
     """helper function for updating the value of a Parameter instance"""
-    return Parameter(name=param.name,
-                     type=param.type,
-                     value=new_value,
-                     default=param.default,
-                     optional=param.optional,
-                     enum=param.enum,
-                     description=param.description)
+    return param._replace(value=new_value)
 
 
 def get_parameter(param_key: str):
     """Returns the specific parameter 'param_key' from the parameters"""
-    parameters = get_parameters()
+    parameters = get_parameter_store()
 
     # check for existence and return or raise exception
-    if param_key not in parameters:
+    try:
+        return parameters[param_key]
+    except KeyError:
         raise ValueError(f"Parameter {param_key} not defined in manifest.json!")
-    return parameters[param_key]
 
 
 def get_default_parameters() -> Parameters:
     """returns the default parameters defined in the manifest.json"""
-    parameters = get_parameters()
-    return {param: value.default for param, value in parameters.items()}
+    definitions = get_parameter_store().definitions
+    return {name: param.default for name, param in definitions.items()}
 
 
 def load_runtime_parameters() -> Parameters:
@@ -376,13 +1014,15 @@ def load_parameters_from_manifest() -> ty.Dict[str, Parameter]:
                             default=value.get('Default'),
                             optional=value.get('Optional', False),
                             enum=value.get('Enum'),
-                            description=value['Description'])
+                            description=value['Description'],
+                            items=value.get('Items'))
 
             for name, value in param_section.items()}
 
 
-def value_is_of_type(expected_type: str, enum: ty.Optional[list], value: ty.Any, optional: bool) -> bool:
-    """tests, of a value is an instance of a given an expected type"""
+def value_is_of_type(expected_type: str, enum: ty.Optional[list], value: ty.Any, optional: bool,
+                     items: str = None) -> bool:
+    """tests, of a value is an instance of a given an expected type - and its elements of type items for lists"""
     type_mapping = {
         'float': (int, float),
         'integer': int,
@@ -402,28 +1042,35 @@ def value_is_of_type(expected_type: str, enum: ty.Optional[list], value: ty.Any,
         if expected_type != 'enum':
             raise ValueError(f"Enum provided but type is {expected_type}")
         return value in enum
+    if isinstance(value, ParameterPayload):
+        # validated on loading
+        return expected_type == 'list'
+    if items is not None and expected_type == 'list' and isinstance(value, list):
+        return all(_item_is_of_type(items, element) for element in value)
     return isinstance(value, mapped_type)
 
 
-def check_parameter_types(parameters: Parameters):
-    """checks the correct type of parameters as specified in the manifest.json"""
-    manifest_parameters = load_parameters_from_manifest()
+def check_parameter_types(parameters: ty.Dict[str, Parameter], values: Parameters = None):
+    """checks the correct type of parameters as specified in the manifest.json
 
+    ``values`` overrides the current values of ``parameters``"""
     for param_name, param in parameters.items():
-        manifest_param = manifest_parameters[param_name]
+        value = param.value if values is None else values[param_name]
         # parameter types see manifest_schema.json
         # we do not throw an exception because having multi-value parameters is
         #  common in some libraries, e.g. specify "red" or 24342
-        warn_if_not_of_type(name=param_name, expected_type=manifest_param.type, enum=manifest_param.enum,
-                            value=param.value, optional=manifest_param.optional)
+        warn_if_not_of_type(name=param_name, expected_type=param.type, enum=param.enum,
+                            value=value, optional=param.optional, items=param.items)
 
 
-def warn_if_not_of_type(name, expected_type, enum, value, optional, is_default=False):
-    if value_is_of_type(expected_type, enum, value, optional):
+def warn_if_not_of_type(name, expected_type, enum, value, optional, is_default=False, items=None):
+    if value_is_of_type(expected_type, enum, value, optional, items=items):
         return
 
     msg = f"The {'default ' if is_default else ''}parameter {name} has a different value than expected. "
-    if enum is None:
+    if items is not None and isinstance(value, list):
+        msg += f"It should be a list of {items}, but not all of its elements are. "
+    elif enum is None:
         msg += f"It should be a {expected_type} but is a {type(value)}. "
     else:
         msg += f"It should be one of {enum!r} but is {value!r}. "
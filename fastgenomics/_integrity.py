@@ -0,0 +1,130 @@
+"""
+FASTGenomics integrity helpers: streaming checksums of many files on a thread pool and a JSON sidecar to verify them.
+
+Each entry of the sidecar stores size and mtime of the file at the time it was hashed. Files with unchanged size and
+mtime are not hashed again - neither when the sidecar is updated nor when it is verified.
+"""
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import typing as ty
+
+from logging import getLogger
+
+from . import _resources
+
+logger = getLogger('fastgenomics.io')
+
+ALGORITHMS = ('sha256', 'blake2b')
+SIDECAR_FORMAT = 1
+
+# status of a file after verification
+UNCHANGED = 'unchanged'  # size and mtime are unchanged, not hashed again
+OK = 'ok'  # hashed again, checksum matches
+CHANGED = 'changed'  # hashed again, checksum differs
+MISSING = 'missing'
+
+
+class Checksum(ty.NamedTuple):
+    """checksum of a file along with the stat it was computed for"""
+    path: str
+    size: int
+    mtime_ns: int
+    algorithm: str
+    digest: str
+
+
+def _check_algorithm(algorithm: str):
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Checksum algorithm '{algorithm}' not supported - use one of {ALGORITHMS}!")
+
+
+def hash_file(path: pathlib.Path, algorithm: str = 'sha256', block_size: int = None) -> str:
+    """returns the hex digest of the content of path - read into a reused buffer of block_size bytes"""
+    if block_size is None:
+        block_size = _resources.get_resources().block_bytes
+    if block_size < 1:
+        raise ValueError("Block size has to be positive!")
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        for n_read in iter(lambda: f.readinto(buffer), 0):
+            digest.update(view[:n_read])
+    return digest.hexdigest()
+
+
+def checksum(path: pathlib.Path, algorithm: str = 'sha256', previous: Checksum = None,
+             block_size: int = None) -> Checksum:
+    """returns the checksum of path - reuses previous, if size and mtime of the file are unchanged"""
+    stat = path.stat()
+    if (previous is not None and previous.algorithm == algorithm and previous.path == str(path)
+            and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns):
+        return previous
+    return Checksum(path=str(path), size=stat.st_size, mtime_ns=stat.st_mtime_ns, algorithm=algorithm,
+                    digest=hash_file(path, algorithm, block_size))
+
+
+def compute_checksums(files: ty.Dict[str, pathlib.Path], algorithm: str = 'sha256', max_workers: int = None,
+                      previous: ty.Dict[str, Checksum] = None) -> ty.Dict[str, Checksum]:
+    """returns the checksums of ``{name: path}`` - hashed concurrently on max_workers threads"""
+    _check_algorithm(algorithm)
+    previous = previous or {}
+    names = list(files)
+    # one budget for all files
+    resources = _resources.get_resources()
+    if max_workers is None:
+        max_workers = resources.io_workers
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                               thread_name_prefix='fastgenomics-checksum') as executor:
+        checksums = executor.map(
+            lambda name: checksum(files[name], algorithm, previous.get(name), resources.block_bytes), names)
+        return dict(zip(names, checksums))
+
+
+def write_sidecar(sidecar: pathlib.Path, checksums: ty.Dict[str, Checksum]):
+    """writes the checksums atomically as JSON"""
+    content = {'format': SIDECAR_FORMAT,
+               'files': {name: entry._asdict() for name, entry in sorted(checksums.items())}}
+    tmp_file = sidecar.with_name(f'.{sidecar.name}.{os.getpid()}.tmp')
+    tmp_file.write_text(json.dumps(content, indent=2), encoding='utf-8')
+    os.replace(str(tmp_file), str(sidecar))
+
+
+def read_sidecar(sidecar: pathlib.Path) -> ty.Dict[str, Checksum]:
+    """reads the checksums of a sidecar - returns an empty dict, if there is none"""
+    try:
+        content = json.loads(sidecar.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return {}
+    if content.get('format') != SIDECAR_FORMAT:
+        raise ValueError(f"Unknown format of integrity sidecar {sidecar}!")
+    return {name: Checksum(**entry) for name, entry in content['files'].items()}
+
+
+def _verify_one(entry: Checksum, full: bool, block_size: int = None) -> str:
+    path = pathlib.Path(entry.path)
+    try:
+        current = checksum(path, entry.algorithm, previous=None if full else entry, block_size=block_size)
+    except FileNotFoundError:
+        return MISSING
+    if current is entry:
+        return UNCHANGED
+    return OK if current.digest == entry.digest else CHANGED
+
+
+def verify(checksums: ty.Dict[str, Checksum], max_workers: int = None, full: bool = False) -> ty.Dict[str, str]:
+    """
+    verifies the files of checksums and returns ``{name: status}``.
+    Only files with changed size or mtime are hashed again, unless ``full`` is set.
+    """
+    names = list(checksums)
+    resources = _resources.get_resources()
+    if max_workers is None:
+        max_workers = resources.io_workers
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                               thread_name_prefix='fastgenomics-checksum') as executor:
+        return dict(zip(names, executor.map(
+            lambda name: _verify_one(checksums[name], full, resources.block_bytes), names)))
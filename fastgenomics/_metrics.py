@@ -0,0 +1,253 @@
+"""
+FASTGenomics instrumentation: records wall times of the setup and the I/O of inputs and outputs of a process.
+
+Collection is enabled by the environment variable ``FG_METRICS``. If it is disabled, instrumented functions only pay
+for a lookup of the environment variable and files are returned unwrapped.
+
+At exit of the process, the metrics are appended as "Performance" section to the summary (if paths were set)
+and written as JSON to ``FG_METRICS_FILE`` (if set).
+"""
+import atexit
+import functools
+import json
+import os
+import pathlib
+import threading
+import time
+import typing as ty
+
+from logging import getLogger
+
+logger = getLogger('fastgenomics.io')
+
+METRICS_ENV = 'FG_METRICS'
+METRICS_FILE_ENV = 'FG_METRICS_FILE'
+
+# {name: [calls, seconds]}
+_TIMINGS = {}
+# {(direction, key): [opens, bytes, seconds, stored bytes]} - bytes are uncompressed, stored bytes are on disk
+_IO = {}
+_LOCK = threading.Lock()
+_EXIT_CALLBACKS = []  # called at exit, e.g. to append the summary
+_REGISTERED = False
+
+
+def enabled() -> bool:
+    """checks, if collection is enabled by the environment variable ``FG_METRICS``"""
+    return os.environ.get(METRICS_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def record_time(name: str, seconds: float):
+    with _LOCK:
+        entry = _TIMINGS.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def record_io(direction: str, key: str, bytes: int = 0, seconds: float = 0.0, opens: int = 1,
+              stored_bytes: int = None):
+    """records I/O of ``bytes`` uncompressed bytes - ``stored_bytes`` on disk, if they differ (compression)"""
+    with _LOCK:
+        entry = _IO.setdefault((direction, key), [0, 0, 0.0, 0])
+        entry[0] += opens
+        entry[1] += bytes
+        entry[2] += seconds
+        entry[3] += bytes if stored_bytes is None else stored_bytes
+
+
+def timed(name: str):
+    """decorator recording the wall time of each call as ``name``"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            _register_at_exit()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class CountingReader:
+    """
+    proxy of a file opened for reading, which records the amount of data read (bytes or characters in text mode)
+    and the time from opening to closing. Rewinding to the start (e.g. after sniffing a sample) resets the count.
+    """
+
+    def __init__(self, f: ty.IO, key: str):
+        self._f = f
+        self._key = key
+        self._count = 0
+        self._start = time.perf_counter()
+        self._recorded = False
+
+    def read(self, *args):
+        data = self._f.read(*args)
+        self._count += len(data)
+        return data
+
+    def readline(self, *args):
+        line = self._f.readline(*args)
+        self._count += len(line)
+        return line
+
+    def readlines(self, *args):
+        lines = self._f.readlines(*args)
+        self._count += sum(len(line) for line in lines)
+        return lines
+
+    def readinto(self, buffer):
+        n_read = self._f.readinto(buffer)
+        self._count += n_read or 0
+        return n_read
+
+    def seek(self, offset: int, *args):
+        if offset == 0 and not args:
+            self._count = 0
+        return self._f.seek(offset, *args)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._f)
+        self._count += len(line)
+        return line
+
+    def close(self):
+        if not self._recorded:
+            self._recorded = True
+            record_io('input', self._key, bytes=self._count, seconds=time.perf_counter() - self._start)
+        self._f.close()
+
+    def __getattr__(self, name: str):
+        return getattr(self._f, name)
+
+    def __enter__(self) -> 'CountingReader':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def track_input(f: ty.IO, key: str) -> ty.IO:
+    """returns f wrapped by a ``CountingReader``, if collection is enabled"""
+    if not enabled():
+        return f
+    _register_at_exit()
+    return CountingReader(f, key)
+
+
+def input_opener(key: str, open_func: ty.Callable[..., ty.IO]) -> ty.Callable[..., ty.IO]:
+    """returns open_func, which wraps its files by ``track_input``"""
+    if not enabled():
+        return open_func
+
+    def opener(*args, **kwargs):
+        return track_input(open_func(*args, **kwargs), key)
+    return opener
+
+
+def output_recorder(key: str) -> ty.Optional[ty.Callable[[ty.Any], None]]:
+    """
+    returns a callback recording the ``OutputStats`` of an output, if collection is enabled. For compressed outputs,
+    pass the uncompressed size as ``uncompressed_bytes`` - ``stats.bytes_written`` is recorded as stored bytes then.
+    """
+    if not enabled():
+        return None
+    _register_at_exit()
+
+    def record(stats, uncompressed_bytes: int = None):
+        n_bytes = stats.bytes_written if uncompressed_bytes is None else uncompressed_bytes
+        record_io('output', key, bytes=n_bytes, seconds=stats.seconds, stored_bytes=stats.bytes_written)
+    return record
+
+
+def get_metrics() -> dict:
+    """returns all metrics collected so far"""
+    with _LOCK:
+        metrics = {'timings': {name: {'calls': calls, 'seconds': seconds}
+                               for name, (calls, seconds) in _TIMINGS.items()},
+                   'inputs': {}, 'outputs': {}}
+        for (direction, key), (opens, n_bytes, seconds, stored_bytes) in _IO.items():
+            metrics[f'{direction}s'][key] = {
+                'opens': opens, 'bytes': n_bytes, 'seconds': seconds,
+                'throughput_mib_s': n_bytes / seconds / 1024 ** 2 if seconds > 0 else None}
+            if direction == 'output':
+                metrics['outputs'][key]['stored_bytes'] = stored_bytes
+    return metrics
+
+
+def reset():
+    """removes all metrics collected so far"""
+    with _LOCK:
+        _TIMINGS.clear()
+        _IO.clear()
+
+
+def write_json(path: pathlib.Path, metrics: dict = None):
+    """writes the metrics as JSON to path"""
+    metrics = get_metrics() if metrics is None else metrics
+    pathlib.Path(path).write_text(json.dumps(metrics, indent=2), encoding='utf-8')
+
+
+def format_markdown(metrics: dict = None) -> str:
+    """returns the metrics as "Performance" section in CommonMark"""
+    metrics = get_metrics() if metrics is None else metrics
+    lines = ['', '## Performance', '']
+    if metrics['timings']:
+        lines += ['| Step | Calls | Seconds |', '|---|---:|---:|']
+        lines += [f"| {name} | {entry['calls']} | {entry['seconds']:.3f} |"
+                  for name, entry in sorted(metrics['timings'].items())]
+        lines.append('')
+
+    for direction in ('inputs', 'outputs'):
+        if not metrics[direction]:
+            continue
+        # MiB are uncompressed, outputs also show the MiB stored on disk
+        stored = direction == 'outputs'
+        stored_header, stored_align = (' Stored MiB |', '---:|') if stored else ('', '')
+        lines += [f"| {direction[:-1].capitalize()} | Opens | MiB |{stored_header} Seconds | MiB/s |",
+                  f"|---|---:|---:|{stored_align}---:|---:|"]
+        for key, entry in sorted(metrics[direction].items()):
+            throughput = entry['throughput_mib_s']
+            stored_mib = f" {entry.get('stored_bytes', 0) / 1024 ** 2:.2f} |" if stored else ''
+            lines.append(f"| {key} | {entry['opens']} | {entry['bytes'] / 1024 ** 2:.2f} |{stored_mib} "
+                         f"{entry['seconds']:.3f} | {'-' if throughput is None else f'{throughput:.1f}'} |")
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def append_markdown(summary_file: pathlib.Path, metrics: dict = None):
+    """appends the "Performance" section to the summary file"""
+    with pathlib.Path(summary_file).open('a', encoding='utf-8') as f:
+        f.write(format_markdown(metrics))
+
+
+def add_exit_callback(callback: ty.Callable[[], None]):
+    """adds a callback, which is called at exit of the process, if any metrics were collected"""
+    _EXIT_CALLBACKS.append(callback)
+
+
+def _register_at_exit():
+    global _REGISTERED
+    if not _REGISTERED:
+        _REGISTERED = True
+        atexit.register(_at_exit)
+
+
+def _at_exit():
+    if not enabled() or (not _TIMINGS and not _IO):
+        return
+    metrics_file = os.environ.get(METRICS_FILE_ENV)
+    try:
+        if metrics_file:
+            write_json(pathlib.Path(metrics_file))
+        for callback in _EXIT_CALLBACKS:
+            callback()
+    except Exception as e:
+        logger.warning(f"Could not export metrics: {e}")
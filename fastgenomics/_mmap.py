@@ -0,0 +1,177 @@
+"""
+FASTGenomics memory mapping helpers: read-only, zero-copy access to input files.
+
+Mappings are cached per file and reference counted, so repeated requests for the same input within one run share a
+single mapping instead of holding several copies of the file in memory.
+"""
+import mmap
+import pathlib
+import threading
+import typing as ty
+
+from logging import getLogger
+
+logger = getLogger('fastgenomics.io')
+
+# init cache
+_MAPPINGS = {}
+_PINNED = set()
+_MAPPINGS_LOCK = threading.RLock()
+
+
+class SharedMapping:
+    """reference counted, read-only memory mapping of a single file"""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.refcount = 0
+        with open(path, 'rb') as f:
+            self.size = pathlib.Path(path).stat().st_size
+            # mmap cannot map empty files
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size > 0 else None
+
+    @property
+    def buffer(self) -> memoryview:
+        """read-only memoryview of the whole file"""
+        if self.mmap is None:
+            return memoryview(b'')
+        return memoryview(self.mmap)
+
+    def close(self):
+        """closes the mapping - if views are still exported, the mapping is left to the garbage collector"""
+        if self.mmap is None:
+            return
+        try:
+            self.mmap.close()
+        except BufferError:
+            logger.debug(f"Mapping of {self.path} still has exported views - leaving it to the garbage collector.")
+        self.mmap = None
+
+
+class InputMapping:
+    """
+    handle on a shared read-only mapping of an input file as returned by ``open_input_mmap``.
+
+    Use it as context manager or call ``close()`` to release the reference. The underlying mapping is closed as soon
+    as the last reference is released.
+    """
+
+    def __init__(self, shared: SharedMapping):
+        self._shared = shared
+        self._closed = False
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._shared.path
+
+    @property
+    def size(self) -> int:
+        return self._shared.size
+
+    @property
+    def mmap(self) -> ty.Optional[mmap.mmap]:
+        """the underlying ``mmap.mmap`` object or None for empty files"""
+        self._check_open()
+        return self._shared.mmap
+
+    @property
+    def buffer(self) -> memoryview:
+        """read-only, zero-copy memoryview of the file"""
+        self._check_open()
+        return self._shared.buffer
+
+    def as_numpy(self, dtype: ty.Any = 'uint8', offset: int = 0, count: int = -1):
+        """returns a read-only numpy view on the mapping (requires numpy)"""
+        self._check_open()
+        return buffer_as_numpy(self._shared.buffer, dtype=dtype, offset=offset, count=count)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            release_mapping(self._shared)
+
+    def _check_open(self):
+        if self._closed:
+            raise ValueError(f"Mapping of {self.path} is already closed!")
+
+    def __enter__(self) -> 'InputMapping':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def buffer_as_numpy(buffer: memoryview, dtype: ty.Any = 'uint8', offset: int = 0, count: int = -1):
+    """wraps a buffer into a read-only numpy array without copying"""
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("numpy is required for numpy views on input files - please install numpy!")
+
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+    array.flags.writeable = False
+    return array
+
+
+def acquire(path: pathlib.Path) -> SharedMapping:
+    """returns the shared mapping of path and increases its reference count - maps the file, if needed"""
+    key = pathlib.Path(path).resolve()
+    with _MAPPINGS_LOCK:
+        shared = _MAPPINGS.get(key)
+        if shared is None:
+            logger.debug(f"Memory mapping {key}")
+            shared = _MAPPINGS[key] = SharedMapping(key)
+        shared.refcount += 1
+        return shared
+
+
+def release(path: pathlib.Path):
+    """decreases the reference count of the mapping of path and closes it, if it is not used anymore"""
+    key = pathlib.Path(path).resolve()
+    with _MAPPINGS_LOCK:
+        shared = _MAPPINGS.get(key)
+        if shared is None:
+            return
+        shared.refcount -= 1
+        if shared.refcount <= 0:
+            del _MAPPINGS[key]
+            shared.close()
+
+
+def release_mapping(shared: SharedMapping):
+    """
+    decreases the reference count of shared and closes it, if it is not used anymore. A mapping dropped by
+    ``release_all`` in the meantime is closed without touching a newer mapping of the same file.
+    """
+    with _MAPPINGS_LOCK:
+        shared.refcount -= 1
+        if _MAPPINGS.get(shared.path) is not shared:
+            shared.close()
+        elif shared.refcount <= 0:
+            del _MAPPINGS[shared.path]
+            shared.close()
+
+
+def open_mmap(path: pathlib.Path) -> InputMapping:
+    """opens a reference counted, read-only mapping of path"""
+    return InputMapping(acquire(path))
+
+
+def pinned_buffer(path: pathlib.Path) -> memoryview:
+    """returns a read-only view of path, which stays mapped until ``release_all`` is called"""
+    key = pathlib.Path(path).resolve()
+    with _MAPPINGS_LOCK:
+        if key not in _PINNED:
+            acquire(key)
+            _PINNED.add(key)
+        return _MAPPINGS[key].buffer
+
+
+def release_all():
+    """drops all cached mappings regardless of their reference count"""
+    with _MAPPINGS_LOCK:
+        mappings = list(_MAPPINGS.values())
+        _MAPPINGS.clear()
+        _PINNED.clear()
+    for shared in mappings:
+        shared.close()
@@ -0,0 +1,203 @@
+"""
+FASTGenomics output helpers: atomic, buffered writing of output files.
+
+Data is collected in a large buffer and written to a temporary file in the target directory by a background thread,
+so computation and I/O overlap. The temporary file is renamed to its final name only after all data has been written
+and synced - a crashed app never leaves a partial output file behind.
+"""
+import os
+import pathlib
+import queue
+import threading
+import time
+import typing as ty
+
+from logging import getLogger
+
+from . import _resources
+
+logger = getLogger('fastgenomics.io')
+
+
+class OutputStats(ty.NamedTuple):
+    """statistics of a finished output file"""
+    path: pathlib.Path
+    bytes_written: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """throughput in bytes per second"""
+        return self.bytes_written / self.seconds if self.seconds > 0 else float('inf')
+
+
+class AtomicOutput:
+    """
+    file-like object writing to a temporary file, which is atomically renamed to ``path`` on ``close()``.
+
+    Use it as context manager: if the block raises an exception, the temporary file is removed and ``path`` is left
+    untouched. After closing, ``stats`` holds the number of bytes written and the achieved throughput
+    and is passed to ``on_close``, if given.
+    """
+
+    def __init__(self, path: pathlib.Path, mode: str = 'w', buffer_size: int = None,
+                 encoding: str = 'utf-8', on_close: ty.Callable[[OutputStats], None] = None):
+        if mode not in ('w', 'wt', 'wb'):
+            raise ValueError(f"Mode '{mode}' not supported - use 'w', 'wt' or 'wb'!")
+        if buffer_size is None:
+            buffer_size = _resources.get_resources().buffer_bytes
+        if buffer_size < 1:
+            raise ValueError("Buffer size has to be positive!")
+
+        self.path = pathlib.Path(path)
+        self.binary = 'b' in mode
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self.on_close = on_close
+        self.stats = None  # type: ty.Optional[OutputStats]
+        self.closed = False
+
+        # unlike tempfile.mkstemp, respect the umask for the final file
+        self.tmp_path = self.path.parent / f'.{self.path.name}.{os.urandom(4).hex()}.tmp'
+        fd = os.open(str(self.tmp_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        self._file = os.fdopen(fd, 'wb', buffering=0)
+
+        self._buffer = bytearray()
+        self._bytes_written = 0
+        self._start = time.perf_counter()
+
+        # double buffering: one buffer is filled by the app, one is written by the writer thread
+        self._queue = queue.Queue(maxsize=1)
+        self._error = None  # type: ty.Optional[BaseException]
+        self._writer = threading.Thread(target=self._drain, name=f'fastgenomics-writer-{self.path.name}', daemon=True)
+        self._writer.start()
+
+    @property
+    def name(self) -> str:
+        return str(self.path)
+
+    def writable(self) -> bool:
+        return True
+
+    def _drain(self):
+        """writer thread: writes buffers from the queue until it receives None"""
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[self._file.write(view):]
+            except BaseException as e:
+                self._error = e
+
+    def _check_error(self):
+        if self._error is not None:
+            raise IOError(f"Writing {self.tmp_path} failed: {self._error}") from self._error
+
+    def _submit(self, data: ty.Union[bytes, bytearray]):
+        self._check_error()
+        self._queue.put(data)
+        self._bytes_written += len(data)
+
+    def write(self, data: ty.Union[str, bytes, bytearray, memoryview]) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if self.binary:
+            if isinstance(data, str):
+                raise TypeError("a bytes-like object is required, not 'str'")
+            raw = data
+        else:
+            if not isinstance(data, str):
+                raise TypeError(f"write() argument must be str, not {type(data).__name__}")
+            raw = data.encode(self.encoding)
+
+        self._buffer += raw
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+        return len(data)
+
+    def writelines(self, lines: ty.Iterable[ty.Union[str, bytes]]):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        """hands the current buffer over to the writer thread"""
+        if self._buffer:
+            self._submit(self._buffer)
+            self._buffer = bytearray()
+
+    def _finish_writer(self):
+        self._queue.put(None)
+        self._writer.join()
+
+    def close(self):
+        """writes all remaining data, syncs the file and renames it to its final name"""
+        if self.closed:
+            return
+        try:
+            try:
+                self.flush()
+            finally:
+                self._finish_writer()
+            self._check_error()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(str(self.tmp_path), str(self.path))
+            _fsync_dir(self.path.parent)
+        except BaseException:
+            # no partial output: neither the temporary file nor its descriptor are left behind
+            self._remove_tmp()
+            raise
+        finally:
+            self.closed = True
+
+        self.stats = OutputStats(path=self.path, bytes_written=self._bytes_written,
+                                 seconds=time.perf_counter() - self._start)
+        logger.info(f"Wrote {self.stats.bytes_written} bytes to {self.path} "
+                    f"({self.stats.throughput / 1024 ** 2:.1f} MiB/s)")
+        if self.on_close is not None:
+            self.on_close(self.stats)
+
+    def abort(self):
+        """discards all data written so far and removes the temporary file"""
+        if self.closed:
+            return
+        self.closed = True
+        self._buffer = bytearray()
+        self._finish_writer()
+        self._remove_tmp()
+        logger.warning(f"Discarded incomplete output {self.path}")
+
+    def _remove_tmp(self):
+        self._file.close()
+        try:
+            self.tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> 'AtomicOutput':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _fsync_dir(directory: pathlib.Path):
+    """syncs a directory to persist a rename - not supported on all platforms"""
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
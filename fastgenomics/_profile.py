@@ -0,0 +1,230 @@
+"""
+FASTGenomics profiling helpers: runs a block of code under ``cProfile`` and/or ``tracemalloc``, samples the resident
+set size and writes the profiles into a directory.
+"""
+import contextlib
+import io
+import os
+import pathlib
+import sys
+import threading
+import time
+import tracemalloc
+import typing as ty
+
+from logging import getLogger
+
+logger = getLogger('fastgenomics.io')
+
+PROFILE_ENV = 'FG_PROFILE'
+MODES = ('cpu', 'mem', 'both')
+RSS_SAMPLE_INTERVAL = 0.1
+REPORT_FILE = 'profile.txt'
+PSTATS_FILE = 'profile.pstats'
+
+# recordings tracing memory - tracemalloc is process wide, so it is only stopped by the last one
+_TRACEMALLOC_LOCK = threading.Lock()
+_TRACEMALLOC_STATE = {'recordings': 0, 'started': False}
+
+
+def peak_rss_mb() -> ty.Optional[float]:
+    """returns the peak resident set size of the current process in MiB, if available"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in kilobytes elsewhere
+    return max_rss / 1024 ** 2 if sys.platform == 'darwin' else max_rss / 1024
+
+
+def current_rss_mb() -> ty.Optional[float]:
+    """returns the current resident set size of the current process in MiB, if available (linux only)"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_mode(mode: str = None) -> ty.Optional[str]:
+    """returns the profiling mode - given or from the environment variable ``FG_PROFILE``, None disables profiling"""
+    if mode is None:
+        mode = os.environ.get(PROFILE_ENV, '').strip().lower() or None
+    if mode is not None and mode not in MODES:
+        raise ValueError(f"Profiling mode '{mode}' not supported - use one of {MODES}!")
+    return mode
+
+
+class _RssSampler(threading.Thread):
+    """samples the resident set size, as ``ru_maxrss`` also covers everything before the profiled block"""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        super().__init__(name='fastgenomics-rss-sampler', daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self) -> ty.Optional[float]:
+        self._stopped.set()
+        self.join()
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return self.peak
+
+
+def _start_tracing():
+    """starts tracemalloc for a recording - or joins the recordings already tracing"""
+    with _TRACEMALLOC_LOCK:
+        if _TRACEMALLOC_STATE['recordings'] == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _TRACEMALLOC_STATE['started'] = True
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        _TRACEMALLOC_STATE['recordings'] += 1
+
+
+def _stop_tracing() -> ty.Tuple[ty.Optional[tracemalloc.Snapshot], ty.Optional[int]]:
+    """returns snapshot and peak of the traced memory - tracemalloc is stopped, when the last recording ends"""
+    with _TRACEMALLOC_LOCK:
+        snapshot, traced_peak = None, None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            traced_peak = tracemalloc.get_traced_memory()[1]
+        _TRACEMALLOC_STATE['recordings'] -= 1
+        if _TRACEMALLOC_STATE['recordings'] == 0 and _TRACEMALLOC_STATE['started']:
+            tracemalloc.stop()
+            _TRACEMALLOC_STATE['started'] = False
+    return snapshot, traced_peak
+
+
+class _Recording:
+    """state of one entry into a ``Profile`` block"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.sampler = _RssSampler()
+        self.profiler = None
+        self.start = 0.0
+
+    @property
+    def cpu(self) -> bool:
+        return self.mode in ('cpu', 'both')
+
+    @property
+    def mem(self) -> bool:
+        return self.mode in ('mem', 'both')
+
+
+class Profile(contextlib.ContextDecorator):
+    """
+    context manager and decorator profiling its block with ``mode`` ('cpu', 'mem' or 'both').
+    If ``mode`` is None, it is read from ``FG_PROFILE`` on entering the block - if that is not set either,
+    profiling is disabled and the block runs unchanged.
+
+    On exit, ``profile.pstats`` (cpu) and a report of the ``top`` entries (``profile.txt``) are written into
+    ``output_dir`` - or into the directory returned by ``get_output_dir``.
+
+    Every entry records on its own, so the same instance may be entered recursively - and every call of a
+    decorated function uses a fresh copy, so it may run in several threads at once. Overlapping 'mem' recordings
+    share ``tracemalloc``, which traces the whole process - their memory reports cover all threads.
+    """
+
+    def __init__(self, mode: str = None, top: int = 30, output_dir: pathlib.Path = None,
+                 get_output_dir: ty.Callable[[], pathlib.Path] = None):
+        self.mode = get_mode(mode) if mode is not None else None
+        self.active_mode = None  # type: ty.Optional[str]
+        self.top = top
+        self.output_dir = output_dir
+        self.get_output_dir = get_output_dir
+        self.report_file = None  # type: ty.Optional[pathlib.Path]
+        self._recordings = []  # type: ty.List[ty.Optional[_Recording]]
+
+    def _recreate_cm(self) -> 'Profile':
+        return Profile(mode=self.mode, top=self.top, output_dir=self.output_dir, get_output_dir=self.get_output_dir)
+
+    @property
+    def cpu(self) -> bool:
+        return self.active_mode in ('cpu', 'both')
+
+    @property
+    def mem(self) -> bool:
+        return self.active_mode in ('mem', 'both')
+
+    def __enter__(self) -> 'Profile':
+        self.active_mode = get_mode(self.mode)
+        if self.active_mode is None:
+            self._recordings.append(None)
+            return self
+        logger.info(f"Profiling ({self.active_mode})")
+        recording = _Recording(self.active_mode)
+        self._recordings.append(recording)
+        recording.sampler.start()
+        if recording.mem:
+            _start_tracing()
+        recording.start = time.perf_counter()
+        if recording.cpu:
+            # imported lazily, pstats is slow to import
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # since Python 3.12, only one profiler may be active - the enclosing one covers this block
+                logger.debug("Not profiling CPU of nested block, another profiler is active")
+            else:
+                recording.profiler = profiler
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        recording = self._recordings.pop()
+        if recording is None:
+            return False
+        if recording.profiler is not None:
+            recording.profiler.disable()
+        seconds = time.perf_counter() - recording.start
+        snapshot, traced_peak = None, None
+        if recording.mem:
+            snapshot, traced_peak = _stop_tracing()
+        peak_rss = recording.sampler.stop()
+
+        try:
+            self._write(recording, seconds, peak_rss, snapshot, traced_peak, failed=exc_type is not None)
+        except OSError as e:
+            logger.warning(f"Could not write profile: {e}")
+        return False
+
+    def _write(self, recording: _Recording, seconds: float, peak_rss: ty.Optional[float], snapshot,
+               traced_peak: ty.Optional[int], failed: bool):
+        output_dir = pathlib.Path(self.output_dir) if self.output_dir else self.get_output_dir()
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        process_peak_rss = peak_rss_mb()
+        report = [f"mode: {recording.mode}",
+                  f"wall time: {seconds:.3f}s" + (" (failed)" if failed else ""),
+                  f"peak RSS during block: {'-' if peak_rss is None else f'{peak_rss:.1f} MiB'}",
+                  f"peak RSS of process: {'-' if process_peak_rss is None else f'{process_peak_rss:.1f} MiB'}"]
+
+        if recording.profiler is not None:
+            recording.profiler.dump_stats(str(output_dir / PSTATS_FILE))
+            import pstats
+            stream = io.StringIO()
+            pstats.Stats(recording.profiler, stream=stream).sort_stats('cumulative').print_stats(self.top)
+            report += ['', f'## CPU: top {self.top} by cumulative time', stream.getvalue()]
+
+        if snapshot is not None:
+            report += ['', f'## Memory: top {self.top} allocations by line',
+                       f"peak traced memory: {traced_peak / 1024 ** 2:.1f} MiB"]
+            report += [str(stat) for stat in snapshot.statistics('lineno')[:self.top]]
+
+        self.report_file = output_dir / REPORT_FILE
+        self.report_file.write_text('\n'.join(report) + '\n', encoding='utf-8')
+        logger.info(f"Profile written to {self.report_file}")
@@ -0,0 +1,252 @@
+"""
+FASTGenomics resource discovery: reads the CPU quota and memory limit of the container (cgroup v2 or v1) and derives
+worker counts and chunk sizes, which are used as defaults by all parallel and streaming functions of this package.
+
+Within containers, ``os.cpu_count()`` and the total memory report the host, not what the app may use - so pools
+and chunks sized by them oversubscribe the CPU quota or run out of memory.
+
+The location of the cgroup, the CPU quota and the memory limit are read once per process. The memory usage is read
+again, when it is older than ``RESOURCES_TTL`` seconds, so budgets follow the memory currently available without
+reading ``/proc`` for every single file.
+"""
+import functools
+import math
+import os
+import pathlib
+import threading
+import time
+import typing as ty
+
+from logging import getLogger
+
+logger = getLogger('fastgenomics.io')
+
+CGROUP_ROOT = pathlib.Path('/sys/fs/cgroup')
+PROC_SELF_CGROUP = pathlib.Path('/proc/self/cgroup')
+MEMINFO = pathlib.Path('/proc/meminfo')
+UNLIMITED = 2 ** 60  # cgroup v1 reports "no limit" as a huge number
+RESOURCES_TTL = 1.0  # seconds the memory usage read by get_resources is reused
+
+MAX_IO_WORKERS = 32
+MIN_BLOCK_SIZE = 256 * 1024
+MAX_BLOCK_SIZE = 8 * 1024 * 1024
+MIN_BUFFER_SIZE = 1024 * 1024
+MAX_BUFFER_SIZE = 16 * 1024 * 1024
+MIN_CHUNK_BYTES = 1024 * 1024
+MAX_CHUNK_BYTES = 256 * 1024 * 1024
+BLOCK_ALIGNMENT = 64 * 1024
+
+
+class Limits(ty.NamedTuple):
+    """CPUs and memory available to the process - None, if unknown"""
+    cpus: float  # CPU quota, fractional with cgroup quotas
+    memory_limit: ty.Optional[int]  # bytes of the cgroup memory limit or of the host
+    memory_available: ty.Optional[int]  # bytes still available within the limit
+    source: str  # 'cgroup2', 'cgroup1' or 'host'
+
+
+class Cgroup(ty.NamedTuple):
+    """static limits of the cgroup of the process and the file reporting its current memory usage"""
+    source: str  # 'cgroup2', 'cgroup1' or 'host'
+    cpus: ty.Optional[float]
+    memory_limit: ty.Optional[int]
+    usage_file: ty.Optional[pathlib.Path]
+
+
+class Resources(ty.NamedTuple):
+    """resources available to the app and the derived defaults"""
+    cpus: float
+    memory_limit: ty.Optional[int]
+    memory_available: ty.Optional[int]
+    source: str
+    demands: ty.Tuple[str, ...]
+    cpu_workers: int  # threads or processes for CPU bound work
+    io_workers: int  # threads for I/O bound work
+    process_workers: int  # processes running whole runs, e.g. by ``batch.run_many``
+    chunk_bytes: int  # bytes of text read into one chunk
+    buffer_bytes: int  # buffer of outputs
+    block_bytes: int  # blocks read for hashing and prefetching, blocks compressed concurrently
+
+
+def _read(path: pathlib.Path) -> ty.Optional[str]:
+    try:
+        return path.read_text().strip()
+    except (OSError, ValueError):
+        return None
+
+
+def _read_int(path: pathlib.Path) -> ty.Optional[int]:
+    value = _read(path)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _cgroup_dirs(root: pathlib.Path, controller: str = None) -> ty.List[pathlib.Path]:
+    """returns the cgroup directories of the process (most specific first) - for v1, of ``controller``"""
+    candidates = []
+    for line in (_read(PROC_SELF_CGROUP) or '').splitlines():
+        hierarchy_id, controllers, cgroup_path = line.split(':', 2)
+        relative = cgroup_path.lstrip('/')
+        if controller is None and hierarchy_id == '0' and not controllers:
+            candidates.append(root / relative)
+        elif controller is not None and controller in controllers.split(','):
+            candidates.append(root / controllers / relative)
+    candidates.append(root / controller if controller is not None else root)
+    if controller == 'cpu':
+        candidates.append(root / 'cpu,cpuacct')
+    return [directory for directory in candidates if directory.is_dir()]
+
+
+def _cgroup2_limits(root: pathlib.Path) -> ty.Optional[Cgroup]:
+    """returns the tightest limits of the cgroup v2 of the process and its parents - None, if not mounted"""
+    for directory in _cgroup_dirs(root):
+        if not (directory / 'cgroup.controllers').exists():
+            continue
+        cpus, memory_limit, usage_file = None, None, directory / 'memory.current'
+        # limits of parents apply as well
+        for level in [directory] + [parent for parent in directory.parents if root == parent or root in parent.parents]:
+            cpu_max = (_read(level / 'cpu.max') or 'max').split()
+            if cpu_max[0] != 'max':
+                level_cpus = int(cpu_max[0]) / int(cpu_max[1] if len(cpu_max) > 1 else 100_000)
+                cpus = level_cpus if cpus is None else min(cpus, level_cpus)
+            memory_max = _read(level / 'memory.max')
+            if memory_max and memory_max != 'max' and (memory_limit is None or int(memory_max) < memory_limit):
+                memory_limit, usage_file = int(memory_max), level / 'memory.current'
+        return Cgroup('cgroup2', cpus, memory_limit, usage_file)
+    return None
+
+
+def _cgroup1_limits(root: pathlib.Path) -> ty.Optional[Cgroup]:
+    """returns the limits of cgroup v1 - None, if not mounted"""
+    cpu_dirs, memory_dirs = _cgroup_dirs(root, 'cpu'), _cgroup_dirs(root, 'memory')
+    if not cpu_dirs and not memory_dirs:
+        return None
+    cpus, memory_limit, usage_file = None, None, None
+    for directory in cpu_dirs:
+        quota, period = _read_int(directory / 'cpu.cfs_quota_us'), _read_int(directory / 'cpu.cfs_period_us')
+        if quota is not None and period:
+            cpus = quota / period if quota > 0 else None
+            break
+    for directory in memory_dirs:
+        limit = _read_int(directory / 'memory.limit_in_bytes')
+        if limit is not None:
+            memory_limit = limit if limit < UNLIMITED else None
+            usage_file = directory / 'memory.usage_in_bytes'
+            break
+    return Cgroup('cgroup1', cpus, memory_limit, usage_file)
+
+
+def _host_memory() -> ty.Tuple[ty.Optional[int], ty.Optional[int]]:
+    """returns total and available memory of the host"""
+    meminfo = {}
+    for line in (_read(MEMINFO) or '').splitlines():
+        name, _, value = line.partition(':')
+        if value.strip().endswith('kB'):
+            meminfo[name] = int(value.split()[0]) * 1024
+    total = meminfo.get('MemTotal')
+    if total is None:
+        try:
+            total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        except (AttributeError, ValueError, OSError):
+            total = None
+    return total, meminfo.get('MemAvailable', total)
+
+
+def _host_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def find_cgroup(cgroup_root: pathlib.Path = CGROUP_ROOT) -> Cgroup:
+    """finds the cgroup (v2 or v1) of the process below cgroup_root and reads its CPU quota and memory limit"""
+    for read in (_cgroup2_limits, _cgroup1_limits):
+        cgroup = read(pathlib.Path(cgroup_root))
+        if cgroup is not None:
+            return cgroup
+    return Cgroup('host', None, None, None)
+
+
+def current_limits(cgroup: Cgroup) -> Limits:
+    """combines the limits of cgroup with the CPUs of the host and the memory available right now"""
+    host_cpus = _host_cpus()
+    host_total, host_available = _host_memory()
+    cpus = float(min(cgroup.cpus, host_cpus) if cgroup.cpus is not None else host_cpus)
+    if cgroup.memory_limit is None:
+        return Limits(cpus, host_total, host_available, cgroup.source)
+    memory_usage = (_read_int(cgroup.usage_file) if cgroup.usage_file is not None else None) or 0
+    available = max(0, cgroup.memory_limit - memory_usage)
+    if host_available is not None:
+        available = min(available, host_available)
+    return Limits(cpus, cgroup.memory_limit, available, cgroup.source)
+
+
+def read_limits(cgroup_root: pathlib.Path = CGROUP_ROOT) -> Limits:
+    """reads the CPU quota, memory limit and available memory of the process from the cgroup below cgroup_root"""
+    return current_limits(find_cgroup(cgroup_root))
+
+
+def _clip(value: int, lower: int, upper: int) -> int:
+    return max(lower, min(upper, value))
+
+
+def recommend(limits: Limits, demands: ty.Iterable[str] = ()) -> Resources:
+    """derives worker counts and chunk sizes from limits and the ``Demands`` of the manifest"""
+    demands = tuple(demands)
+    cpu_workers = max(1, math.floor(limits.cpus))
+    io_workers = min(MAX_IO_WORKERS, cpu_workers + 4)
+    # a GPU app does its heavy work on the GPU, which should not be shared by several runs
+    process_workers = 1 if 'GPU' in demands else cpu_workers
+
+    budget = limits.memory_available
+    if budget is None:
+        chunk_bytes, buffer_bytes, block_bytes = 64 * 1024 ** 2, MAX_BUFFER_SIZE, MAX_BLOCK_SIZE
+    else:
+        # parsed rows take many times the memory of their text - and every CPU worker may hold a chunk
+        chunk_bytes = _clip(budget // (16 * cpu_workers), MIN_CHUNK_BYTES, MAX_CHUNK_BYTES)
+        buffer_bytes = _clip(budget // 64, MIN_BUFFER_SIZE, MAX_BUFFER_SIZE)
+        # up to two blocks per I/O worker are in flight
+        block_bytes = _clip(budget // (64 * io_workers), MIN_BLOCK_SIZE, MAX_BLOCK_SIZE)
+        block_bytes -= block_bytes % BLOCK_ALIGNMENT
+    return Resources(cpus=limits.cpus, memory_limit=limits.memory_limit, memory_available=limits.memory_available,
+                     source=limits.source, demands=demands, cpu_workers=cpu_workers, io_workers=io_workers,
+                     process_workers=process_workers, chunk_bytes=chunk_bytes, buffer_bytes=buffer_bytes,
+                     block_bytes=block_bytes)
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_cgroup() -> Cgroup:
+    cgroup = find_cgroup(CGROUP_ROOT)
+    logger.debug(f"Resources from {cgroup.source}: {cgroup.cpus} CPUs, memory limit {cgroup.memory_limit}")
+    return cgroup
+
+
+# limits with the memory available at the given time
+_CURRENT = {'limits': None, 'time': 0.0}  # type: ty.Dict[str, ty.Any]
+_CURRENT_LOCK = threading.Lock()
+
+
+def _current_limits() -> Limits:
+    with _CURRENT_LOCK:
+        now = time.monotonic()
+        if _CURRENT['limits'] is None or now - _CURRENT['time'] >= RESOURCES_TTL:
+            _CURRENT['limits'], _CURRENT['time'] = current_limits(_cached_cgroup()), now
+        return _CURRENT['limits']
+
+
+def get_resources(demands: ty.Tuple[str, ...] = ()) -> Resources:
+    """
+    returns the resources of the process - the limits are cached, the available memory is read again after
+    ``RESOURCES_TTL`` seconds. Compute it once per operation and pass the sizes down to loops over many files.
+    """
+    return recommend(_current_limits(), demands)
+
+
+def clear_cache():
+    """finds the cgroup and reads its limits and the available memory again on the next call of ``get_resources``"""
+    _cached_cgroup.cache_clear()
+    with _CURRENT_LOCK:
+        _CURRENT['limits'] = None
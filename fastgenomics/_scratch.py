@@ -0,0 +1,218 @@
+"""
+FASTGenomics scratch space: fast storage for intermediate files of a run, which is removed at exit.
+
+Scratch files are placed into memory (a tmpfs like ``/dev/shm``) as long as they fit into the memory quota of the run
+and the free space of the tmpfs, else onto disk. Files written by ``ScratchSpace.open`` spill from memory to disk
+on their own, when they grow beyond the quota.
+
+Settings:
+
+``FG_SCRATCH_DIR``: directory on disk, default: the temporary directory
+``FG_SCRATCH_MEMORY_DIR``: tmpfs directory, default: ``/dev/shm`` - set it to an empty string to disable memory
+``FG_SCRATCH_QUOTA``: bytes a run may use in memory, default: half of the free space of the tmpfs, at most a quarter
+of the memory currently available to the container (files on a tmpfs count towards its memory limit)
+"""
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import typing as ty
+import weakref
+
+from logging import getLogger
+
+from . import _resources
+
+logger = getLogger('fastgenomics.io')
+
+SCRATCH_DIR_ENV = 'FG_SCRATCH_DIR'
+MEMORY_DIR_ENV = 'FG_SCRATCH_MEMORY_DIR'
+QUOTA_ENV = 'FG_SCRATCH_QUOTA'
+DEFAULT_MEMORY_DIR = '/dev/shm'
+MEMORY_RESERVE = 64 * 1024 ** 2  # free space left on the tmpfs for others
+SPILL_CHECK_STEP = 4 * 1024 ** 2  # spilling files check the quota every SPILL_CHECK_STEP bytes
+
+
+def get_memory_dir() -> ty.Optional[pathlib.Path]:
+    """returns the tmpfs directory for scratch files - None, if not available"""
+    memory_dir = os.environ.get(MEMORY_DIR_ENV, DEFAULT_MEMORY_DIR)
+    if not memory_dir or not os.path.isdir(memory_dir) or not os.access(memory_dir, os.W_OK):
+        return None
+    return pathlib.Path(memory_dir)
+
+
+def get_disk_dir() -> pathlib.Path:
+    """returns the directory on disk for scratch files"""
+    return pathlib.Path(os.environ.get(SCRATCH_DIR_ENV) or tempfile.gettempdir())
+
+
+def get_quota(memory_dir: ty.Optional[pathlib.Path]) -> int:
+    """returns the memory quota of a run in bytes - from ``FG_SCRATCH_QUOTA`` or by the free space and memory"""
+    quota = os.environ.get(QUOTA_ENV)
+    if quota:
+        return int(quota)
+    if memory_dir is None:
+        return 0
+    quota = shutil.disk_usage(str(memory_dir)).free // 2
+    memory_available = _resources.get_resources().memory_available
+    return quota if memory_available is None else min(quota, memory_available // 4)
+
+
+def _check_name(name: str) -> str:
+    if not name or name in ('.', '..') or '/' in name or os.sep in name:
+        raise ValueError(f"Invalid scratch name '{name}' - use a plain file name!")
+    return name
+
+
+class ScratchSpace:
+    """
+    scratch space of a run - directories in memory and on disk, created on first use and removed by ``cleanup``
+    (at the latest when it is garbage collected or at exit of the process).
+    """
+
+    def __init__(self, memory_dir: pathlib.Path = None, disk_dir: pathlib.Path = None, quota: int = None):
+        self.memory_root = get_memory_dir() if memory_dir is None else pathlib.Path(memory_dir)
+        self.disk_root = get_disk_dir() if disk_dir is None else pathlib.Path(disk_dir)
+        self._quota = quota
+        self._dirs = {}  # type: ty.Dict[str, pathlib.Path]
+        self._entries = {}  # type: ty.Dict[str, ty.Tuple[str, int]]  # name -> (location, reserved bytes)
+        self._lock = threading.RLock()
+        # removes the directories when the space is collected or at exit - without keeping the space alive
+        weakref.finalize(self, _remove_dirs, self._dirs)
+
+    @property
+    def quota(self) -> int:
+        """the memory quota in bytes - without an explicit quota, computed from the memory available right now"""
+        return get_quota(self.memory_root) if self._quota is None else self._quota
+
+    def _dir(self, location: str) -> pathlib.Path:
+        if location not in self._dirs:
+            root = self.memory_root if location == 'memory' else self.disk_root
+            self._dirs[location] = pathlib.Path(tempfile.mkdtemp(prefix='fastgenomics-scratch-', dir=str(root)))
+        return self._dirs[location]
+
+    def memory_used(self, exclude: str = None) -> int:
+        """returns the bytes used or reserved in memory - without the scratch file ``exclude``"""
+        with self._lock:
+            used = 0
+            for name, (location, reserved) in self._entries.items():
+                if location == 'memory' and name != exclude:
+                    path = self._dirs['memory'] / name
+                    used += max(reserved, path.stat().st_size if path.exists() else 0)
+            return used
+
+    def _fits_into_memory(self, size: int, used: int = None) -> bool:
+        if self.memory_root is None:
+            return False
+        used = self.memory_used() if used is None else used
+        if used + size > self.quota:
+            return False
+        return shutil.disk_usage(str(self.memory_root)).free - size >= MEMORY_RESERVE
+
+    def get_path(self, name: str, size_hint: int = 0) -> pathlib.Path:
+        """
+        returns the path of the scratch file ``name`` - in memory, if ``size_hint`` bytes fit into the quota and
+        the free space of the tmpfs, else on disk. The same name always returns the same path.
+        """
+        _check_name(name)
+        with self._lock:
+            if name in self._entries:
+                location, reserved = self._entries[name]
+                if size_hint > reserved:
+                    self._entries[name] = location, size_hint
+                return self._dir(location) / name
+
+            location = 'memory' if self._fits_into_memory(size_hint) else 'disk'
+            self._entries[name] = location, size_hint
+            path = self._dir(location) / name
+        logger.debug(f"Scratch file {name} placed in {location}: {path}")
+        return path
+
+    def open(self, name: str, size_hint: int = 0) -> 'SpillingFile':
+        """opens the scratch file ``name`` for binary writing - it is moved to disk, when it exceeds the quota"""
+        return SpillingFile(self, name, self.get_path(name, size_hint))
+
+    def spill(self, name: str) -> pathlib.Path:
+        """moves the scratch file ``name`` from memory to disk and returns its new path"""
+        with self._lock:
+            location, reserved = self._entries[name]
+            source = self._dir(location) / name
+            if location == 'disk':
+                return source
+            target = self._dir('disk') / name
+            if source.exists():
+                shutil.move(str(source), str(target))
+            self._entries[name] = 'disk', reserved
+        logger.info(f"Scratch file {name} spilled to disk: {target}")
+        return target
+
+    def usage(self) -> ty.Dict[str, ty.Any]:
+        """returns the quota, the bytes used in memory and the location of all scratch files"""
+        with self._lock:
+            return {'quota': self.quota, 'memory_used': self.memory_used(),
+                    'files': {name: location for name, (location, _) in self._entries.items()}}
+
+    def cleanup(self):
+        """removes all scratch files of the run"""
+        with self._lock:
+            _remove_dirs(self._dirs)
+            self._entries.clear()
+
+
+def _remove_dirs(dirs: ty.Dict[str, pathlib.Path]):
+    for directory in dirs.values():
+        shutil.rmtree(str(directory), ignore_errors=True)
+    dirs.clear()
+
+
+class SpillingFile:
+    """
+    scratch file opened for binary writing, which starts in memory and is moved to disk transparently, as soon as
+    the memory used by the run would exceed the quota. ``path`` is the current location of the file.
+    """
+
+    def __init__(self, scratch: ScratchSpace, name: str, path: pathlib.Path):
+        self.scratch = scratch
+        self.name = name
+        self.path = path
+        self._f = path.open('wb')
+        self._in_memory = path.parent == scratch._dirs.get('memory')
+        self._approved = 0  # the file may grow up to this size without checking the quota again
+
+    def write(self, data) -> int:
+        if self._in_memory:
+            end = self._f.tell() + len(data)
+            if end > self._approved:
+                self._spill_if_needed(end)
+        return self._f.write(data)
+
+    def _spill_if_needed(self, end: int):
+        with self.scratch._lock:
+            size = max(end, self.scratch._entries[self.name][1])
+            used = self.scratch.memory_used(exclude=self.name)
+            if self.scratch._fits_into_memory(size, used):
+                self._approved = min(size + SPILL_CHECK_STEP, self.scratch.quota - used)
+                return
+            position = self._f.tell()
+            self._f.close()
+            self.path = self.scratch.spill(self.name)
+            self._f = self.path.open('r+b')
+            self._f.seek(position)
+            self._in_memory = False
+
+    def close(self):
+        self._f.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._f.closed
+
+    def __getattr__(self, name: str):
+        return getattr(self._f, name)
+
+    def __enter__(self) -> 'SpillingFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,59 @@
+"""
+FASTGenomics shard helpers: reads the files of a sharded input concurrently.
+"""
+import collections
+import concurrent.futures
+import pathlib
+import typing as ty
+
+from logging import getLogger
+
+from . import _codecs
+from . import _resources
+
+logger = getLogger('fastgenomics.io')
+
+
+def read_shard(path: pathlib.Path) -> bytes:
+    """default shard reader: returns the (decompressed) content of a shard"""
+    with _codecs.open_decompressed(path, 'rb') as f:
+        return f.read()
+
+
+def iter_shards(shards: ty.List[pathlib.Path], reader: ty.Callable[[pathlib.Path], ty.Any] = read_shard,
+                max_workers: int = None, ordered: bool = True) -> ty.Iterator[ty.Tuple[pathlib.Path, ty.Any]]:
+    """
+    yields ``(shard, reader(shard))`` for all shards, read concurrently on ``max_workers`` threads.
+    With ``ordered``, results are yielded in the order of shards, else as soon as they are finished.
+    At most two results per worker are kept in memory.
+    """
+    if max_workers is None:
+        max_workers = _resources.get_resources().io_workers
+    max_pending = 2 * max_workers
+    shards = iter(shards)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                               thread_name_prefix='fastgenomics-shards') as executor:
+        pending = collections.OrderedDict()  # future -> shard
+
+        def submit(n: int):
+            for shard in shards:
+                pending[executor.submit(reader, shard)] = shard
+                n -= 1
+                if n <= 0:
+                    return
+
+        try:
+            submit(max_pending)
+            while pending:
+                if ordered:
+                    future = next(iter(pending))
+                else:
+                    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    future = next(iter(done))
+                shard = pending.pop(future)
+                yield shard, future.result()
+                submit(1)
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,308 @@
+"""
+FASTGenomics sparse matrix helpers: streams expression matrices into compressed sparse row/column arrays.
+
+Supported inputs are dense delimited text (optionally with a header and a column of row names), delimited triplets
+in long format (``cellId,geneId,expressionValue``) and Matrix Market coordinate files
+(``%%MatrixMarket matrix coordinate ...``). All are parsed block by block with numpy, non-zeros are collected in
+preallocated growable arrays, so memory is proportional to the number of non-zeros.
+
+Requires numpy, ``SparseMatrix.to_scipy`` additionally requires scipy.
+"""
+import itertools
+import pathlib
+import typing as ty
+
+from logging import getLogger
+
+from . import _chunks
+from . import _codecs
+
+logger = getLogger('fastgenomics.io')
+
+FORMATS = ('csr', 'csc')
+LAYOUTS = ('auto', 'dense', 'triplet')
+TRIPLET_HEADER = ('cellid', 'geneid', 'expressionvalue')  # lower case
+MM_BANNER = '%%MatrixMarket'
+DEFAULT_CHUNK_LINES = 10_000
+INDEX_DTYPE = 'int64'
+
+
+def _import_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("numpy is required for sparse matrices - please install numpy!")
+    return np
+
+
+class SparseMatrix(ty.NamedTuple):
+    """compressed sparse matrix as plain numpy arrays, laid out like ``scipy.sparse.csr_matrix``/``csc_matrix``"""
+    format: str  # 'csr' or 'csc'
+    shape: ty.Tuple[int, int]
+    data: ty.Any
+    indices: ty.Any
+    indptr: ty.Any
+    row_names: ty.Optional[ty.List[str]] = None
+    column_names: ty.Optional[ty.List[str]] = None
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def to_scipy(self):
+        """returns the matrix as ``scipy.sparse.csr_matrix`` or ``csc_matrix`` without copying"""
+        import scipy.sparse
+        matrix_class = scipy.sparse.csr_matrix if self.format == 'csr' else scipy.sparse.csc_matrix
+        return matrix_class((self.data, self.indices, self.indptr), shape=self.shape, copy=False)
+
+    def asformat(self, format: str) -> 'SparseMatrix':
+        """returns the matrix in ``format`` ('csr' or 'csc') - converts by a counting sort in O(nnz)"""
+        _check_format(format)
+        if format == self.format:
+            return self
+        np = _import_numpy()
+        n_major, n_minor = self.shape if self.format == 'csr' else self.shape[::-1]
+
+        major = np.repeat(np.arange(n_major, dtype=INDEX_DTYPE), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind='stable')
+        indptr = np.zeros(n_minor + 1, dtype=INDEX_DTYPE)
+        np.cumsum(np.bincount(self.indices, minlength=n_minor), out=indptr[1:])
+        return self._replace(format=format, data=self.data[order], indices=major[order], indptr=indptr)
+
+
+class GrowableArray:
+    """preallocated 1D numpy array, which doubles its capacity when it is full"""
+
+    def __init__(self, dtype, capacity: int = 1024):
+        np = _import_numpy()
+        self._array = np.empty(max(capacity, 1), dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, values):
+        """appends the values of a 1D array"""
+        end = self._size + len(values)
+        if end > len(self._array):
+            np = _import_numpy()
+            grown = np.empty(max(end, 2 * len(self._array)), dtype=self._array.dtype)
+            grown[:self._size] = self._array[:self._size]
+            self._array = grown
+        self._array[self._size:end] = values
+        self._size = end
+
+    def to_array(self):
+        """returns the filled part of the array - trims the capacity without copying, if it is full"""
+        if self._size == len(self._array):
+            return self._array
+        return self._array[:self._size].copy()
+
+
+def _check_format(format: str):
+    if format not in FORMATS:
+        raise ValueError(f"Sparse format '{format}' not supported - use one of {FORMATS}!")
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _compress(major, minor, data, shape: ty.Tuple[int, int], format: str) -> SparseMatrix:
+    """builds a compressed matrix from unsorted coordinates by a counting sort over the major axis"""
+    np = _import_numpy()
+    if format == 'csc':
+        major, minor = minor, major
+    n_major = shape[0] if format == 'csr' else shape[1]
+
+    order = np.argsort(major, kind='stable')
+    indptr = np.zeros(n_major + 1, dtype=INDEX_DTYPE)
+    np.cumsum(np.bincount(major, minlength=n_major), out=indptr[1:])
+    return SparseMatrix(format=format, shape=shape, data=data[order], indices=minor[order], indptr=indptr)
+
+
+def read_matrix_market(f: ty.TextIO, dtype='float64', format: str = 'csr',
+                       chunk_lines: int = DEFAULT_CHUNK_LINES) -> SparseMatrix:
+    """reads a Matrix Market coordinate file - the arrays are preallocated by the number of entries in its header"""
+    np = _import_numpy()
+    banner = f.readline().split()
+    if len(banner) < 5 or banner[0] != MM_BANNER or banner[1] != 'matrix' or banner[2] != 'coordinate':
+        raise ValueError(f"Only Matrix Market files of type 'matrix coordinate' are supported, got {banner}!")
+    field, symmetry = banner[3].lower(), banner[4].lower()
+    if symmetry != 'general':
+        raise ValueError(f"Matrix Market symmetry '{symmetry}' not supported - use 'general'!")
+    if field not in ('real', 'integer', 'pattern'):
+        raise ValueError(f"Matrix Market field '{field}' not supported!")
+
+    size_line = next(line for line in f if not line.startswith('%') and line.strip())
+    n_rows, n_cols, n_entries = (int(value) for value in size_line.split())
+
+    rows = GrowableArray(INDEX_DTYPE, n_entries)
+    cols = GrowableArray(INDEX_DTYPE, n_entries)
+    data = GrowableArray(dtype, n_entries)
+    while True:
+        lines = list(itertools.islice(f, chunk_lines))
+        if not lines:
+            break
+        block = np.loadtxt(lines, dtype='float64', comments='%', ndmin=2)
+        if not len(block):
+            continue
+        rows.extend(block[:, 0].astype(INDEX_DTYPE) - 1)
+        cols.extend(block[:, 1].astype(INDEX_DTYPE) - 1)
+        data.extend(np.ones(len(block), dtype=dtype) if field == 'pattern' else block[:, 2].astype(dtype))
+
+    if len(data) != n_entries:
+        raise ValueError(f"Matrix Market file announces {n_entries} entries, but contains {len(data)}!")
+    return _compress(rows.to_array(), cols.to_array(), data.to_array(), (n_rows, n_cols), format)
+
+
+def read_dense(f: ty.TextIO, dtype='float64', format: str = 'csr', header: bool = True,
+               chunk_lines: int = DEFAULT_CHUNK_LINES) -> SparseMatrix:
+    """
+    reads a dense delimited matrix block by block and keeps only its non-zeros.
+    A first column with non-numeric values is returned as row names.
+    """
+    np = _import_numpy()
+    delimiter = _chunks.sniff_dialect(f.read(_chunks.SNIFF_SIZE)).delimiter
+    f.seek(0)
+
+    header_row = f.readline().rstrip('\r\n').split(delimiter) if header else None
+    lines = list(itertools.islice(f, chunk_lines))
+    first_row = lines[0].rstrip('\r\n').split(delimiter) if lines else (header_row or [])
+    has_names = bool(first_row) and not _is_number(first_row[0])
+    n_cols = len(first_row) - has_names
+
+    row_names = [] if has_names else None
+    rows = GrowableArray(INDEX_DTYPE)
+    cols = GrowableArray(INDEX_DTYPE)
+    data = GrowableArray(dtype)
+    n_rows = 0
+    while lines:
+        if has_names:
+            row_names.extend(line.split(delimiter, 1)[0] for line in lines)
+        block = np.loadtxt(lines, dtype=dtype, delimiter=delimiter, ndmin=2,
+                           usecols=range(has_names, has_names + n_cols))
+        block_rows, block_cols = np.nonzero(block)
+        rows.extend(block_rows + n_rows)
+        cols.extend(block_cols)
+        data.extend(block[block_rows, block_cols])
+        n_rows += len(block)
+        lines = list(itertools.islice(f, chunk_lines))
+
+    column_names = None
+    if header_row is not None:
+        column_names = header_row[-n_cols:] if n_cols else []
+    matrix = _compress(rows.to_array(), cols.to_array(), data.to_array(), (n_rows, n_cols), format)
+    return matrix._replace(row_names=row_names, column_names=column_names)
+
+
+def read_triplets(f: ty.TextIO, dtype='float64', format: str = 'csr', header: bool = True,
+                  chunk_lines: int = DEFAULT_CHUNK_LINES) -> SparseMatrix:
+    """
+    reads delimited ``row id, column id, value`` triplets (like ``cellId,geneId,expressionValue``) block by block.
+    Row and column ids are numbered in the order of their first appearance and returned as row and column names,
+    entries with a value of zero are dropped. Repeated coordinates are kept as duplicate entries.
+    """
+    np = _import_numpy()
+    delimiter = _chunks.sniff_dialect(f.read(_chunks.SNIFF_SIZE)).delimiter
+    f.seek(0)
+    if header:
+        f.readline()
+
+    row_ids = {}  # type: ty.Dict[str, int]
+    column_ids = {}  # type: ty.Dict[str, int]
+    rows = GrowableArray(INDEX_DTYPE)
+    cols = GrowableArray(INDEX_DTYPE)
+    data = GrowableArray(dtype)
+    while True:
+        lines = [line for line in itertools.islice(f, chunk_lines) if line.strip()]
+        if not lines:
+            break
+        try:
+            row_names, column_names, values = zip(*(line.rstrip('\r\n').split(delimiter) for line in lines))
+        except ValueError:
+            raise ValueError("Triplet files need exactly three columns: row id, column id and value!")
+        values = np.array(values, dtype='float64').astype(dtype)
+        non_zero = values != 0
+        block_rows = np.fromiter((row_ids.setdefault(name, len(row_ids)) for name in row_names),
+                                 dtype=INDEX_DTYPE, count=len(row_names))
+        block_cols = np.fromiter((column_ids.setdefault(name, len(column_ids)) for name in column_names),
+                                 dtype=INDEX_DTYPE, count=len(column_names))
+        rows.extend(block_rows[non_zero])
+        cols.extend(block_cols[non_zero])
+        data.extend(values[non_zero])
+
+    matrix = _compress(rows.to_array(), cols.to_array(), data.to_array(), (len(row_ids), len(column_ids)), format)
+    return matrix._replace(row_names=list(row_ids), column_names=list(column_ids))
+
+
+def _is_triplet_file(f: ty.TextIO, header: bool) -> bool:
+    """
+    detects triplets by the header ``cellId,geneId,expressionValue`` - without a header, by three columns and
+    a non-numeric column id in the first row (numeric gene ids need a header or ``layout='triplet'``)
+    """
+    delimiter = _chunks.sniff_dialect(f.read(_chunks.SNIFF_SIZE)).delimiter
+    f.seek(0)
+    lines = f.readlines(_chunks.SNIFF_SIZE)
+    f.seek(0)
+    first_row = [value.strip().strip('"') for value in lines[0].rstrip('\r\n').split(delimiter)] if lines else []
+    if header:
+        return tuple(name.lower() for name in first_row) == TRIPLET_HEADER
+    return len(first_row) == 3 and not _is_number(first_row[1]) and _is_number(first_row[2])
+
+
+def read_sparse(path: pathlib.Path, dtype='float64', format: str = 'csr', header: bool = True,
+                chunk_lines: int = DEFAULT_CHUNK_LINES, layout: str = 'auto') -> SparseMatrix:
+    """
+    reads a Matrix Market, triplet or dense delimited file (maybe compressed) into a sparse matrix.
+    With ``layout='auto'``, delimited files with the header ``cellId,geneId,expressionValue`` - or without header,
+    with three columns and a non-numeric second column - are read as triplets.
+    """
+    _check_format(format)
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout '{layout}' not supported - use one of {LAYOUTS}!")
+    with _codecs.open_decompressed(path, 'rt', encoding='utf-8') as f:
+        is_matrix_market = f.read(len(MM_BANNER)) == MM_BANNER
+        f.seek(0)
+        if is_matrix_market:
+            matrix = read_matrix_market(f, dtype=dtype, format=format, chunk_lines=chunk_lines)
+        elif layout == 'triplet' or (layout == 'auto' and _is_triplet_file(f, header)):
+            matrix = read_triplets(f, dtype=dtype, format=format, header=header, chunk_lines=chunk_lines)
+        else:
+            matrix = read_dense(f, dtype=dtype, format=format, header=header, chunk_lines=chunk_lines)
+    logger.debug(f"Read {matrix.shape} matrix with {matrix.nnz} non-zeros from {path}")
+    return matrix
+
+
+def _as_sparse_matrix(matrix) -> SparseMatrix:
+    """accepts ``SparseMatrix`` and scipy sparse matrices"""
+    if isinstance(matrix, SparseMatrix):
+        return matrix
+    if hasattr(matrix, 'tocsr'):
+        csr = matrix.tocsr()
+        return SparseMatrix(format='csr', shape=csr.shape, data=csr.data, indices=csr.indices, indptr=csr.indptr)
+    raise TypeError(f"Expected a SparseMatrix or a scipy sparse matrix, got {type(matrix).__name__}!")
+
+
+def write_matrix_market(matrix, f_out: ty.TextIO, chunk_entries: int = DEFAULT_CHUNK_LINES * 10):
+    """writes a sparse matrix as Matrix Market coordinate file block by block"""
+    np = _import_numpy()
+    matrix = _as_sparse_matrix(matrix)
+    field = 'integer' if np.issubdtype(matrix.data.dtype, np.integer) else 'real'
+    value_format = '%d' if field == 'integer' else '%.17g'
+
+    f_out.write(f"{MM_BANNER} matrix coordinate {field} general\n")
+    f_out.write(f"{matrix.shape[0]} {matrix.shape[1]} {matrix.nnz}\n")
+
+    n_major = len(matrix.indptr) - 1
+    major = np.repeat(np.arange(1, n_major + 1, dtype=INDEX_DTYPE), np.diff(matrix.indptr))
+    for start in range(0, matrix.nnz, chunk_entries):
+        end = start + chunk_entries
+        minor = matrix.indices[start:end] + 1
+        rows, cols = (major[start:end], minor) if matrix.format == 'csr' else (minor, major[start:end])
+        lines = '\n'.join(f"%d %d {value_format}" % entry for entry in zip(rows, cols, matrix.data[start:end]))
+        f_out.write(lines + '\n')
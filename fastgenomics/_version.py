@@ -0,0 +1 @@
+VERSION = '0.6.0'  # scheme: breaking major, non-breaking feature, fix
@@ -0,0 +1,203 @@
+"""
+FASTGenomics asyncio helper: Mirrors ``fastgenomics.io`` for apps running within an asyncio event loop.
+
+All blocking file system work (loading the manifest, the input_file_mapping and the parameters, checking files,
+reading and writing) is run in a thread pool, so the event loop is never blocked.
+The initialization is shared: concurrent first callers wait for the same initialization instead of loading the
+manifest twice. Blocking calls run in the ``contextvars`` context of the caller, so an active ``RunContext``
+(``fastgenomics.io.context``) is used by them and initialized on its own.
+
+Example::
+
+    from fastgenomics import aio as fg_aio
+
+    async def main():
+        parameters = await fg_aio.get_parameters()
+        async for chunk in fg_aio.iter_input_chunks('my_input_key'):
+            ...
+        async with fg_aio.open_output('my_output_key') as f_out:
+            await f_out.write("something")
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import pathlib
+import threading
+import typing as ty
+import weakref
+from logging import getLogger
+
+from . import _common
+from . import _resources
+from . import io as fg_io
+
+logger = getLogger('fastgenomics.aio')
+__version__ = _common.__version__
+
+# shared initialization - one per RunContext or module wide state
+_INIT_FUTURES = weakref.WeakKeyDictionary()  # type: ty.MutableMapping[ty.Any, concurrent.futures.Future]
+_INIT_LOCK = threading.Lock()
+
+_EXECUTOR = None  # type: ty.Optional[concurrent.futures.ThreadPoolExecutor]
+_EXECUTOR_LOCK = threading.Lock()
+
+_STOP = object()
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """returns the thread pool used for blocking calls"""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=_resources.get_resources().io_workers,
+                                                              thread_name_prefix='fastgenomics-aio')
+        return _EXECUTOR
+
+
+def _submit(func: ty.Callable, *args, **kwargs) -> concurrent.futures.Future:
+    """submits a blocking function to the thread pool - within a copy of the caller's context"""
+    return _get_executor().submit(contextvars.copy_context().run, functools.partial(func, *args, **kwargs))
+
+
+async def _run(func: ty.Callable, *args, **kwargs):
+    """runs a blocking function in the thread pool"""
+    return await asyncio.wrap_future(_submit(func, *args, **kwargs))
+
+
+def _initialize():
+    """loads paths, manifest, input_file_mapping and parameters into the cache of ``fastgenomics._common``"""
+    _common.get_paths()
+    _common.get_app_manifest()
+    _common.get_input_file_mapping()
+    # validates the parameters without loading payload files
+    _common.get_parameter_store()
+
+
+async def initialize():
+    """
+    Loads and validates manifest.json, input_file_mapping and parameters in the background.
+    All concurrent callers of the same ``RunContext`` (or of the module wide state) share the same initialization
+    - it is only retried, if it failed.
+    """
+    state = _common.get_state()
+    with _INIT_LOCK:
+        future = _INIT_FUTURES.get(state)
+        if future is None or (future.done() and future.exception() is not None):
+            future = _INIT_FUTURES[state] = _submit(_initialize)
+    await asyncio.wrap_future(future)
+
+
+async def set_paths(app_dir: str = None, data_root: str = None):
+    """sets the paths of app and data root - see ``fastgenomics.io.set_paths``"""
+    await _run(_common.set_paths, app_dir, data_root)
+    with _INIT_LOCK:
+        _INIT_FUTURES.pop(_common.get_state(), None)
+
+
+async def get_parameters() -> _common.LazyParameters:
+    """
+    returns all parameters - see ``fastgenomics.io.get_parameters``.
+    Payload files are loaded on first access - use ``get_parameter`` to load them in the thread pool.
+    """
+    await initialize()
+    return _common.get_parameters()
+
+
+async def get_parameter(param_key: str) -> ty.Any:
+    """returns the parameter ``param_key`` - see ``fastgenomics.io.get_parameter``"""
+    await initialize()
+    # loading a payload file blocks
+    return await _run(_common.get_parameter, param_key)
+
+
+async def get_input_path(input_key: str) -> pathlib.Path:
+    """returns the path of an input file - see ``fastgenomics.io.get_input_path``"""
+    await initialize()
+    return await _run(fg_io.get_input_path, input_key)
+
+
+async def get_output_path(output_key: str) -> pathlib.Path:
+    """returns the path of an output file - see ``fastgenomics.io.get_output_path``"""
+    await initialize()
+    return await _run(fg_io.get_output_path, output_key)
+
+
+async def get_summary_path() -> pathlib.Path:
+    """returns the path of the summary file - see ``fastgenomics.io.get_summary_path``"""
+    await initialize()
+    return await _run(fg_io.get_summary_path)
+
+
+async def iter_input_chunks(input_key: str, rows: int = None, bytes: int = None,
+                            header: bool = True) -> ty.AsyncIterator:
+    """
+    reads a delimited input file block by block - see ``fastgenomics.io.iter_input_chunks``.
+    Reading and parsing of each chunk is done in the thread pool::
+
+        async for chunk in iter_input_chunks('my_input_key', rows=10000):
+            process(chunk.header, chunk.rows)
+    """
+    await initialize()
+    chunks = await _run(fg_io.iter_input_chunks, input_key, rows=rows, bytes=bytes, header=header)
+    try:
+        while True:
+            chunk = await _run(next, chunks, _STOP)
+            if chunk is _STOP:
+                return
+            yield chunk
+    finally:
+        await _run(chunks.close)
+
+
+class AsyncOutput:
+    """
+    asynchronous wrapper of ``fastgenomics.io.open_output`` - use it as ``async with`` context manager.
+    The file is opened on entering the context and atomically renamed to its final name on leaving it.
+    """
+
+    def __init__(self, output_key: str, **kwargs):
+        self.output_key = output_key
+        self._kwargs = kwargs
+        self._file = None
+
+    @property
+    def stats(self):
+        """statistics of the written file - available after closing it"""
+        return None if self._file is None else self._file.stats
+
+    async def open(self):
+        await initialize()
+        self._file = await _run(fg_io.open_output, self.output_key, **self._kwargs)
+
+    async def write(self, data: ty.Union[str, bytes]) -> int:
+        return await _run(self._file.write, data)
+
+    async def writelines(self, lines: ty.Iterable[ty.Union[str, bytes]]):
+        await _run(self._file.writelines, lines)
+
+    async def close(self):
+        await _run(self._file.close)
+
+    async def abort(self):
+        await _run(self._file.abort)
+
+    async def __aenter__(self) -> 'AsyncOutput':
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self.abort()
+
+
+def open_output(output_key: str, **kwargs) -> AsyncOutput:
+    """
+    opens the output file of ``output_key`` for writing - see ``fastgenomics.io.open_output`` for all arguments::
+
+        async with open_output('my_output_key') as f_out:
+            await f_out.write("something")
+    """
+    return AsyncOutput(output_key, **kwargs)
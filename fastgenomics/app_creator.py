@@ -3,10 +3,15 @@ FASTGenomics App-Creation-Suite:
 
 Provides methods to check your create ... for testing
 """
+import concurrent.futures
+import json
 import pathlib
-import jinja2
+import random
+import typing as ty
 
 from fastgenomics import io as fg_io
+from fastgenomics import _common
+from fastgenomics import _resources
 
 
 from logging import getLogger
@@ -21,6 +26,11 @@ TEMPLATE_DIR = RESOURCES_PATH / 'templates'
 # registry
 DOCKER_REGISTRY = 'apps.fastgenomics.org'
 
+# sample data
+SAMPLE_DATA_DIR = pathlib.Path('other_app_uuid') / 'output'
+CELLS_PER_BATCH = 1000
+WRITE_BLOCK_CELLS = 1000
+
 
 def create_docker_compose(app_dir: pathlib.Path, app_name: pathlib.Path, sample_dir: pathlib.Path,
                           docker_registry: str = DOCKER_REGISTRY):
@@ -34,10 +44,11 @@ def create_docker_compose(app_dir: pathlib.Path, app_name: pathlib.Path, sample_
         return
 
     # get app type
-    manifest = fg_io.common.get_app_manifest()
+    manifest = _common.get_app_manifest()
     app_type = manifest['Type']
 
     logger.info("Loading docker-compose.yml template")
+    import jinja2  # imported lazily, as it is only needed for templating
     with open(TEMPLATE_DIR / 'docker-compose.yml.j2') as f_temp:
         template = jinja2.Template(f_temp.read())
 
@@ -64,12 +75,13 @@ def create_file_mapping(sample_dir: pathlib.Path):
     file_mapping_file.parent.mkdir(parents=True, exist_ok=True)
 
     # create file_mappings
-    manifest = fg_io.common.get_app_manifest()
+    manifest = _common.get_app_manifest()
     input_keys = manifest['Input'].keys()
     file_mapping = {key: sample_output_dir / 'fix_me.txt' for key in input_keys}
 
     # write file_mappings
     logger.info("Loading input_file_mapping.json template")
+    import jinja2  # imported lazily, as it is only needed for templating
     with open(TEMPLATE_DIR / 'input_file_mapping.json.j2') as f_temp:
         template = jinja2.Template(f_temp.read())
 
@@ -83,3 +95,105 @@ def create_file_mapping(sample_dir: pathlib.Path):
     for key in input_keys:
         print(f" - {key}: {manifest['Input'][key]['Usage']} ({manifest['Input'][key]['Type']})")
     print()
+
+
+def _is_matrix_type(input_type: str) -> bool:
+    """inputs like expressionMatrix or geneMatrix get an expression matrix, all other inputs a batch table"""
+    return 'matrix' in input_type.lower()
+
+
+def _write_shard(job: ty.Tuple[pathlib.Path, str, bool, int, int, int, float, int]) -> int:
+    """
+    writes the cells [first_cell, last_cell) of an input into path, block by block - returns the number of rows.
+    Expression matrices are written as ``cellId,geneId,expressionValue`` with zero values omitted.
+    """
+    path, key, is_matrix, first_cell, last_cell, n_genes, density, seed = job
+    rng = random.Random(f"{seed}-{key}-{first_cell}")
+
+    # a few genes are expressed in many cells (zipf-like), library sizes vary from cell to cell
+    cum_weights = []
+    total = 0.
+    for rank in range(n_genes):
+        total += 1. / (rank + 1) ** 0.5
+        cum_weights.append(total)
+    genes = range(n_genes)
+
+    n_rows = 0
+    with path.open('w', encoding='utf-8', newline='') as f_out:
+        f_out.write("cellId,geneId,expressionValue\n" if is_matrix else "cellId,batch\n")
+        for block_start in range(first_cell, last_cell, WRITE_BLOCK_CELLS):
+            lines = []
+            for cell in range(block_start, min(block_start + WRITE_BLOCK_CELLS, last_cell)):
+                if not is_matrix:
+                    lines.append(f"cell_{cell},batch_{cell // CELLS_PER_BATCH}\n")
+                    continue
+                size_factor = rng.lognormvariate(0., 0.5)
+                n_expressed = min(n_genes, int(density * n_genes * size_factor))
+                expressed = sorted(set(rng.choices(genes, cum_weights=cum_weights, k=n_expressed)))
+                lines.extend(f"cell_{cell},gene_{gene},{1 + int(rng.expovariate(1.) * 3 * size_factor)}\n"
+                             for gene in expressed)
+            f_out.write(''.join(lines))
+            n_rows += len(lines)
+    return n_rows
+
+
+def generate_sample_data(sample_dir: pathlib.Path, n_cells: int = 10_000, n_genes: int = 2_000,
+                         density: float = 0.05, seed: int = 0, shards: int = 1,
+                         max_workers: int = None) -> ty.Dict[str, str]:
+    """
+    generates a reproducible synthetic dataset for every input of the manifest and adds it to
+    ``config/input_file_mapping.json`` (existing entries of other keys are kept).
+
+    Inputs with a ``*Matrix`` type get an expression matrix of ``n_cells`` x ``n_genes`` with about ``density``
+    non-zero values, all other inputs a batch table of the same cells. With ``shards > 1``, each input is written as a
+    directory of ``shards`` files - other ``*.csv`` files in it are removed. Shards are written in parallel by
+    ``max_workers`` processes, each streaming its cells to disk block by block, so memory does not grow with the size
+    of the dataset.
+    Returns the new entries of the input_file_mapping.
+    """
+    if n_cells < 1 or n_genes < 1 or shards < 1:
+        raise ValueError("n_cells, n_genes and shards have to be positive!")
+    if not 0 < density <= 1:
+        raise ValueError("density has to be in (0, 1]!")
+
+    sample_dir = pathlib.Path(sample_dir)
+    output_dir = sample_dir / 'data' / SAMPLE_DATA_DIR
+    file_mapping_file = sample_dir / 'config' / 'input_file_mapping.json'
+    inputs = _common.get_app_manifest()['Input']
+
+    jobs = []
+    file_mapping = {}
+    bounds = [n_cells * i // shards for i in range(shards + 1)]
+    for key, input_entry in inputs.items():
+        is_matrix = _is_matrix_type(input_entry['Type'])
+        if shards == 1:
+            paths = [output_dir / f"{key}.csv"]
+            file_mapping[key] = str(SAMPLE_DATA_DIR / f"{key}.csv")
+        else:
+            paths = [output_dir / key / f"part_{i}.csv" for i in range(shards)]
+            file_mapping[key] = str(SAMPLE_DATA_DIR / key)
+        paths[0].parent.mkdir(parents=True, exist_ok=True)
+        if shards > 1:
+            # shards of an earlier run with more shards would be read as part of the input
+            for stale in set(paths[0].parent.glob('*.csv')) - set(paths):
+                logger.info(f"Removing stale shard {stale}")
+                stale.unlink()
+        jobs += [(path, key, is_matrix, bounds[i], bounds[i + 1], n_genes, density, seed)
+                 for i, path in enumerate(paths)]
+
+    logger.info(f"Writing {len(jobs)} files of {n_cells} cells and {n_genes} genes to {output_dir}")
+    if max_workers is None:
+        max_workers = _resources.get_resources().cpu_workers
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        n_rows = sum(executor.map(_write_shard, jobs))
+    logger.info(f"Wrote {n_rows} rows")
+
+    # wire the files into the input_file_mapping
+    full_mapping = {}
+    if file_mapping_file.exists():
+        full_mapping = json.loads(file_mapping_file.read_text(encoding='utf-8'))
+    full_mapping.update(file_mapping)
+    file_mapping_file.parent.mkdir(parents=True, exist_ok=True)
+    file_mapping_file.write_text(json.dumps(full_mapping, indent=4), encoding='utf-8')
+    logger.info(f"Updated {file_mapping_file}")
+    return file_mapping
@@ -0,0 +1,185 @@
+"""
+FASTGenomics batch executor: Runs an app entry point over many data roots with a process pool.
+
+Each data root has to be laid out like ``/fastgenomics`` (``config/``, ``data/``, ``output/``, ``summary/``).
+The manifest.json is loaded and validated once in the parent process and handed to the workers, which run the entry
+point within a ``RunContext`` of each data root. Status, wall time and peak memory of every run are collected into a
+JSON report.
+
+Usage from python::
+
+    from fastgenomics import batch
+
+    results = batch.run_many(main, ['samples/a', 'samples/b'], app_dir='.', max_workers=4)
+
+or from the command line::
+
+    python -m fastgenomics.batch my_app.main:main samples/* --app-dir . --max-workers 4 --report report.json
+"""
+import argparse
+import datetime
+import importlib
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+import traceback
+import typing as ty
+from logging import getLogger
+
+from . import _common
+from . import _resources
+from ._profile import peak_rss_mb
+
+logger = getLogger('fastgenomics.batch')
+
+EntryPoint = ty.Union[ty.Callable[[], ty.Any], str]
+
+# state of a worker process, set by the pool initializer
+_WORKER_MANIFEST = {}
+
+
+class RunResult(ty.NamedTuple):
+    """result of a single run"""
+    data_root: str
+    status: str  # 'ok' or 'failed'
+    seconds: float
+    peak_rss_mb: ty.Optional[float]  # high-water mark of the worker process
+    worker_pid: int
+    error: ty.Optional[str]
+
+
+def resolve_entry_point(entry_point: EntryPoint) -> ty.Callable[[], ty.Any]:
+    """returns the callable of an entry point given as callable or as ``'module:function'``"""
+    if callable(entry_point):
+        return entry_point
+
+    module_name, sep, func_name = entry_point.partition(':')
+    if not sep or not module_name or not func_name:
+        raise ValueError(f"Entry point '{entry_point}' has to be given as 'module:function'!")
+    func = importlib.import_module(module_name)
+    for attr in func_name.split('.'):
+        func = getattr(func, attr)
+    return func
+
+
+def _init_worker(manifest: dict):
+    """pool initializer: stores the validated manifest of the parent"""
+    global _WORKER_MANIFEST
+    _WORKER_MANIFEST = manifest
+
+
+def _run_one(job: ty.Tuple[EntryPoint, str, str]) -> RunResult:
+    """runs the entry point on a single data root within its own RunContext"""
+    entry_point, app_dir, data_root = job
+    start = time.perf_counter()
+    try:
+        func = resolve_entry_point(entry_point)
+        context = _common.RunContext(app_dir, data_root)
+        context.manifest = _WORKER_MANIFEST  # already validated by the parent
+        context.run(func)
+        status, error = 'ok', None
+    except Exception:
+        status, error = 'failed', traceback.format_exc()
+
+    return RunResult(data_root=data_root, status=status, seconds=time.perf_counter() - start,
+                     peak_rss_mb=peak_rss_mb(), worker_pid=os.getpid(), error=error)
+
+
+def load_manifest(app_dir: str, data_root: str) -> dict:
+    """loads and validates the manifest.json once"""
+    return _common.RunContext(app_dir, data_root).get_app_manifest()
+
+
+def run_many(func: EntryPoint, data_roots: ty.Iterable[str], app_dir: str = None, max_workers: int = None,
+             chunksize: int = 1, max_tasks_per_child: int = None, start_method: str = None,
+             report_path: pathlib.Path = None) -> ty.List[RunResult]:
+    """
+    runs ``func()`` once per data root on a pool of ``max_workers`` processes (default: CPUs of the container,
+    a single process for apps demanding a GPU).
+
+    ``func`` is a callable or a ``'module:function'`` string and has to be picklable for the ``spawn`` start method.
+    Within ``func``, all functions of ``fastgenomics.io`` refer to the current data root.
+    ``chunksize`` data roots are sent to a worker at once, ``max_tasks_per_child`` restarts workers after that
+    number of chunks - use ``chunksize=1`` and ``max_tasks_per_child=1`` for exact per-run peak memory.
+
+    Failing runs are reported, but do not stop the batch. If ``report_path`` is given, a JSON report is written.
+    """
+    data_roots = [str(pathlib.Path(data_root).absolute()) for data_root in data_roots]
+    if not data_roots:
+        raise ValueError("No data roots given!")
+    if app_dir is None:
+        app_dir = os.environ.get("FG_APP_DIR", _common.DEFAULT_APP_DIR)
+    app_dir = str(pathlib.Path(app_dir).absolute())
+
+    start_time = datetime.datetime.now()
+    start = time.perf_counter()
+    manifest = load_manifest(app_dir, data_roots[0])
+    if max_workers is None:
+        max_workers = _resources.get_resources(tuple(manifest.get('Demands', []))).process_workers
+    logger.info(f"Running {len(data_roots)} data roots of '{manifest['Name']}' on {max_workers} workers")
+
+    mp_context = multiprocessing.get_context(start_method)
+    jobs = [(func, app_dir, data_root) for data_root in data_roots]
+    results = []
+    with mp_context.Pool(processes=max_workers, initializer=_init_worker, initargs=(manifest,),
+                         maxtasksperchild=max_tasks_per_child) as pool:
+        for result in pool.imap(_run_one, jobs, chunksize=chunksize):
+            if result.status == 'ok':
+                logger.info(f"{result.data_root}: ok in {result.seconds:.2f}s")
+            else:
+                logger.error(f"{result.data_root}: failed after {result.seconds:.2f}s\n{result.error}")
+            results.append(result)
+
+    if report_path is not None:
+        write_report(results, report_path, app_dir=app_dir, started=start_time,
+                     seconds=time.perf_counter() - start)
+    return results
+
+
+def write_report(results: ty.List[RunResult], report_path: pathlib.Path, app_dir: str,
+                 started: datetime.datetime, seconds: float):
+    """writes the results of a batch as JSON report"""
+    report = {
+        'app_dir': app_dir,
+        'started': started.isoformat(),
+        'seconds': seconds,
+        'n_ok': sum(result.status == 'ok' for result in results),
+        'n_failed': sum(result.status != 'ok' for result in results),
+        'runs': [result._asdict() for result in results],
+    }
+    report_path = pathlib.Path(report_path)
+    report_path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    logger.info(f"Report written to {report_path}")
+
+
+def main(argv: ty.List[str] = None) -> int:
+    """command line interface - returns 1, if any run failed"""
+    parser = argparse.ArgumentParser(prog='python -m fastgenomics.batch',
+                                     description="Runs an app entry point over many data roots.")
+    parser.add_argument('entry_point', help="entry point of the app as 'module:function'")
+    parser.add_argument('data_roots', nargs='+', help="data roots containing config/, data/, output/ and summary/")
+    parser.add_argument('--app-dir', default=None, help="directory containing the manifest.json "
+                                                        "(default: $FG_APP_DIR or /app)")
+    parser.add_argument('--max-workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=1)
+    parser.add_argument('--max-tasks-per-child', type=int, default=None)
+    parser.add_argument('--start-method', choices=multiprocessing.get_all_start_methods(), default=None)
+    parser.add_argument('--report', type=pathlib.Path, default=None, help="path of the JSON report")
+    args = parser.parse_args(argv)
+
+    # make the entry point importable from the working directory
+    sys.path.insert(0, os.getcwd())
+
+    results = run_many(args.entry_point, args.data_roots, app_dir=args.app_dir, max_workers=args.max_workers,
+                       chunksize=args.chunksize, max_tasks_per_child=args.max_tasks_per_child,
+                       start_method=args.start_method, report_path=args.report)
+    return int(any(result.status != 'ok' for result in results))
+
+
+if __name__ == '__main__':
+    import logging
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
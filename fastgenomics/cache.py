@@ -0,0 +1,190 @@
+"""
+FASTGenomics result cache: Skips reruns of an app with identical inputs, parameters and manifest.
+
+The key of a run is the SHA-256 of the manifest, the parameter values and the content of all mapped input files
+(hashed in streaming fashion on a thread pool). After a successful run, all outputs of the manifest and the
+``summary.md`` are copied into the cache under this key. A later run with the same key restores copies of them
+instead of recomputing them - outputs and cache never share a file, so outputs can be rewritten safely.
+
+Usage - wrap the entry point of your app::
+
+    from fastgenomics import cache as fg_cache
+
+    fg_cache.run(main)  # returns True, if the results were restored from the cache
+
+The cache directory is set by ``FG_RESULT_CACHE_DIR`` (default: in the temporary directory) and limited to
+``FG_RESULT_CACHE_SIZE`` bytes (default: 10 GiB), least recently used runs are evicted first.
+"""
+import concurrent.futures
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import typing as ty
+from logging import getLogger
+
+from . import _common
+from . import _integrity
+from . import _resources
+
+logger = getLogger('fastgenomics.cache')
+
+CACHE_DIR_ENV = 'FG_RESULT_CACHE_DIR'
+CACHE_SIZE_ENV = 'FG_RESULT_CACHE_SIZE'
+DEFAULT_CACHE_SIZE = 10 * 1024 ** 3
+ENTRY_FILE = 'entry.json'
+
+
+def get_cache_dir() -> pathlib.Path:
+    """returns the cache directory - from ``FG_RESULT_CACHE_DIR`` or in the temporary directory"""
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return pathlib.Path(cache_dir)
+    return pathlib.Path(tempfile.gettempdir()) / 'fastgenomics-result-cache'
+
+
+def get_cache_size() -> int:
+    """returns the maximum size of the cache in bytes - from ``FG_RESULT_CACHE_SIZE``"""
+    return int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE))
+
+
+def hash_inputs(max_workers: int = None) -> ty.Dict[str, ty.List[ty.Tuple[str, str]]]:
+    """
+    returns ``{input_key: [(file_name, sha256), ...]}`` for all files of the input_file_mapping -
+    shards of sharded inputs are hashed individually
+    """
+    files = {key: _common.resolve_shards(path) for key, path in _common.get_input_file_mapping().items()}
+    all_files = sorted({path for paths in files.values() for path in paths})
+
+    resources = _resources.get_resources()
+    if max_workers is None:
+        max_workers = resources.io_workers
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                               thread_name_prefix='fastgenomics-hash') as executor:
+        digests = dict(zip(all_files, executor.map(
+            lambda path: _integrity.hash_file(path, block_size=resources.block_bytes), all_files)))
+    return {key: [(path.name, digests[path]) for path in paths] for key, paths in files.items()}
+
+
+def compute_key(max_workers: int = None) -> str:
+    """returns the key of the current run, computed from manifest, parameters and inputs"""
+    content = {
+        'version': _common.VERSION,
+        'manifest': _common.get_app_manifest(),
+        # payload files are represented by their path, size and mtime instead of their content
+        'parameters': dict(_common.get_parameter_store().view),
+        'inputs': hash_inputs(max_workers=max_workers),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _result_files() -> ty.Dict[str, pathlib.Path]:
+    """returns the files to cache as ``{name within the entry: path}``"""
+    paths = _common.get_paths()
+    outputs = _common.get_app_manifest()['Output']
+    files = {f"output/{output['FileName']}": paths['output'] / output['FileName'] for output in outputs.values()}
+    files['summary/summary.md'] = paths['summary'] / 'summary.md'
+    return files
+
+
+def _copy(source: pathlib.Path, target: pathlib.Path):
+    """
+    copies source to a private file, which replaces target atomically - no hardlinks, so writing to an output in place
+    never changes the cached copy (and vice versa)
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_target = target.with_name(f'.{target.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        shutil.copy2(str(source), str(tmp_target))
+        os.replace(str(tmp_target), str(target))
+    finally:
+        if tmp_target.exists():
+            tmp_target.unlink()
+
+
+def restore(key: str, cache_dir: pathlib.Path = None) -> bool:
+    """restores the results of the run with ``key`` into the output directories - returns False, if not cached"""
+    entry = (cache_dir or get_cache_dir()) / key
+    if not (entry / ENTRY_FILE).exists():
+        return False
+
+    stored = json.loads((entry / ENTRY_FILE).read_text(encoding='utf-8'))['files']
+    files = _result_files()
+    if not set(stored) <= set(files) or not all((entry / name).exists() for name in stored):
+        logger.warning(f"Ignoring incomplete cache entry {entry}")
+        return False
+
+    for name in stored:
+        _copy(entry / name, files[name])
+    # update time of last use for LRU eviction
+    os.utime(str(entry / ENTRY_FILE))
+    logger.info(f"Restored {len(stored)} result files from {entry}")
+    return True
+
+
+def store(key: str, cache_dir: pathlib.Path = None, max_size: int = None):
+    """stores all existing outputs and the summary of the current run under ``key``"""
+    cache_dir = cache_dir or get_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    entry = cache_dir / key
+    if (entry / ENTRY_FILE).exists():
+        return
+
+    files = {name: path for name, path in _result_files().items() if path.exists()}
+    tmp_entry = pathlib.Path(tempfile.mkdtemp(prefix=f'.{key}.', dir=str(cache_dir)))
+    try:
+        for name, path in files.items():
+            _copy(path, tmp_entry / name)
+        (tmp_entry / ENTRY_FILE).write_text(json.dumps({'files': sorted(files)}), encoding='utf-8')
+        os.rename(str(tmp_entry), str(entry))
+    except OSError as e:
+        # another process stored the same run in the meantime or the cache is not writable
+        logger.warning(f"Could not store results in {entry}: {e}")
+        shutil.rmtree(str(tmp_entry), ignore_errors=True)
+        return
+
+    logger.info(f"Stored {len(files)} result files in {entry}")
+    evict(cache_dir, get_cache_size() if max_size is None else max_size, keep=[key])
+
+
+def _entry_size(entry: pathlib.Path) -> int:
+    return sum(path.stat().st_size for path in entry.rglob('*') if path.is_file())
+
+
+def evict(cache_dir: pathlib.Path, max_size: int, keep: ty.Iterable[str] = ()):
+    """removes least recently used entries until the cache is smaller than max_size bytes"""
+    entries = [(entry_file.stat().st_mtime, _entry_size(entry_file.parent), entry_file.parent)
+               for entry_file in cache_dir.glob(f'*/{ENTRY_FILE}')]
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_size:
+            break
+        if entry.name in keep:
+            continue
+        logger.info(f"Evicting {entry} from result cache")
+        shutil.rmtree(str(entry), ignore_errors=True)
+        total -= size
+
+
+def clear(cache_dir: pathlib.Path = None):
+    """removes all entries of the cache"""
+    cache_dir = cache_dir or get_cache_dir()
+    if cache_dir.exists():
+        evict(cache_dir, max_size=0)
+
+
+def run(func: ty.Callable[[], ty.Any], max_workers: int = None) -> bool:
+    """
+    restores the results of a previous run with the same manifest, parameters and inputs -
+    or runs ``func()`` and stores its results. Returns True, if the results were restored.
+    """
+    key = compute_key(max_workers=max_workers)
+    if restore(key):
+        return True
+
+    func()
+    store(key)
+    return False
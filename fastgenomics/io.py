@@ -9,23 +9,72 @@ If you want to work without docker, you can set two environment variables to eas
 You can set them by environment variables or just call ``fg_io.set_paths(path_to_app, path_to_data_root)``
 """
 import pathlib
+import time
+import typing as ty
 from logging import getLogger
 from . import _common
+from . import _mmap
+from . import _chunks
+from . import _output
+from . import _codecs
+from . import _prefetch
+from . import _shards
+from . import _array_cache
+from . import _sparse
+from . import _integrity
+from . import _metrics
+from . import _profile
+from . import _scratch
+from . import _resources
 
 # imported for interface
 # noinspection PyUnresolvedReferences
-from ._common import set_paths, get_parameters, get_parameter
+from ._common import set_paths, get_parameters, get_parameter, get_parameter_store
 
 
 logger = getLogger('fastgenomics.io')
 __version__ = _common.__version__
 
+INTEGRITY_FILE = 'integrity.json'
 
-def get_input_path(input_key: str) -> pathlib.Path:
+
+def resources() -> _resources.Resources:
     """
-    Gets the location of a input file and returns it as pathlib object.
-    Keep in mind that you have to define your input files in your ``manifest.json`` in advance!
+    Returns the CPUs and memory available to your app and recommended worker counts and chunk sizes.
+    Within containers, ``os.cpu_count()`` and the total memory report the host - instead, the CPU quota and memory
+    limit are read from the cgroup (v2 or v1) and combined with the ``Demands`` of your ``manifest.json``
+    (once the paths are set)::
+
+        res = resources()
+        with ThreadPoolExecutor(max_workers=res.cpu_workers) as executor:
+            ...
+        for chunk in iter_input_chunks('my_input_key', bytes=res.chunk_bytes):
+            ...
+
+    All parallel and streaming functions of this package use these values as defaults.
+    """
+    demands = ()
+    if _common.get_state().paths:
+        demands = tuple(_common.get_app_manifest().get('Demands', []))
+    return _resources.get_resources(demands)
+
+
+def context(app_dir: str = None, data_root: str = None) -> _common.RunContext:
+    """
+    Creates a ``RunContext`` with its own cache of paths, manifest, input_file_mapping and parameters.
+    Within ``with context:`` all functions of this module use the context, so one process can serve many data roots
+    - even concurrently from different threads::
+
+        with context(app_dir, data_root):
+            my_input = get_input_path('my_input_key')
+
+    Outside of any context, the module wide cache initialized by ``set_paths`` is used.
     """
+    return _common.RunContext(app_dir, data_root)
+
+
+def _get_mapped_input(input_key: str) -> pathlib.Path:
+    """returns the entry of input_key in the input_file_mapping - checks manifest and mapping for the key"""
     manifest = _common.get_app_manifest()['Input']
     input_file_mapping = _common.get_input_file_mapping()
 
@@ -41,9 +90,25 @@ def get_input_path(input_key: str) -> pathlib.Path:
         logger.error(err_msg)
         raise ValueError(err_msg)
 
+    return input_file_mapping[input_key]
+
+
+def get_input_path(input_key: str) -> pathlib.Path:
+    """
+    Gets the location of a input file and returns it as pathlib object.
+    Keep in mind that you have to define your input files in your ``manifest.json`` in advance!
+
+    For inputs mapped to a glob pattern use ``get_input_shards``.
+    """
+    input_file = _get_mapped_input(input_key)
+
+    if _common.is_glob(input_file):
+        err_msg = f"Input '{input_key}' is mapped to the pattern '{input_file}' - use get_input_shards!"
+        logger.error(err_msg)
+        raise ValueError(err_msg)
+
     # check existence
-    input_file = input_file_mapping[input_key]
-    if not input_file.exists():
+    if not _common.input_exists(input_file):
         err_msg = f"Input-file '{input_file}' not found! Please check your input_file_mapping."
         logger.error(err_msg)
         raise FileNotFoundError(err_msg)
@@ -51,6 +116,200 @@ def get_input_path(input_key: str) -> pathlib.Path:
     return input_file
 
 
+def get_input_shards(input_key: str) -> ty.List[pathlib.Path]:
+    """
+    Gets the files of a sharded input. In the input_file_mapping, an input can be mapped to a directory
+    (all non-hidden files) or to a glob pattern like ``"other_app/output/matrix_part_*.csv"``.
+    The shards are returned in natural sort order, an input mapped to a single file is returned as single shard.
+    """
+    input_entry = _get_mapped_input(input_key)
+    shards = _common.resolve_shards(input_entry)
+
+    if not shards:
+        err_msg = f"No input-files found for '{input_entry}'! Please check your input_file_mapping."
+        logger.error(err_msg)
+        raise FileNotFoundError(err_msg)
+    return shards
+
+
+def iter_input_shards(input_key: str, reader: ty.Callable[[pathlib.Path], ty.Any] = _shards.read_shard,
+                      max_workers: int = None, ordered: bool = True) -> ty.Iterator[ty.Tuple[pathlib.Path, ty.Any]]:
+    """
+    Reads the shards of an input concurrently on ``max_workers`` threads and yields
+    ``(shard_path, reader(shard_path))``. By default, the (decompressed) content of each shard is read as bytes.
+    With ``ordered=True``, results are yielded in the order of ``get_input_shards``, else as soon as they are read::
+
+        def count_lines(path):
+            with path.open() as f:
+                return sum(1 for _ in f)
+
+        total = sum(lines for _, lines in iter_input_shards('my_input_key', reader=count_lines, ordered=False))
+    """
+    return _shards.iter_shards(get_input_shards(input_key), reader=reader, max_workers=max_workers, ordered=ordered)
+
+
+def prefetch_inputs(keys: ty.Iterable[str] = None, max_workers: int = None,
+                    method: str = 'auto') -> _prefetch.Prefetch:
+    """
+    Starts warming the page cache for the input files of ``keys`` (default: all inputs of the input_file_mapping) in
+    the background and returns immediately. Call it first, so cold reads overlap with the setup of your app::
+
+        prefetch = prefetch_inputs()
+        ...  # setup
+        stats = prefetch.wait()  # {input_key: PrefetchStats(key, path, bytes, seconds, method)}
+
+    ``method`` can be ``'read'`` (read files on ``max_workers`` threads), ``'fadvise'`` (asynchronous hint to the
+    kernel via ``posix_fadvise``) or ``'auto'`` (``'fadvise'`` where available).
+    Keep in mind that latencies measured for ``'fadvise'`` only cover issuing the hint.
+    """
+    if keys is None:
+        manifest = _common.get_app_manifest()['Input']
+        keys = [key for key in _common.get_input_file_mapping() if key in manifest]
+
+    # shards of sharded inputs are prefetched as ``input_key/shard_name``
+    files = {}
+    for key in keys:
+        shards = get_input_shards(key)
+        if len(shards) == 1 and shards[0] == _get_mapped_input(key):
+            files[key] = shards[0]
+        else:
+            files.update((f"{key}/{shard.name}", shard) for shard in shards)
+
+    return _prefetch.Prefetch(files, method=method, max_workers=max_workers)
+
+
+def open_input(input_key: str, mode: str = 'rt', encoding: str = 'utf-8') -> ty.IO:
+    """
+    Opens an input file for reading. gzip, bz2 and lzma compressed files are detected by their magic bytes and
+    decompressed on the fly::
+
+        with open_input('my_input_key') as f:
+            for line in f:
+                pass
+
+    ``mode`` can be ``'rt'`` for text or ``'rb'`` for binary input.
+    """
+    f_in = _codecs.open_decompressed(get_input_path(input_key), mode=mode, encoding=None if 'b' in mode else encoding)
+    return _metrics.track_input(f_in, input_key)
+
+
+def open_input_mmap(input_key: str) -> _mmap.InputMapping:
+    """
+    Opens a read-only memory mapping of an input file without reading it into memory.
+    The mapping is shared with all other open mappings of the same file and closed, when the last handle is closed::
+
+        with open_input_mmap('my_input_key') as mapping:
+            header = bytes(mapping.buffer[:100])
+            values = mapping.as_numpy(dtype='float64', offset=header_size)  # requires numpy
+    """
+    mapping = _mmap.open_mmap(get_input_path(input_key))
+    if _metrics.enabled():
+        _metrics.record_io('input', input_key)
+    return mapping
+
+
+def get_input_buffer(input_key: str, as_numpy: bool = False, dtype: ty.Any = 'uint8'):
+    """
+    Returns a read-only, zero-copy ``memoryview`` of an input file - or a read-only numpy array, if ``as_numpy`` is set.
+    The underlying mapping is shared by all calls and kept open for the rest of the run,
+    use ``release_input_buffers`` to unmap all files.
+    """
+    buffer = _mmap.pinned_buffer(get_input_path(input_key))
+    if _metrics.enabled():
+        _metrics.record_io('input', input_key)
+    if as_numpy:
+        return _mmap.buffer_as_numpy(buffer, dtype=dtype)
+    return buffer
+
+
+def release_input_buffers():
+    """Releases all mappings created by ``get_input_buffer`` and ``open_input_mmap``."""
+    _mmap.release_all()
+
+
+def iter_input_chunks(input_key: str, rows: int = None, bytes: int = None,
+                      header: bool = True) -> ty.Iterator[_chunks.InputChunk]:
+    """
+    Reads a delimited input file block by block and yields ``InputChunk`` tuples of ``(header, rows, start_row)``.
+    Each chunk contains at most ``rows`` rows or about ``bytes`` bytes of text, so files larger than memory can be
+    processed with constant memory usage::
+
+        for chunk in iter_input_chunks('my_input_key', rows=10000):
+            process(chunk.header, chunk.rows)
+
+    The delimiter is guessed once per file. The parser is chosen by the ``Type`` of the input in the ``manifest.json``:
+    numeric columns of ``expressionMatrix`` and ``geneMatrix`` inputs are converted to numbers, all other types are
+    returned as strings. Compressed inputs are decompressed on the fly.
+    """
+    input_path = get_input_path(input_key)
+    input_type = _common.get_app_manifest()['Input'][input_key]['Type']
+    parser = _chunks.get_parser(input_type)
+
+    return _chunks.iter_chunks(input_path, parser=parser, rows=rows, bytes=bytes, header=header,
+                               open_func=_metrics.input_opener(input_key, _codecs.open_decompressed))
+
+
+def load_input_array(input_key: str, dtype: ty.Any = 'float64', header: bool = True) -> _array_cache.ArrayInput:
+    """
+    Returns a delimited input file as memory-mapped numpy arrays (requires numpy). The file is parsed only once and
+    stored as ``.npy`` in a cache directory, later calls map the cached arrays instead of parsing the text again::
+
+        array_input = load_input_array('my_input_key')
+        means = array_input.data.mean(axis=0)
+        gene_ids = array_input.labels[:, 0]
+
+    Columns are numeric, if they are numeric in the first row. They are stored in ``data`` (a 2D array of ``dtype``),
+    all other columns are stored as strings in ``labels``. Column names are given by ``columns`` and ``label_columns``.
+
+    The cache directory is set by ``FG_ARRAY_CACHE_DIR`` (default: in the temporary directory) and limited to
+    ``FG_ARRAY_CACHE_SIZE`` bytes (default: 10 GiB), least recently used entries are evicted first.
+    Entries are identified by the content of the file, a changed file is converted again.
+    """
+    array_input = _array_cache.load(get_input_path(input_key), dtype=dtype, header=header)
+    if _metrics.enabled():
+        _metrics.record_io('input', input_key)
+    return array_input
+
+
+def clear_array_cache():
+    """Removes all entries of the cache of ``load_input_array``."""
+    _array_cache.clear()
+
+
+def load_sparse_input(input_key: str, format: str = 'csr', dtype: ty.Any = 'float64',
+                      header: bool = True, layout: str = 'auto') -> _sparse.SparseMatrix:
+    """
+    Reads a matrix input like an ``expressionMatrix`` into a sparse matrix (requires numpy). Inputs can be dense
+    delimited text, triplets in long format (``cellId,geneId,expressionValue``) or Matrix Market coordinate files,
+    maybe compressed. They are parsed block by block and only the non-zeros are kept, so memory is proportional to
+    the number of non-zeros::
+
+        matrix = load_sparse_input('my_input_key', format='csc')
+        matrix.data, matrix.indices, matrix.indptr, matrix.shape  # like scipy.sparse.csc_matrix
+        scipy_matrix = matrix.to_scipy()  # requires scipy
+
+    For dense text, a non-numeric first column is returned as ``row_names`` and the header as ``column_names``.
+    For triplets, the cell and gene ids are returned as ``row_names`` and ``column_names``. The layout is detected
+    by the header (``cellId,geneId,expressionValue``) or, with ``header=False``, by a non-numeric second column in the
+    first row - use ``layout='dense'`` or ``'triplet'`` to choose it explicitly.
+    """
+    input_path = get_input_path(input_key)
+    start = time.perf_counter()
+    matrix = _sparse.read_sparse(input_path, dtype=dtype, format=format, header=header, layout=layout)
+    if _metrics.enabled():
+        _metrics.record_io('input', input_key, bytes=input_path.stat().st_size, seconds=time.perf_counter() - start)
+    return matrix
+
+
+def write_sparse_output(output_key: str, matrix, compression: ty.Optional[str] = 'auto'):
+    """
+    Writes a ``SparseMatrix`` or scipy sparse matrix as Matrix Market coordinate file to the output of
+    ``output_key`` - atomically and compressed like ``open_output``.
+    """
+    with open_output(output_key, mode='w', compression=compression) as f_out:
+        _sparse.write_matrix_market(matrix, f_out)
+
+
 def get_output_path(output_key: str) -> pathlib.Path:
     """
     Gets the location of the output file and returns it as a ``pathlib.Path``.
@@ -86,6 +345,55 @@ def get_output_path(output_key: str) -> pathlib.Path:
     return output_file
 
 
+def open_output(output_key: str, mode: str = 'w', buffer_size: int = None,
+                encoding: str = 'utf-8', compression: ty.Optional[str] = 'auto',
+                max_workers: int = None) -> ty.Union[_output.AtomicOutput, _codecs.CompressedOutput]:
+    """
+    Opens the output file of ``output_key`` for writing. Data is buffered (``buffer_size`` bytes, default:
+    ``resources().buffer_bytes``) and written to a temporary file by a background thread. On success, the file is
+    synced and atomically renamed to its final name, if an exception is raised, the temporary file is removed and
+    no partial output is left behind::
+
+        with open_output('my_output_key') as f_out:
+            f_out.write("something")
+        print(f_out.stats.bytes_written, f_out.stats.throughput)
+
+    ``mode`` can be ``'w'`` for text or ``'wb'`` for binary output.
+
+    With ``compression='auto'``, the codec is chosen by the extension of the ``FileName`` given in the
+    ``manifest.json`` (``.gz``, ``.bz2``, ``.xz``). You can also choose ``'gzip'``, ``'bz2'``, ``'lzma'`` or ``None``
+    explicitly. Compression runs block by block on ``max_workers`` threads.
+    """
+    output_path = get_output_path(output_key)
+
+    if compression == 'auto':
+        codec = _codecs.codec_from_extension(output_path)
+    elif compression is None:
+        codec = None
+    else:
+        codec = _codecs.get_codec(compression)
+
+    on_close = _metrics.output_recorder(output_key)
+    resources = _resources.get_resources()
+    if buffer_size is None:
+        buffer_size = resources.buffer_bytes
+    if codec is None:
+        return _output.AtomicOutput(output_path, mode=mode, buffer_size=buffer_size, encoding=encoding,
+                                    on_close=on_close)
+
+    raw = _output.AtomicOutput(output_path, mode='wb', buffer_size=buffer_size)
+    try:
+        f_out = _codecs.CompressedOutput(raw, codec, mode=mode, encoding=encoding, block_size=resources.block_bytes,
+                                         max_workers=resources.cpu_workers if max_workers is None else max_workers)
+    except BaseException:
+        raw.abort()
+        raise
+    if on_close is not None:
+        # the raw file only knows the compressed size
+        raw.on_close = lambda stats: on_close(stats, uncompressed_bytes=f_out.bytes_in)
+    return f_out
+
+
 def get_summary_path() -> pathlib.Path:
     """
     Gets the location of the summary file and returns it as a pathlib object.
@@ -106,3 +414,163 @@ def get_summary_path() -> pathlib.Path:
         logger.warning(err_msg)
 
     return output_file
+
+
+def get_integrity_path() -> pathlib.Path:
+    """Gets the location of the integrity sidecar ``integrity.json`` next to the outputs."""
+    return _common.get_paths()['output'] / INTEGRITY_FILE
+
+
+def _integrity_files() -> ty.Dict[str, pathlib.Path]:
+    """returns all mapped input files, existing outputs and the summary as ``{name: path}``"""
+    files = {}
+    for key, input_entry in _common.get_input_file_mapping().items():
+        shards = _common.resolve_shards(input_entry)
+        if shards == [input_entry]:
+            files[f"input/{key}"] = input_entry
+        else:
+            files.update((f"input/{key}/{shard.name}", shard) for shard in shards)
+
+    paths = _common.get_paths()
+    for key, output in _common.get_app_manifest()['Output'].items():
+        output_file = paths['output'] / output['FileName']
+        if output_file.exists():
+            files[f"output/{key}"] = output_file
+    summary_file = paths['summary'] / 'summary.md'
+    if summary_file.exists():
+        files['summary'] = summary_file
+    return files
+
+
+def write_integrity_manifest(algorithm: str = 'sha256', max_workers: int = None) -> pathlib.Path:
+    """
+    Computes checksums (``'sha256'`` or ``'blake2b'``) of all mapped inputs, all existing outputs of the
+    ``manifest.json`` and the summary on ``max_workers`` threads and writes them to ``integrity.json`` next to the
+    outputs. Files, which are unchanged in size and mtime since the last call, are not hashed again.
+    """
+    sidecar = get_integrity_path()
+    checksums = _integrity.compute_checksums(_integrity_files(), algorithm=algorithm, max_workers=max_workers,
+                                             previous=_integrity.read_sidecar(sidecar))
+    _integrity.write_sidecar(sidecar, checksums)
+    logger.info(f"Checksums of {len(checksums)} files written to {sidecar}")
+    return sidecar
+
+
+def verify_integrity_manifest(max_workers: int = None, full: bool = False) -> ty.Dict[str, str]:
+    """
+    Verifies the files of ``integrity.json`` and returns ``{name: status}`` with status ``'unchanged'``, ``'ok'``,
+    ``'changed'`` or ``'missing'``. Only files with changed size or mtime are hashed again, unless ``full`` is set.
+    """
+    sidecar = get_integrity_path()
+    checksums = _integrity.read_sidecar(sidecar)
+    if not checksums:
+        err_msg = f"Integrity manifest '{sidecar}' not found!"
+        logger.error(err_msg)
+        raise FileNotFoundError(err_msg)
+
+    results = _integrity.verify(checksums, max_workers=max_workers, full=full)
+    for name, status in results.items():
+        if status in (_integrity.CHANGED, _integrity.MISSING):
+            logger.error(f"Integrity check failed for '{name}' ({checksums[name].path}): {status}")
+    return results
+
+
+def _get_scratch_space() -> _scratch.ScratchSpace:
+    state = _common.get_state()
+    with state.lock:
+        if state.scratch is None:
+            state.scratch = _scratch.ScratchSpace()
+        return state.scratch
+
+
+def get_scratch_path(name: str, size_hint: int = 0) -> pathlib.Path:
+    """
+    Returns the path of the scratch file ``name`` for intermediate results, which are no outputs of your app.
+    Scratch files are placed into memory (``/dev/shm``), if ``size_hint`` bytes fit into the memory quota of the run
+    (``FG_SCRATCH_QUOTA``) and the free space there, else onto disk (``FG_SCRATCH_DIR``).
+    All scratch files of a run are removed at exit or by ``cleanup_scratch``::
+
+        tmp_file = get_scratch_path('distances.npy', size_hint=n_cells ** 2 * 8)
+    """
+    return _get_scratch_space().get_path(name, size_hint=size_hint)
+
+
+def open_scratch(name: str, size_hint: int = 0) -> _scratch.SpillingFile:
+    """
+    Opens the scratch file ``name`` for binary writing. It starts in memory like ``get_scratch_path`` and is moved
+    to disk transparently, as soon as it would exceed the memory quota. ``f.path`` is its current location::
+
+        with open_scratch('intermediate.bin') as f:
+            f.write(data)
+        read_back = f.path.read_bytes()
+    """
+    return _get_scratch_space().open(name, size_hint=size_hint)
+
+
+def get_scratch_usage() -> ty.Dict[str, ty.Any]:
+    """Returns the memory quota, the bytes used in memory and the location (memory or disk) of all scratch files."""
+    return _get_scratch_space().usage()
+
+
+def cleanup_scratch():
+    """Removes all scratch files of the run - also done automatically at exit."""
+    _get_scratch_space().cleanup()
+
+
+def get_metrics() -> dict:
+    """
+    Returns the metrics collected so far, if collection is enabled by the environment variable ``FG_METRICS=1``:
+    wall times of loading manifest, input_file_mapping and parameters and per input / output key the number of
+    opens, the bytes read or written (characters for text inputs) and the throughput.
+
+    At exit, the metrics are appended as "Performance" section to the summary file and written as JSON to
+    ``FG_METRICS_FILE``, if set.
+    """
+    return _metrics.get_metrics()
+
+
+def write_metrics(path: pathlib.Path):
+    """Writes the metrics collected so far as JSON to path."""
+    _metrics.write_json(path)
+
+
+def append_performance_summary():
+    """
+    Appends the metrics collected so far as "Performance" section to the summary file.
+    Called automatically at exit, if collection is enabled by ``FG_METRICS``.
+    """
+    manifest = _common.get_app_manifest()
+    if manifest['Type'] != 'Calculation':
+        err_msg = f"File output for '{manifest['Type']}' applications not supported!"
+        raise _common.NotSupportedError(err_msg)
+    _metrics.append_markdown(_common.get_paths()['summary'] / 'summary.md')
+
+
+def _append_performance_summary_at_exit():
+    """appends the "Performance" section, if the paths of the process were set"""
+    if _common.get_state().paths:
+        append_performance_summary()
+
+
+_metrics.add_exit_callback(_append_performance_summary_at_exit)
+
+
+def profile(mode: str = None, top: int = 30, output_dir: pathlib.Path = None) -> _profile.Profile:
+    """
+    Profiles a block or function with ``mode`` ``'cpu'`` (``cProfile``), ``'mem'`` (``tracemalloc``) or ``'both'``.
+    If ``mode`` is not given, it is read from the environment variable ``FG_PROFILE`` - without it, the block runs
+    unprofiled. So profiling becomes a setting of a normal run::
+
+        @profile()
+        def main():
+            ...
+
+        with profile('cpu', top=50):
+            ...
+
+    The peak RSS is sampled during the block. ``profile.pstats`` (cpu) and the report ``profile.txt`` with the ``top``
+    entries are written into ``output_dir`` (default: the summary directory).
+    Keep in mind that ``cProfile`` only covers the thread entering the block.
+    """
+    return _profile.Profile(mode=mode, top=top, output_dir=output_dir,
+                            get_output_dir=lambda: _common.get_paths()['summary'])
@@ -0,0 +1,231 @@
+"""
+FASTGenomics run plan: Resolves paths, manifest, input_file_mapping and parameters once and stores them as a compact
+snapshot, so later runs can start with a single read instead of repeating the whole resolution.
+
+The plan is stamped with modification times, sizes and hashes of all sources (``manifest.json``,
+``input_file_mapping.json``, ``parameters.json``, the ``INPUT_FILE_MAPPING`` environment and all mapped input files).
+If anything changed, the plan is discarded and everything is resolved again.
+
+Usage - call it instead of ``set_paths`` at the start of your app::
+
+    from fastgenomics import plan as fg_plan
+
+    fg_plan.initialize()  # or fg_plan.initialize(app_dir, data_root)
+
+The location of the plan file can be set by the environment variable ``FG_RUN_PLAN``,
+the default is a file in the temporary directory.
+"""
+import hashlib
+import marshal
+import os
+import pathlib
+import tempfile
+import typing as ty
+from logging import getLogger
+
+from . import _common
+
+logger = getLogger('fastgenomics.plan')
+
+PLAN_FILE_ENV = 'FG_RUN_PLAN'
+PLAN_FORMAT = 2
+
+# (path, mtime_ns, size, sha256) - mtime_ns, size and sha256 are None for missing files,
+# sha256 is only stored for config files
+Stamp = ty.Tuple[str, ty.Optional[int], ty.Optional[int], ty.Optional[str]]
+
+
+class RunPlan(ty.NamedTuple):
+    """resolved state of a run"""
+    paths: _common.PathsDict
+    manifest: dict
+    input_file_mapping: _common.FileMapping
+    parameters: ty.Dict[str, _common.Parameter]
+    ifm_env_hash: str
+    stamps: ty.List[Stamp]
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def stamp_file(path: pathlib.Path, with_hash: bool = False) -> Stamp:
+    """returns the stamp of a file"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return str(path), None, None, None
+    digest = _sha256(path.read_bytes()) if with_hash else None
+    return str(path), stat.st_mtime_ns, stat.st_size, digest
+
+
+def stamp_is_current(stamp: Stamp) -> bool:
+    """checks, if a file is unchanged - if only its mtime changed, its hash is compared"""
+    path_str, mtime_ns, size, digest = stamp
+    path = pathlib.Path(path_str)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return mtime_ns is None
+    if mtime_ns is None or stat.st_size != size:
+        return False
+    if stat.st_mtime_ns == mtime_ns:
+        return True
+    return digest is not None and _sha256(path.read_bytes()) == digest
+
+
+def _ifm_env_hash() -> str:
+    return _sha256(os.environ.get('INPUT_FILE_MAPPING', '{}').encode('utf-8'))
+
+
+def build_plan() -> RunPlan:
+    """resolves paths, manifest, input_file_mapping and parameters by ``fastgenomics._common``"""
+    paths = _common.get_paths()
+    manifest = _common.get_app_manifest()
+    input_file_mapping = _common.get_input_file_mapping(check_mapping=True)
+    parameter_store = _common.get_parameter_store()
+
+    config_files = [paths['app'] / 'manifest.json',
+                    paths['config'] / 'input_file_mapping.json',
+                    paths['config'] / 'parameters.json']
+    stamps = [stamp_file(path, with_hash=True) for path in config_files]
+    stamps += [stamp_file(path) for path in input_file_mapping.values()]
+
+    parameters = {name: parameter_store.parameter(name) for name in parameter_store}
+    return RunPlan(paths=dict(paths), manifest=manifest, input_file_mapping=dict(input_file_mapping),
+                   parameters=parameters, ifm_env_hash=_ifm_env_hash(), stamps=stamps)
+
+
+def apply_plan(plan: RunPlan):
+    """sets the cache of ``fastgenomics._common`` (or of the active RunContext) to the state of the plan"""
+    state = _common.get_state()
+    with state.lock:
+        state.paths = dict(plan.paths)
+        state.manifest = plan.manifest
+        state.input_file_mapping = dict(plan.input_file_mapping)
+        state.parameters = _common.ParameterStore(plan.parameters)
+        # like set_paths: listings and shards of another data root are outdated
+        state.directory_listings = {}
+        state.shards = {}
+
+
+def plan_is_current(plan: RunPlan) -> bool:
+    """checks, if none of the sources of the plan changed"""
+    if plan.ifm_env_hash != _ifm_env_hash():
+        return False
+    return all(stamp_is_current(stamp) for stamp in plan.stamps)
+
+
+def get_plan_file(app_dir: str = None, data_root: str = None) -> pathlib.Path:
+    """returns the location of the plan file - from ``FG_RUN_PLAN`` or in the temporary directory"""
+    plan_file = os.environ.get(PLAN_FILE_ENV)
+    if plan_file:
+        return pathlib.Path(plan_file)
+    key = _sha256(f"{app_dir}|{data_root}".encode('utf-8'))[:16]
+    return pathlib.Path(tempfile.gettempdir()) / f"fastgenomics-run-plan-{key}.marshal"
+
+
+def _marshal_payload(param: _common.Parameter) -> _common.Parameter:
+    """replaces a payload by its reference - payloads are not loaded into the plan"""
+    if isinstance(param.value, _common.ParameterPayload):
+        return param._replace(value=param.value.reference)
+    return param
+
+
+def _unmarshal_payload(name: str, param: _common.Parameter) -> _common.Parameter:
+    if param.type == 'list' and _common.is_payload_reference(param.value):
+        return param._replace(value=_common.ParameterPayload(name, param.value['File'], items=param.items))
+    return param
+
+
+def _to_marshal(plan: RunPlan) -> bytes:
+    """serializes the plan into plain python types"""
+    return marshal.dumps({
+        'format': PLAN_FORMAT,
+        'version': _common.VERSION,
+        'paths': {key: str(path) for key, path in plan.paths.items()},
+        'manifest': plan.manifest,
+        'input_file_mapping': {key: str(path) for key, path in plan.input_file_mapping.items()},
+        'parameters': {name: tuple(_marshal_payload(param)) for name, param in plan.parameters.items()},
+        'ifm_env_hash': plan.ifm_env_hash,
+        'stamps': [tuple(stamp) for stamp in plan.stamps],
+    })
+
+
+def _from_marshal(data: bytes) -> ty.Optional[RunPlan]:
+    """deserializes a plan - returns None for plans of other formats or versions"""
+    raw = marshal.loads(data)
+    if raw.get('format') != PLAN_FORMAT or raw.get('version') != _common.VERSION:
+        return None
+    return RunPlan(paths={key: pathlib.Path(path) for key, path in raw['paths'].items()},
+                   manifest=raw['manifest'],
+                   input_file_mapping={key: pathlib.Path(path) for key, path in raw['input_file_mapping'].items()},
+                   parameters={name: _unmarshal_payload(name, _common.Parameter(*param))
+                               for name, param in raw['parameters'].items()},
+                   ifm_env_hash=raw['ifm_env_hash'],
+                   stamps=[tuple(stamp) for stamp in raw['stamps']])
+
+
+def save_plan(plan: RunPlan, plan_file: pathlib.Path):
+    """writes the plan atomically to plan_file"""
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{plan_file.name}.', suffix='.tmp', dir=str(plan_file.parent))
+    tmp_file = pathlib.Path(tmp_name)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_to_marshal(plan))
+        os.replace(str(tmp_file), str(plan_file))
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+
+def load_plan(plan_file: pathlib.Path) -> ty.Optional[RunPlan]:
+    """loads a plan from plan_file - returns None, if there is no valid and current plan"""
+    try:
+        data = plan_file.read_bytes()
+    except OSError:
+        return None
+
+    try:
+        plan = _from_marshal(data)
+    except (EOFError, ValueError, TypeError, KeyError, AttributeError) as e:
+        logger.warning(f"Ignoring corrupt run plan {plan_file}: {e}")
+        return None
+
+    if plan is None or not plan_is_current(plan):
+        logger.info(f"Run plan {plan_file} is outdated.")
+        return None
+    return plan
+
+
+def _requested_paths(app_dir: str = None, data_root: str = None) -> ty.Tuple[pathlib.Path, pathlib.Path]:
+    """returns app directory and data root like ``set_paths`` would resolve them"""
+    if app_dir is None:
+        app_dir = os.environ.get("FG_APP_DIR", _common.DEFAULT_APP_DIR)
+    if data_root is None:
+        data_root = os.environ.get("FG_DATA_ROOT", _common.DEFAULT_DATA_ROOT)
+    return pathlib.Path(app_dir).absolute(), pathlib.Path(data_root).absolute()
+
+
+def initialize(app_dir: str = None, data_root: str = None, plan_file: pathlib.Path = None) -> RunPlan:
+    """
+    initializes ``fastgenomics.io`` from the run plan, if it is still current.
+    Otherwise paths are set by ``set_paths(app_dir, data_root)``, everything is resolved and the plan is stored.
+    """
+    app_path, data_root_path = _requested_paths(app_dir, data_root)
+    plan_file = pathlib.Path(plan_file) if plan_file else get_plan_file(str(app_path), str(data_root_path))
+
+    plan = load_plan(plan_file)
+    if plan is not None and plan.paths['app'] == app_path and plan.paths['data'].parent == data_root_path:
+        logger.info(f"Using run plan {plan_file}")
+        apply_plan(plan)
+        return plan
+
+    _common.set_paths(app_dir, data_root)
+    plan = build_plan()
+    try:
+        save_plan(plan, plan_file)
+        logger.info(f"Stored run plan {plan_file}")
+    except OSError as e:
+        logger.warning(f"Could not store run plan {plan_file}: {e}")
+    return plan
@@ -1,11 +1,14 @@
 #!/usr/bin/env python
+import re
 import sys
 import pip
 
 from setuptools import setup
 from distutils.version import LooseVersion
 
-VERSION = '0.6.0'  # scheme: breaking major, non-breaking feature, fix
+# the version is defined in fastgenomics/_version.py, so it can be imported without reading this file
+with open('fastgenomics/_version.py') as version_f:
+    VERSION = re.search(r"VERSION = '([\d.]+)'", version_f.read())[1]
 
 
 # check python and pip versions
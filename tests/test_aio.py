@@ -0,0 +1,77 @@
+import asyncio
+import shutil
+import weakref
+
+import pytest
+
+from fastgenomics import _common
+from fastgenomics import aio as fg_aio
+from fastgenomics import io as fg_io
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def aio_local(local, monkeypatch):
+    """resets the shared initialization"""
+    monkeypatch.setattr("fastgenomics.aio._INIT_FUTURES", weakref.WeakKeyDictionary())
+
+
+def test_initialization_is_shared(aio_local, monkeypatch):
+    calls = []
+    validate = _common.assert_manifest_is_valid
+    monkeypatch.setattr("fastgenomics._common.assert_manifest_is_valid", lambda config: calls.append(validate(config)))
+
+    async def main():
+        return await asyncio.gather(*[fg_aio.get_parameter("IntValue") for _ in range(10)])
+
+    assert run(main()) == [150] * 10
+    assert len(calls) == 1
+
+
+def test_uses_active_run_context(aio_local, app_dir, data_root, tmp_path):
+    other_root = tmp_path / "data_root"
+    shutil.copytree(str(data_root), str(other_root))
+
+    async def main():
+        return await fg_aio.get_input_path("some_input"), await fg_aio.get_parameter("IntValue")
+
+    with fg_io.context(app_dir, other_root) as ctx:
+        input_path, value = run(main())
+        assert ctx in fg_aio._INIT_FUTURES and ctx.parameters
+    assert input_path == other_root / "data" / "input.csv" and value == 150
+    assert _common.get_state() not in fg_aio._INIT_FUTURES
+
+
+def test_can_get_paths(aio_local):
+    async def main():
+        return await fg_aio.get_input_path("some_input"), await fg_aio.get_output_path("some_output")
+
+    input_path, output_path = run(main())
+    assert input_path.exists()
+    assert output_path.name == "some_output.csv"
+
+
+def test_can_iter_input_chunks(aio_local):
+    async def main():
+        return [chunk async for chunk in fg_aio.iter_input_chunks("some_input")]
+
+    chunks = run(main())
+    assert len(chunks) == 1
+    assert chunks[0].rows == [["42", "4711"]]
+
+
+def test_can_open_output(aio_local, clear_output):
+    async def main():
+        async with fg_aio.open_output("some_output") as out:
+            await out.write("foo,bar\n")
+        return out
+
+    out = run(main())
+    assert out.stats.path.read_text() == "foo,bar\n"
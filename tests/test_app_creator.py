@@ -0,0 +1,86 @@
+import csv
+import json
+import shutil
+
+import pytest
+
+from fastgenomics import app_creator
+from fastgenomics import io as fg_io
+
+
+def test_can_generate_sample_data(local, app_dir, tmp_path):
+    sample_dir = tmp_path / "sample_data"
+    for name in ("config", "data", "output", "summary"):
+        (sample_dir / name).mkdir(parents=True)
+    (sample_dir / "data" / "other.csv").touch()
+    (sample_dir / "config" / "input_file_mapping.json").write_text('{"other_key": "other.csv"}')
+
+    mapping = app_creator.generate_sample_data(sample_dir, n_cells=250, n_genes=50, density=0.2, seed=1, shards=3,
+                                               max_workers=2)
+    assert list(mapping) == ["some_input"]
+    assert json.loads((sample_dir / "config" / "input_file_mapping.json").read_text()) == {
+        "other_key": "other.csv", "some_input": mapping["some_input"]}
+
+    # the sharded input is readable by fastgenomics.io
+    fg_io.set_paths(app_dir, sample_dir)
+    shards = fg_io.get_input_shards("some_input")
+    assert [shard.name for shard in shards] == ["part_0.csv", "part_1.csv", "part_2.csv"]
+    with shards[-1].open() as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["cellId", "batch"]
+    assert rows[-1] == ["cell_249", "batch_0"] and len(rows) == 250 - 166 + 1
+
+    # reproducible
+    first = shards[0].read_text()
+    app_creator.generate_sample_data(sample_dir, n_cells=250, n_genes=50, density=0.2, seed=1, shards=3)
+    assert shards[0].read_text() == first
+
+    # fewer shards replace all earlier ones
+    app_creator.generate_sample_data(sample_dir, n_cells=250, n_genes=50, density=0.2, seed=1, shards=2,
+                                     max_workers=1)
+    fg_io.set_paths(app_dir, sample_dir)
+    assert [shard.name for shard in fg_io.get_input_shards("some_input")] == ["part_0.csv", "part_1.csv"]
+
+
+def test_generated_expression_matrix_is_sparse(tmp_path):
+    path = tmp_path / "matrix.csv"
+    n_rows = app_creator._write_shard((path, "matrix", True, 0, 200, 100, 0.1, 0))
+
+    with path.open() as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["cellId", "geneId", "expressionValue"]
+    assert len(rows) == n_rows + 1
+    assert 0.05 * 200 * 100 < n_rows < 0.15 * 200 * 100
+    assert all(int(value) > 0 for _, _, value in rows[1:])
+    assert len(set((cell, gene) for cell, gene, _ in rows[1:])) == n_rows
+
+
+def test_generated_expression_matrix_can_be_loaded_sparse(local, app_dir, tmp_path):
+    pytest.importorskip("numpy")
+    matrix_app = tmp_path / "app"
+    shutil.copytree(str(app_dir), str(matrix_app))
+    manifest = json.loads((matrix_app / "manifest.json").read_text())
+    manifest["FASTGenomicsApplication"]["Input"]["some_input"]["Type"] = "expressionMatrix"
+    (matrix_app / "manifest.json").write_text(json.dumps(manifest))
+    sample_dir = tmp_path / "sample_data"
+    for name in ("config", "data", "output", "summary"):
+        (sample_dir / name).mkdir(parents=True)
+    (sample_dir / "config" / "input_file_mapping.json").write_text("{}")
+
+    fg_io.set_paths(matrix_app, sample_dir)
+    app_creator.generate_sample_data(sample_dir, n_cells=120, n_genes=40, density=0.2, seed=3, max_workers=1)
+    fg_io.set_paths(matrix_app, sample_dir)
+    with fg_io.get_input_path("some_input").open() as f:
+        rows = list(csv.reader(f))[1:]
+
+    matrix = fg_io.load_sparse_input("some_input")
+    assert matrix.nnz == len(rows)
+    assert matrix.shape == (len(matrix.row_names), len(matrix.column_names))
+    assert matrix.row_names[0] == "cell_0" and all(name.startswith("gene_") for name in matrix.column_names)
+    cell, gene, value = rows[-1]
+    row, column = matrix.row_names.index(cell), matrix.column_names.index(gene)
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    assert matrix.data[start:end][list(matrix.indices[start:end]).index(column)] == float(value)
+
+    csc = fg_io.load_sparse_input("some_input", format="csc")
+    assert csc.nnz == matrix.nnz and csc.column_names == matrix.column_names
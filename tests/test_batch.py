@@ -0,0 +1,42 @@
+import json
+import shutil
+
+from fastgenomics import batch
+from fastgenomics import io as fg_io
+
+
+def write_int_value():
+    value = fg_io.get_parameter("IntValue")
+    if value < 0:
+        raise ValueError("negative value")
+    with fg_io.open_output("some_output") as out:
+        out.write(str(value))
+
+
+def make_data_root(data_root, target, int_value):
+    shutil.copytree(str(data_root), str(target))
+    (target / "config" / "parameters.json").write_text(json.dumps({"IntValue": int_value}))
+    return target
+
+
+def test_run_many(app_dir, data_root, tmp_path):
+    roots = [make_data_root(data_root, tmp_path / f"root_{i}", i) for i in range(3)]
+    roots.append(make_data_root(data_root, tmp_path / "failing", -1))
+    report = tmp_path / "report.json"
+
+    results = batch.run_many(write_int_value, roots, app_dir=str(app_dir), max_workers=2, report_path=report)
+
+    assert [result.status for result in results] == ["ok", "ok", "ok", "failed"]
+    assert "negative value" in results[-1].error
+    for i in range(3):
+        assert (roots[i] / "output" / "some_output.csv").read_text() == str(i)
+
+    saved = json.loads(report.read_text())
+    assert saved["n_ok"] == 3
+    assert saved["n_failed"] == 1
+    assert saved["runs"][0]["data_root"] == str(roots[0])
+
+
+def test_resolve_entry_point():
+    assert batch.resolve_entry_point("json:dumps") is json.dumps
+    assert batch.resolve_entry_point(write_int_value) is write_int_value
@@ -0,0 +1,65 @@
+import shutil
+
+from fastgenomics import _common
+from fastgenomics import cache as fg_cache
+
+
+def test_results_are_restored_for_same_inputs(local, monkeypatch, app_dir, data_root, tmp_path):
+    root = tmp_path / "data_root"
+    shutil.copytree(str(data_root), str(root))
+    for name in ("output", "summary"):
+        for path in (root / name).iterdir():
+            path.unlink()
+    monkeypatch.setenv("FG_RESULT_CACHE_DIR", str(tmp_path / "cache"))
+    _common.set_paths(app_dir, root)
+
+    calls = []
+
+    def main():
+        calls.append(1)
+        (root / "output" / "some_output.csv").write_text("result")
+        (root / "summary" / "summary.md").write_text("# Summary")
+
+    assert not fg_cache.run(main)
+    (root / "output" / "some_output.csv").unlink()
+    (root / "summary" / "summary.md").unlink()
+
+    assert fg_cache.run(main)
+    assert len(calls) == 1
+    assert (root / "output" / "some_output.csv").read_text() == "result"
+    assert (root / "summary" / "summary.md").read_text() == "# Summary"
+
+    # changed input changes the key, the old entry is evicted by the size limit
+    (root / "data" / "input.csv").write_text("foo,bar\n1,2\n")
+    monkeypatch.setenv("FG_RESULT_CACHE_SIZE", "1")
+    assert not fg_cache.run(main)
+    assert len(calls) == 2
+    assert len(list((tmp_path / "cache").glob("*/entry.json"))) == 1
+
+
+def test_writing_restored_outputs_keeps_cache_intact(local, monkeypatch, app_dir, data_root, tmp_path):
+    root = tmp_path / "data_root"
+    shutil.copytree(str(data_root), str(root))
+    for name in ("output", "summary"):
+        for path in (root / name).iterdir():
+            path.unlink()
+    monkeypatch.setenv("FG_RESULT_CACHE_DIR", str(tmp_path / "cache"))
+    _common.set_paths(app_dir, root)
+    output = root / "output" / "some_output.csv"
+
+    def main():
+        output.write_text("result")
+        (root / "summary" / "summary.md").write_text("# Summary")
+
+    assert not fg_cache.run(main)
+    # in place writes to a stored output do not reach the cache
+    with output.open("w") as f:
+        f.write("overwritten")
+    assert fg_cache.run(main)
+    assert output.read_text() == "result"
+
+    # neither do writes to a restored output
+    with output.open("w") as f:
+        f.write("overwritten")
+    assert fg_cache.run(main)
+    assert output.read_text() == "result"
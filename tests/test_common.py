@@ -135,3 +135,157 @@ def test_get_input_file_mapping(local):
     input_file_mapping = _common.get_input_file_mapping()
     assert "some_input" in input_file_mapping
     assert input_file_mapping['some_input'].exists()
+
+
+def test_manifest_validator_is_compiled_once(local):
+    assert _common.get_manifest_validator() is _common.get_manifest_validator()
+
+
+def test_validation_cache(local, monkeypatch, tmp_path):
+    monkeypatch.setenv('FG_VALIDATION_CACHE_DIR', str(tmp_path))
+    _common.get_app_manifest()
+    assert len(list(tmp_path.glob('manifest-*.valid'))) == 1
+
+    # an unchanged manifest is not validated again
+    def fail(config):
+        raise AssertionError("manifest validated twice")
+
+    monkeypatch.setattr("fastgenomics._common._MANIFEST", {})
+    monkeypatch.setattr("fastgenomics._common.assert_manifest_is_valid", fail)
+    assert _common.get_app_manifest()['Name'] == "Batch effect classifier"
+
+
+def test_parameter_store(local):
+    store = _common.get_parameter_store()
+    assert store is _common.get_parameter_store()
+    assert store["IntValue"] == 150
+    assert store.get_int("IntValue") == 150
+    assert store.get_float("IntValue") == 150.0
+    assert store.get_list("ListValue") == (1, 2, 3)
+    assert store.get_dict("DictValue")["foo"] == 42
+    assert store.get_int("OptionalIntValueNull") is None
+    assert store.parameter("StrValue").value == "hello from parameters.json"
+    assert store.parameter("StrValue").default == "batch_id"
+
+    # immutable
+    with pytest.raises(TypeError):
+        store.view["IntValue"] = 1
+    with pytest.raises(TypeError):
+        store.get_dict("DictValue")["foo"] = 1
+    with pytest.raises(AttributeError):
+        store.foo = 1
+
+    # wrappers return copies
+    parameters = _common.get_parameters()
+    parameters["IntValue"] = 1
+    assert _common.get_parameter("IntValue") == 150
+
+
+def test_typed_getters_do_not_truncate(local, monkeypatch):
+    monkeypatch.setattr("fastgenomics._common.load_runtime_parameters", lambda: {"IntValue": 1.5})
+    store = _common.get_parameter_store()
+    assert store.get_float("IntValue") == 1.5
+    with pytest.raises(ValueError):
+        store.get_int("IntValue")
+
+
+def test_bool_getter_is_strict(local, monkeypatch):
+    monkeypatch.setattr("fastgenomics._common.load_runtime_parameters",
+                        lambda: {"BoolValue": "false", "IntValue": 0})
+    store = _common.get_parameter_store()
+    assert store.get_bool("BoolValue") is False
+    with pytest.raises(ValueError):
+        store.get_bool("IntValue")
+
+
+def test_get_default_parameters(local):
+    defaults = _common.get_default_parameters()
+    assert defaults["StrValue"] == "batch_id"
+
+
+def test_find_missing_files(local, tmp_path):
+    files = []
+    for i in range(5):
+        sub_dir = tmp_path / f"dir_{i}"
+        sub_dir.mkdir()
+        for j in range(20):
+            (sub_dir / f"file_{j}.csv").touch()
+            files.append(sub_dir / f"file_{j}.csv")
+    missing = [tmp_path / "dir_0" / "missing.csv", tmp_path / "no_dir" / "file_0.csv"]
+
+    assert _common.find_missing_files(files + missing, max_workers=4) == missing
+
+    # listings are cached for the rest of the run
+    (tmp_path / "dir_0" / "missing.csv").touch()
+    assert not _common.input_exists(tmp_path / "dir_0" / "missing.csv")
+    assert _common.input_exists(files[0])
+
+
+def test_lazy_input_check(local, monkeypatch):
+    monkeypatch.setenv('FG_LAZY_INPUT_CHECK', '1')
+    _common.check_input_file_mapping({"some_input": pathlib.Path("i_don't_exist")})
+
+    with pytest.raises(FileNotFoundError):
+        _common.check_input_file_mapping({"some_input": pathlib.Path("i_don't_exist")}, lazy=False)
+
+
+def test_list_items_are_checked():
+    assert _common.value_is_of_type('list', None, [1, 2, 3], False, items='integer')
+    assert _common.value_is_of_type('list', None, [1, 2.5], False, items='float')
+    assert not _common.value_is_of_type('list', None, [1, True], False, items='integer')
+    assert not _common.value_is_of_type('list', None, ["a", 1], False, items='string')
+
+
+def test_parameter_payload_from_file(local, monkeypatch, tmp_path):
+    payload_file = tmp_path / "values.txt"
+    payload_file.write_text("\n".join(str(i) for i in range(1000)) + "\n")
+    monkeypatch.setattr("fastgenomics._common.load_runtime_parameters",
+                        lambda: {"ListValue": {"File": str(payload_file)}})
+
+    store = _common.get_parameter_store()
+    payload = store.view["ListValue"]
+    assert isinstance(payload, _common.ParameterPayload)
+    assert payload._value is None  # loaded on first access
+
+    values = store.get_list("ListValue")
+    assert len(values) == 1000 and values[-1] == 999
+    assert store["ListValue"] is values
+
+    # get_parameters does not load payloads either
+    parameters = _common.get_parameters()
+    assert parameters["IntValue"] == 150 and payload._value is values
+    payload._value = None
+    parameters = _common.get_parameters()
+    assert "ListValue" in parameters and payload._value is None
+    assert len(parameters["ListValue"]) == 1000
+
+
+@pytest.mark.parametrize("name, content, items, expected", [
+    ("ids.txt", "a\nb\n\nc\n", 'string', ['a', 'b', 'c']),
+    ("flags.txt", "true\n0\nFalse\n", 'bool', [True, False, False]),
+    ("values.json", "[1, 2.5, 3]", 'float', [1.0, 2.5, 3.0]),
+])
+def test_parameter_payload_formats(tmp_path, name, content, items, expected):
+    (tmp_path / name).write_text(content)
+    payload = _common.ParameterPayload("param", tmp_path / name, items=items)
+    assert list(payload.load()) == expected
+
+
+@pytest.mark.parametrize("name, content, items", [
+    ("values.txt", "1\n2\nthree\n", 'integer'),
+    ("values.json", "[1, 2.5]", 'integer'),
+    ("values.json", '{"foo": 1}', 'integer'),
+    ("values.json", "[1, true]", 'integer'),
+    ("values.json", "[1.5, false]", 'float'),
+])
+def test_parameter_payload_rejects_wrong_items(tmp_path, name, content, items):
+    (tmp_path / name).write_text(content)
+    with pytest.raises(ValueError, match="param"):
+        _common.ParameterPayload("param", tmp_path / name, items=items).load()
+
+
+def test_parameter_payload_npy(tmp_path):
+    np = pytest.importorskip("numpy")
+    np.save(str(tmp_path / "values.npy"), np.arange(10, dtype='int32'))
+    values = _common.ParameterPayload("param", tmp_path / "values.npy", items='float').load()
+    assert values.dtype == np.float64 and values[-1] == 9.0
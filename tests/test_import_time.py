@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# budget for ``import fastgenomics.io`` in a fresh interpreter, can be overridden for slow machines
+IMPORT_BUDGET_MS = float(os.environ.get('FG_IMPORT_BUDGET_MS', 200))
+LAZY_MODULES = ['jsonschema', 'jinja2', 'pkg_resources']
+
+
+def run_python(code: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args, '-c', code], cwd=str(REPO_ROOT), check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def import_time_ms(module: str) -> float:
+    """returns the cumulative import time of module as reported by ``python -X importtime``"""
+    stderr = run_python(f"import {module}", '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and line.split('|')[-1].strip() == module:
+            return int(line.split('|')[1]) / 1000
+    raise RuntimeError(f"{module} not found in importtime output")
+
+
+@pytest.mark.parametrize("module", ["fastgenomics.io", "fastgenomics.app_creator"])
+def test_heavy_dependencies_are_imported_lazily(module):
+    stdout = run_python(f"import sys, {module}; print(','.join(sorted(sys.modules)))").stdout
+    imported = set(stdout.strip().split(','))
+    assert not imported & set(LAZY_MODULES)
+
+
+def test_import_time_budget():
+    # best of three to reduce noise of a cold file system cache
+    best = min(import_time_ms('fastgenomics.io') for _ in range(3))
+    assert best < IMPORT_BUDGET_MS, f"import fastgenomics.io took {best:.1f}ms, budget is {IMPORT_BUDGET_MS}ms"
@@ -1,3 +1,5 @@
+import os
+
 import fastgenomics.io as fg_io
 import pytest
 
@@ -41,3 +43,535 @@ def test_import_from_common(app_dir, data_root):
     assert len(fg_io.get_parameters()) > 0
     fg_io.get_parameter('IntValue')
 
+
+def test_can_get_input_buffer(local):
+    expected = fg_io.get_input_path("some_input").read_bytes()
+    buffer = fg_io.get_input_buffer("some_input")
+    assert buffer.readonly
+    assert bytes(buffer) == expected
+
+    # repeated calls share the same mapping
+    assert fg_io.get_input_buffer("some_input").obj is buffer.obj
+    fg_io.release_input_buffers()
+
+
+def test_can_open_input_mmap(local):
+    expected = fg_io.get_input_path("some_input").read_bytes()
+    with fg_io.open_input_mmap("some_input") as mapping, fg_io.open_input_mmap("some_input") as other:
+        assert mapping.mmap is other.mmap
+        assert mapping.size == len(expected)
+        assert mapping.mmap[:] == expected
+
+    with pytest.raises(ValueError):
+        mapping.buffer
+
+
+def test_old_mappings_do_not_release_new_ones(local):
+    expected = fg_io.get_input_path("some_input").read_bytes()
+    old = fg_io.open_input_mmap("some_input")
+    fg_io.release_input_buffers()
+    with fg_io.open_input_mmap("some_input") as new:
+        old.close()
+        assert new.mmap is not None and new.mmap[:] == expected
+
+
+def test_can_iter_input_chunks(local):
+    chunks = list(fg_io.iter_input_chunks("some_input", rows=1))
+    assert len(chunks) == 1
+    assert chunks[0].header == ["foo", "bar"]
+    assert chunks[0].rows == [["42", "4711"]]
+
+
+def test_iter_chunks_splits_rows(tmp_path):
+    from fastgenomics import _chunks
+
+    matrix = tmp_path / "matrix.tsv"
+    matrix.write_text("cell\tgene\tvalue\n" + "".join(f"c{i}\tg{i}\t{i}.5\n" for i in range(10)))
+
+    chunks = list(_chunks.iter_chunks(matrix, parser=_chunks.parse_numeric, rows=4))
+    assert [len(chunk.rows) for chunk in chunks] == [4, 4, 2]
+    assert [chunk.start_row for chunk in chunks] == [0, 4, 8]
+    assert chunks[0].header == ["cell", "gene", "value"]
+    assert chunks[-1].rows[-1] == ["c9", "g9", 9.5]
+
+    by_bytes = list(_chunks.iter_chunks(matrix, bytes=1))
+    assert len(by_bytes) == 10
+
+
+def test_can_open_output(local, clear_output):
+    with fg_io.open_output("some_output", buffer_size=4) as out:
+        out.write("foo,bar\n")
+        out.write("42,4711\n")
+        assert not out.path.exists()
+
+    assert out.path.read_text() == "foo,bar\n42,4711\n"
+    assert out.stats.bytes_written == 16
+    assert list(out.path.parent.glob('.*.tmp')) == []
+
+
+def test_open_output_is_atomic(local, clear_output):
+    with pytest.raises(RuntimeError):
+        with fg_io.open_output("some_output", mode='wb') as out:
+            out.write(b"partial")
+            raise RuntimeError("app crashed")
+
+    assert not out.path.exists()
+    assert list(out.path.parent.glob('.*.tmp')) == []
+
+
+def test_failed_close_leaves_no_temporary_file(tmp_path):
+    import time
+    from fastgenomics import _output
+
+    class BrokenFile:
+        def __init__(self, f):
+            self.f = f
+
+        def write(self, data):
+            raise OSError("disk full")
+
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+
+    out = _output.AtomicOutput(tmp_path / "result.bin", mode="wb", buffer_size=4)
+    real_file, out._file = out._file, BrokenFile(out._file)
+    out.write(b"abcd")
+    while out._error is None:
+        time.sleep(0.01)
+    out.write(b"ef")
+
+    # flush raises the error of the writer thread
+    with pytest.raises(IOError):
+        out.close()
+    assert out.closed and real_file.closed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_can_write_compressed_output(local, clear_output):
+    import gzip
+
+    with fg_io.open_output("some_output", compression='gzip') as out:
+        out.write("foo,bar\n")
+
+    with gzip.open(out.name, 'rt') as f:
+        assert f.read() == "foo,bar\n"
+    assert out.bytes_in == 8
+
+
+@pytest.mark.parametrize("codec_name", ["gzip", "bz2", "lzma"])
+def test_compressed_blocks_roundtrip(tmp_path, codec_name):
+    from fastgenomics import _codecs
+
+    codec = _codecs.get_codec(codec_name)
+    target = tmp_path / ("data" + codec.extensions[0])
+    assert _codecs.codec_from_extension(target) is codec
+
+    lines = [f"cell_{i},{i}\n" for i in range(1000)]
+    with _codecs.CompressedOutput(target.open('wb'), codec, block_size=100, max_workers=4) as out:
+        out.writelines(lines)
+
+    # independent blocks are decompressed as one stream, the codec is detected by magic bytes
+    renamed = target.with_suffix('.csv')
+    target.rename(renamed)
+    assert _codecs.codec_from_magic(renamed) is codec
+    with _codecs.open_decompressed(renamed) as f:
+        assert f.readlines() == lines
+
+
+def test_text_starting_like_bz2_is_not_compressed(tmp_path):
+    from fastgenomics import _codecs
+
+    text = tmp_path / "notes.txt"
+    text.write_text("BZh9 is not a compressed file\n")
+    assert _codecs.codec_from_magic(text) is None
+    with _codecs.open_decompressed(text) as f:
+        assert f.read() == "BZh9 is not a compressed file\n"
+
+
+@pytest.mark.parametrize("method", ["read", pytest.param("fadvise", marks=pytest.mark.skipif(
+    not hasattr(os, 'posix_fadvise'), reason="posix_fadvise not available"))])
+def test_can_prefetch_inputs(local, method):
+    expected_size = fg_io.get_input_path("some_input").stat().st_size
+
+    prefetch = fg_io.prefetch_inputs(method=method, max_workers=2)
+    stats = prefetch.wait()
+
+    assert prefetch.done()
+    assert list(stats) == ["some_input"]
+    assert stats["some_input"].bytes == expected_size
+    assert stats["some_input"].method == method
+
+
+def test_contexts_are_independent(local, app_dir, data_root, tmp_path):
+    import shutil
+    from concurrent.futures import ThreadPoolExecutor
+
+    other_root = tmp_path / "other_root"
+    shutil.copytree(str(data_root), str(other_root))
+    (other_root / "config" / "parameters.json").write_text('{"IntValue": 42}')
+
+    contexts = {150: fg_io.context(app_dir, data_root), 42: fg_io.context(app_dir, other_root)}
+
+    def work(expected):
+        with contexts[expected]:
+            assert fg_io.get_input_path("some_input").exists()
+            return fg_io.get_parameter("IntValue")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(work, [150, 42] * 20))
+    assert results == [150, 42] * 20
+
+    # module wide cache is untouched
+    assert fg_io.get_parameter("IntValue") == 150
+    with contexts[42]:
+        assert fg_io.get_parameter("IntValue") == 42
+        assert fg_io.get_input_path("some_input").parent.parent == other_root
+    assert contexts[42].get_parameter("IntValue") == 42
+
+
+@pytest.fixture
+def sharded(local, monkeypatch, data_root, tmp_path):
+    """maps some_input to a glob pattern of shards in a temporary data root"""
+    import shutil
+
+    root = tmp_path / "data_root"
+    shutil.copytree(str(data_root), str(root))
+    shard_dir = root / "data" / "shards"
+    shard_dir.mkdir()
+    for i in range(12):
+        (shard_dir / f"part_{i}.csv").write_text(f"{i}\n")
+    (shard_dir / ".hidden").write_text("hidden")
+
+    monkeypatch.setattr("fastgenomics._common.DEFAULT_DATA_ROOT", str(root))
+    monkeypatch.setenv("INPUT_FILE_MAPPING", '{"some_input": "shards/part_*.csv"}')
+    return shard_dir
+
+
+def test_can_get_input_shards(sharded):
+    shards = fg_io.get_input_shards("some_input")
+    assert [shard.name for shard in shards] == [f"part_{i}.csv" for i in range(12)]
+
+    with pytest.raises(ValueError):
+        fg_io.get_input_path("some_input")
+
+
+def test_can_iter_input_shards(sharded):
+    ordered = list(fg_io.iter_input_shards("some_input", max_workers=3))
+    assert [content for _, content in ordered] == [f"{i}\n".encode() for i in range(12)]
+
+    unordered = fg_io.iter_input_shards("some_input", reader=lambda path: int(path.read_text()), ordered=False)
+    assert sorted(value for _, value in unordered) == list(range(12))
+
+
+def test_glob_characters_in_data_root_and_file_names(local, monkeypatch, data_root, tmp_path):
+    import shutil
+
+    root = tmp_path / "data_root[1]?"
+    shutil.copytree(str(data_root), str(root))
+    monkeypatch.setattr("fastgenomics._common.DEFAULT_DATA_ROOT", str(root))
+    assert fg_io.get_input_path("some_input") == root / "data" / "input.csv"
+
+
+def test_existing_files_are_no_glob_patterns(local, monkeypatch, data_root, tmp_path):
+    import shutil
+
+    root = tmp_path / "data_root"
+    shutil.copytree(str(data_root), str(root))
+    (root / "data" / "input[1].csv").write_text("foo,bar\n")
+    monkeypatch.setattr("fastgenomics._common.DEFAULT_DATA_ROOT", str(root))
+    monkeypatch.setenv("INPUT_FILE_MAPPING", '{"some_input": "input[1].csv"}')
+    assert fg_io.get_input_path("some_input") == root / "data" / "input[1].csv"
+
+
+def test_directory_inputs_are_checked(local, monkeypatch, tmp_path):
+    from fastgenomics import _common
+
+    (tmp_path / "full").mkdir()
+    (tmp_path / "full" / "part_0.csv").touch()
+    (tmp_path / "empty").mkdir()
+
+    _common.check_input_file_mapping({"some_input": tmp_path / "full"})
+    assert _common.resolve_shards(tmp_path / "full") == [tmp_path / "full" / "part_0.csv"]
+    with pytest.raises(FileNotFoundError):
+        _common.check_input_file_mapping({"some_input": tmp_path / "empty"})
+    with pytest.raises(FileNotFoundError):
+        _common.check_input_file_mapping({"some_input": tmp_path / "full" / "*.txt"})
+
+
+def test_can_load_input_array(local, monkeypatch, tmp_path):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setenv("FG_ARRAY_CACHE_DIR", str(tmp_path / "cache"))
+
+    array_input = fg_io.load_input_array("some_input")
+    assert array_input.columns == ["foo", "bar"]
+    assert array_input.labels is None
+    np.testing.assert_array_equal(array_input.data, [[42, 4711]])
+
+    # second call maps the cached entry
+    assert isinstance(fg_io.load_input_array("some_input").data, np.memmap)
+    fg_io.clear_array_cache()
+    assert not list((tmp_path / "cache").glob("*.npy"))
+
+
+def test_array_cache_is_invalidated_and_evicted(tmp_path):
+    np = pytest.importorskip("numpy")
+    from fastgenomics import _array_cache
+
+    cache_dir = tmp_path / "cache"
+    source = tmp_path / "matrix.tsv"
+    source.write_text("gene\tcell_1\tcell_2\nA\t1\t2.5\nB\t3\t4\n")
+
+    array_input = _array_cache.load(source, cache_dir=cache_dir)
+    assert array_input.columns == ["cell_1", "cell_2"] and array_input.label_columns == ["gene"]
+    np.testing.assert_array_equal(array_input.labels[:, 0], ["A", "B"])
+    np.testing.assert_array_equal(array_input.data, [[1, 2.5], [3, 4]])
+
+    # changed content is converted again, the old entry is evicted by the size limit
+    source.write_text("gene\tcell_1\tcell_2\nA\t5\t6\n")
+    array_input = _array_cache.load(source, cache_dir=cache_dir, max_size=1)
+    np.testing.assert_array_equal(array_input.data, [[5, 6]])
+    assert len(list(cache_dir.glob("*.npy"))) == 2  # data and labels of the new entry
+    assert len(list(cache_dir.glob("stamp-*.json"))) == 1
+
+
+def test_array_cache_converts_concurrently_and_streams_labels(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    from concurrent.futures import ThreadPoolExecutor
+    from fastgenomics import _array_cache, _chunks
+
+    monkeypatch.setattr(_chunks, "DEFAULT_CHUNK_ROWS", 2)
+    cache_dir = tmp_path / "cache"
+    source = tmp_path / "matrix.tsv"
+    source.write_text("gene\tcell_1\nA\t1\nB\t2\nlonger_gene\t3\n")
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: _array_cache.load(source, cache_dir=cache_dir), range(8)))
+    for array_input in results:
+        np.testing.assert_array_equal(array_input.labels[:, 0], ["A", "B", "longer_gene"])
+        np.testing.assert_array_equal(array_input.data, [[1], [2], [3]])
+    assert not [path for path in cache_dir.iterdir() if path.name.startswith(".")]
+
+
+def test_can_load_and_write_sparse_matrices(local, clear_output, tmp_path):
+    np = pytest.importorskip("numpy")
+    from fastgenomics import _sparse
+
+    dense = tmp_path / "matrix.csv"
+    dense.write_text("gene,cell_1,cell_2,cell_3\nA,0,1.5,0\nB,0,0,0\nC,2,0,3\n")
+    csr = _sparse.read_sparse(dense, chunk_lines=2)
+    assert csr.shape == (3, 3) and csr.nnz == 3
+    assert csr.row_names == ["A", "B", "C"] and csr.column_names == ["cell_1", "cell_2", "cell_3"]
+    np.testing.assert_array_equal(csr.indptr, [0, 1, 1, 3])
+
+    csc = fg_io.load_sparse_input("some_input", format="csc")
+    assert csc.shape == (1, 2) and csc.column_names == ["foo", "bar"]
+    np.testing.assert_array_equal(csc.data, [42, 4711])
+
+    # round trip via Matrix Market
+    fg_io.write_sparse_output("some_output", csr.asformat("csc"))
+    written = _sparse.read_sparse(fg_io.get_output_path("some_output"), chunk_lines=2)
+    for name in ("shape", "data", "indices", "indptr"):
+        np.testing.assert_array_equal(getattr(written, name), getattr(csr, name))
+
+
+def test_triplets_with_numeric_gene_ids_are_detected_by_header(tmp_path):
+    np = pytest.importorskip("numpy")
+    from fastgenomics import _sparse
+
+    triplets = tmp_path / "matrix.csv"
+    triplets.write_text("cellId,geneId,expressionValue\ncell_1,7157,2\ncell_2,672,1\ncell_2,7157,3\n")
+    csr = _sparse.read_sparse(triplets)
+    assert csr.shape == (2, 2) and csr.row_names == ["cell_1", "cell_2"] and csr.column_names == ["7157", "672"]
+    np.testing.assert_array_equal(csr.data, [2, 1, 3])
+
+    # without header, numeric ids need an explicit layout
+    triplets.write_text("cell_1,7157,2\ncell_2,672,1\n")
+    assert _sparse.read_sparse(triplets, header=False, layout="triplet").shape == (2, 2)
+
+
+def test_can_write_and_verify_integrity_manifest(local, monkeypatch, data_root, tmp_path):
+    import json
+    import shutil
+
+    root = tmp_path / "data_root"
+    shutil.copytree(str(data_root), str(root))
+    monkeypatch.setattr("fastgenomics._common.DEFAULT_DATA_ROOT", str(root))
+    (root / "output" / "some_output.csv").write_text("result")
+
+    sidecar = fg_io.write_integrity_manifest(algorithm="blake2b", max_workers=2)
+    entries = json.loads(sidecar.read_text())["files"]
+    assert set(entries) >= {"input/some_input", "output/some_output"}
+    assert entries["input/some_input"]["algorithm"] == "blake2b"
+
+    results = fg_io.verify_integrity_manifest()
+    assert set(results.values()) == {"unchanged"}
+
+    # a new mtime with the same content is hashed again and matches, changed content is detected
+    input_file = root / "data" / "input.csv"
+    os.utime(str(input_file), ns=(0, 0))
+    (root / "output" / "some_output.csv").write_text("tampered")
+    results = fg_io.verify_integrity_manifest()
+    assert results["input/some_input"] == "ok"
+    assert results["output/some_output"] == "changed"
+    assert fg_io.verify_integrity_manifest(full=True)["input/some_input"] == "ok"
+
+
+def test_metrics_are_collected(local, monkeypatch, data_root, tmp_path):
+    import json
+    import shutil
+    from fastgenomics import _metrics
+
+    root = tmp_path / "data_root"
+    shutil.copytree(str(data_root), str(root))
+    monkeypatch.setattr("fastgenomics._common.DEFAULT_DATA_ROOT", str(root))
+    monkeypatch.setenv("FG_METRICS", "1")
+    _metrics.reset()
+    try:
+        fg_io.get_parameters()
+        with fg_io.open_input("some_input") as f:
+            content = f.read()
+        with fg_io.open_output("some_output") as f_out:
+            f_out.write("result")
+
+        metrics = fg_io.get_metrics()
+        assert {"manifest", "input_file_mapping", "parameters"} <= set(metrics["timings"])
+        assert metrics["inputs"]["some_input"]["opens"] == 1
+        assert metrics["inputs"]["some_input"]["bytes"] == len(content)
+        assert metrics["outputs"]["some_output"]["bytes"] == len("result")
+        assert metrics["outputs"]["some_output"]["stored_bytes"] == len("result")
+
+        fg_io.write_metrics(tmp_path / "metrics.json")
+        assert json.loads((tmp_path / "metrics.json").read_text())["outputs"]["some_output"]["opens"] == 1
+        fg_io.append_performance_summary()
+        summary = (root / "summary" / "summary.md").read_text()
+        assert "## Performance" in summary and "| some_input | 1 |" in summary
+
+        with fg_io.open_output("some_output", compression="gzip") as f_out:
+            f_out.write("result" * 1000)
+        compressed = fg_io.get_metrics()["outputs"]["some_output"]
+        assert compressed["opens"] == 2 and compressed["bytes"] == len("result") * 1001
+        assert compressed["stored_bytes"] - len("result") == f_out.stats.bytes_written < len("result") * 1000
+    finally:
+        _metrics.reset()
+
+
+def test_metrics_are_disabled_by_default(local, monkeypatch):
+    from fastgenomics import _metrics
+
+    monkeypatch.delenv("FG_METRICS", raising=False)
+    with fg_io.open_input("some_input") as f:
+        assert not isinstance(f, _metrics.CountingReader)
+
+
+def test_can_profile(local, monkeypatch, tmp_path):
+    monkeypatch.setenv("FG_PROFILE", "both")
+
+    @fg_io.profile(top=5, output_dir=tmp_path)
+    def work():
+        return sum(list(range(10000)))
+
+    assert work() == sum(range(10000))
+    report = (tmp_path / "profile.txt").read_text()
+    assert "mode: both" in report and "## CPU" in report and "## Memory" in report
+    assert (tmp_path / "profile.pstats").exists()
+
+    # disabled without mode
+    monkeypatch.delenv("FG_PROFILE")
+    with fg_io.profile(output_dir=tmp_path / "disabled") as profiler:
+        pass
+    assert profiler.report_file is None and not (tmp_path / "disabled").exists()
+
+    with pytest.raises(ValueError):
+        fg_io.profile("gpu")
+
+
+def test_profile_entries_record_on_their_own(local, tmp_path):
+    import time
+    import tracemalloc
+    from concurrent.futures import ThreadPoolExecutor
+
+    @fg_io.profile("mem", output_dir=tmp_path / "threads")
+    def work(n):
+        return sum(list(range(n)))
+
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(work, [1000] * 8)) == [sum(range(1000))] * 8
+    assert "mode: mem" in (tmp_path / "threads" / "profile.txt").read_text()
+
+    # overlapping recordings in other threads keep tracing until the last one ends
+    @fg_io.profile("mem", output_dir=tmp_path / "overlapping")
+    def sleep(seconds):
+        time.sleep(seconds)
+        return seconds
+
+    with ThreadPoolExecutor(2) as pool:
+        assert list(pool.map(sleep, [0.1, 0.5])) == [0.1, 0.5]
+    assert "## Memory" in (tmp_path / "overlapping" / "profile.txt").read_text()
+    assert not tracemalloc.is_tracing()
+
+    profiler = fg_io.profile("both", output_dir=tmp_path / "nested")
+    with profiler:
+        with profiler:
+            sum(range(1000))
+        assert profiler.report_file.exists()
+        (tmp_path / "nested" / "profile.txt").unlink()
+    assert "mode: both" in (tmp_path / "nested" / "profile.txt").read_text()
+
+
+@pytest.fixture
+def scratch_dirs(local, monkeypatch, tmp_path):
+    memory_dir, disk_dir = tmp_path / "shm", tmp_path / "disk"
+    memory_dir.mkdir()
+    disk_dir.mkdir()
+    monkeypatch.setenv("FG_SCRATCH_MEMORY_DIR", str(memory_dir))
+    monkeypatch.setenv("FG_SCRATCH_DIR", str(disk_dir))
+    monkeypatch.setenv("FG_SCRATCH_QUOTA", "1000")
+    monkeypatch.setattr("fastgenomics._scratch.MEMORY_RESERVE", 0)
+    monkeypatch.setattr("fastgenomics._common._SCRATCH", None)
+    yield memory_dir, disk_dir
+    fg_io.cleanup_scratch()
+
+
+def test_scratch_paths_respect_quota(scratch_dirs):
+    memory_dir, disk_dir = scratch_dirs
+    small = fg_io.get_scratch_path("small.bin", size_hint=600)
+    large = fg_io.get_scratch_path("large.bin", size_hint=600)
+    assert memory_dir in small.parents
+    assert disk_dir in large.parents
+    assert fg_io.get_scratch_path("small.bin") == small
+
+    with pytest.raises(ValueError):
+        fg_io.get_scratch_path("../outside.bin")
+
+    small.write_bytes(b"x" * 10)
+    fg_io.cleanup_scratch()
+    assert not small.exists()
+    assert list(memory_dir.iterdir()) == []
+
+
+def test_scratch_files_spill_to_disk(scratch_dirs):
+    memory_dir, disk_dir = scratch_dirs
+    with fg_io.open_scratch("growing.bin") as f:
+        f.write(b"a" * 800)
+        assert memory_dir in f.path.parents
+        f.write(b"b" * 800)
+        assert disk_dir in f.path.parents
+
+    assert f.path.read_bytes() == b"a" * 800 + b"b" * 800
+    assert fg_io.get_scratch_usage()["files"] == {"growing.bin": "disk"}
+    assert fg_io.get_scratch_path("growing.bin") == f.path
+
+
+def test_collected_scratch_spaces_are_removed(tmp_path):
+    import gc
+    import weakref
+    from fastgenomics import _scratch
+
+    space = _scratch.ScratchSpace(memory_dir=tmp_path, disk_dir=tmp_path, quota=0)
+    path = space.get_path("file.bin")
+    path.write_bytes(b"x")
+    ref = weakref.ref(space)
+    del space
+    gc.collect()
+    assert ref() is None
+    assert not path.parent.exists()
@@ -0,0 +1,84 @@
+import os
+import shutil
+
+import pytest
+
+from fastgenomics import _common
+from fastgenomics import plan as fg_plan
+
+
+def reset_cache(monkeypatch):
+    for name in ["_PATHS", "_PARAMETERS", "_MANIFEST", "_INPUT_FILE_MAPPING"]:
+        monkeypatch.setattr(f"fastgenomics._common.{name}", {})
+
+
+def test_plan_is_stored_and_reused(local, monkeypatch, app_dir, data_root, tmp_path):
+    plan_file = tmp_path / "plan.marshal"
+
+    plan = fg_plan.initialize(app_dir, data_root, plan_file=plan_file)
+    assert plan_file.exists()
+    assert plan.parameters["StrValue"].value == "hello from parameters.json"
+
+    # a current plan is applied without resolving anything
+    reset_cache(monkeypatch)
+    monkeypatch.setattr("fastgenomics._common.set_paths", None)
+    reused = fg_plan.initialize(app_dir, data_root, plan_file=plan_file)
+    assert reused == plan
+    assert _common.get_parameter("IntValue") == 150
+    assert _common.get_input_file_mapping()["some_input"] == plan.input_file_mapping["some_input"]
+
+
+def test_changed_sources_invalidate_plan(local, monkeypatch, app_dir, data_root, tmp_path):
+    sample_data = data_root
+    data_root = tmp_path / "data_root"
+    shutil.copytree(str(sample_data), str(data_root))
+    plan_file = tmp_path / "plan.marshal"
+
+    fg_plan.initialize(app_dir, data_root, plan_file=plan_file)
+    assert fg_plan.load_plan(plan_file) is not None
+
+    (data_root / "config" / "parameters.json").write_text('{"IntValue": 42}')
+    assert fg_plan.load_plan(plan_file) is None
+
+    reset_cache(monkeypatch)
+    plan = fg_plan.initialize(app_dir, data_root, plan_file=plan_file)
+    assert plan.parameters["IntValue"].value == 42
+    assert fg_plan.load_plan(plan_file) is not None
+
+    monkeypatch.setenv("INPUT_FILE_MAPPING", '{"some_input": "input.csv"}')
+    assert fg_plan.load_plan(plan_file) is None
+
+
+def test_plan_keeps_payload_references(local, monkeypatch, app_dir, data_root, tmp_path):
+    payload_file = tmp_path / "values.txt"
+    payload_file.write_text("1\n2\n3\n4\n")
+    monkeypatch.setattr("fastgenomics._common.load_runtime_parameters",
+                        lambda: {"ListValue": {"File": str(payload_file)}})
+    plan_file = tmp_path / "plan.marshal"
+    fg_plan.initialize(app_dir, data_root, plan_file=plan_file)
+
+    plan = fg_plan.load_plan(plan_file)
+    payload = plan.parameters["ListValue"].value
+    assert isinstance(payload, _common.ParameterPayload)
+    assert list(payload.load()) == [1, 2, 3, 4]
+
+
+def test_applied_plan_resets_listings_and_shards(local, app_dir, data_root, tmp_path):
+    plan = fg_plan.initialize(app_dir, data_root, plan_file=tmp_path / "plan.marshal")
+    state = _common.get_state()
+    state.directory_listings = {tmp_path: None}
+    state.shards = {tmp_path: [tmp_path / "stale.csv"]}
+
+    fg_plan.apply_plan(plan)
+    assert state.directory_listings == {} and state.shards == {}
+
+
+def test_failed_save_leaves_no_temporary_file(local, monkeypatch, app_dir, data_root, tmp_path):
+    plan = fg_plan.initialize(app_dir, data_root, plan_file=tmp_path / "plan.marshal")
+
+    def fail(*args):
+        raise OSError("read-only")
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        fg_plan.save_plan(plan, tmp_path / "other.marshal")
+    assert [path.name for path in tmp_path.iterdir()] == ["plan.marshal"]
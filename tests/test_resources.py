@@ -0,0 +1,127 @@
+import pytest
+
+from fastgenomics import _resources
+import fastgenomics.io as fg_io
+
+GiB = 1024 ** 3
+
+
+@pytest.fixture
+def fake_proc(monkeypatch, tmp_path):
+    proc_cgroup = tmp_path / "proc_self_cgroup"
+    meminfo = tmp_path / "meminfo"
+    meminfo.write_text(f"MemTotal: {64 * GiB // 1024} kB\nMemAvailable: {32 * GiB // 1024} kB\n")
+    monkeypatch.setattr("fastgenomics._resources.PROC_SELF_CGROUP", proc_cgroup)
+    monkeypatch.setattr("fastgenomics._resources.MEMINFO", meminfo)
+    monkeypatch.setattr("fastgenomics._resources._host_cpus", lambda: 16)
+    _resources.clear_cache()
+    yield proc_cgroup
+    _resources.clear_cache()
+
+
+def test_cgroup2_limits(fake_proc, tmp_path):
+    fake_proc.write_text("0::/\n")
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    (root / "cgroup.controllers").write_text("cpu memory\n")
+    (root / "cpu.max").write_text("250000 100000\n")
+    (root / "memory.max").write_text(f"{4 * GiB}\n")
+    (root / "memory.current").write_text(f"{1 * GiB}\n")
+
+    limits = _resources.read_limits(root)
+    assert limits == _resources.Limits(cpus=2.5, memory_limit=4 * GiB, memory_available=3 * GiB, source='cgroup2')
+
+    res = _resources.recommend(limits, demands=['CPU'])
+    assert res.cpu_workers == 2 and res.io_workers == 6 and res.process_workers == 2
+    assert res.chunk_bytes == 3 * GiB // 32
+    assert _resources.recommend(limits, demands=['GPU']).process_workers == 1
+
+    # no limits set
+    (root / "cpu.max").write_text("max 100000\n")
+    (root / "memory.max").write_text("max\n")
+    assert _resources.read_limits(root) == _resources.Limits(16.0, 64 * GiB, 32 * GiB, 'cgroup2')
+
+
+def test_available_memory_is_read_on_every_call(fake_proc, monkeypatch, tmp_path):
+    fake_proc.write_text("0::/\n")
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    (root / "cgroup.controllers").write_text("cpu memory\n")
+    (root / "memory.max").write_text(f"{4 * GiB}\n")
+    (root / "memory.current").write_text(f"{1 * GiB}\n")
+    monkeypatch.setattr("fastgenomics._resources.CGROUP_ROOT", root)
+
+    assert _resources.get_resources().memory_available == 3 * GiB
+    (root / "memory.current").write_text(f"{3 * GiB}\n")
+    # reused within the TTL
+    assert _resources.get_resources().memory_available == 3 * GiB
+
+    monkeypatch.setattr("fastgenomics._resources.RESOURCES_TTL", 0.0)
+    assert _resources.get_resources().memory_available == 1 * GiB
+    assert _resources.get_resources().chunk_bytes < 3 * GiB // 16
+
+
+def test_cgroup2_limits_of_parents_apply(fake_proc, tmp_path):
+    fake_proc.write_text("0::/kubepods/pod/container\n")
+    root = tmp_path / "cgroup"
+    leaf = root / "kubepods" / "pod" / "container"
+    leaf.mkdir(parents=True)
+    for directory in [root, leaf.parent.parent, leaf.parent, leaf]:
+        (directory / "cgroup.controllers").write_text("cpu memory\n")
+    (leaf / "cpu.max").write_text("max 100000\n")
+    (leaf / "memory.max").write_text("max\n")
+    (leaf / "memory.current").write_text(f"{1 * GiB}\n")
+    (leaf.parent / "cpu.max").write_text("150000 100000\n")
+    (leaf.parent / "memory.max").write_text(f"{2 * GiB}\n")
+    (leaf.parent / "memory.current").write_text(f"{1 * GiB + 512 * 1024 ** 2}\n")
+    (leaf.parent.parent / "memory.max").write_text(f"{8 * GiB}\n")
+
+    limits = _resources.read_limits(root)
+    assert limits == _resources.Limits(cpus=1.5, memory_limit=2 * GiB, memory_available=512 * 1024 ** 2,
+                                       source='cgroup2')
+
+
+def test_cgroup1_limits(fake_proc, tmp_path):
+    fake_proc.write_text("4:cpu,cpuacct:/docker/abc\n3:memory:/docker/abc\n")
+    root = tmp_path / "cgroup"
+    for controller in ["cpu,cpuacct", "memory"]:
+        (root / controller).mkdir(parents=True)
+    (root / "cpu,cpuacct" / "cpu.cfs_quota_us").write_text("50000\n")
+    (root / "cpu,cpuacct" / "cpu.cfs_period_us").write_text("100000\n")
+    (root / "memory" / "memory.limit_in_bytes").write_text(f"{512 * 1024 ** 2}\n")
+    (root / "memory" / "memory.usage_in_bytes").write_text(f"{256 * 1024 ** 2}\n")
+
+    limits = _resources.read_limits(root)
+    assert limits == _resources.Limits(cpus=0.5, memory_limit=512 * 1024 ** 2, memory_available=256 * 1024 ** 2,
+                                       source='cgroup1')
+    res = _resources.recommend(limits)
+    assert res.cpu_workers == 1
+    assert res.block_bytes == 768 * 1024 and res.block_bytes % _resources.BLOCK_ALIGNMENT == 0
+
+    # unlimited
+    (root / "cpu,cpuacct" / "cpu.cfs_quota_us").write_text("-1\n")
+    (root / "memory" / "memory.limit_in_bytes").write_text("9223372036854771712\n")
+    assert _resources.read_limits(root) == _resources.Limits(16.0, 64 * GiB, 32 * GiB, 'cgroup1')
+
+
+def test_without_cgroups(fake_proc, tmp_path):
+    assert _resources.read_limits(tmp_path / "no_cgroup").source == 'host'
+
+
+def test_resources_use_manifest_demands(local):
+    fg_io.set_paths()
+    res = fg_io.resources()
+    assert res.demands == ('CPU',)
+    assert res.cpu_workers >= 1 and res.chunk_bytes >= _resources.MIN_CHUNK_BYTES
+
+
+def test_explicit_sizes_are_not_replaced_by_defaults(tmp_path):
+    from fastgenomics import _codecs, _integrity, _output
+
+    with pytest.raises(ValueError):
+        _output.AtomicOutput(tmp_path / "out.csv", buffer_size=0)
+    with pytest.raises(ValueError):
+        _codecs.CompressedOutput(None, _codecs.get_codec('gzip'), block_size=0)
+    (tmp_path / "file.bin").write_bytes(b"data")
+    with pytest.raises(ValueError):
+        _integrity.hash_file(tmp_path / "file.bin", block_size=0)